@@ -0,0 +1,28 @@
+from typing import Callable
+from fastapi import Request, Response
+from core.cache import response_cache
+from utils.serialization import negotiate
+
+def cached_response(request: Request, namespace: str, device_id: str, params: dict, compute: Callable[[str], bytes]) -> Response:
+    """
+    Responde uma leitura a partir do cache, com ETag, em JSON ou MessagePack conforme o Accept.
+    Se o cliente já tiver a versão atual (If-None-Match), responde 304 sem corpo.
+
+    Args:
+        request (Request): A requisição.
+        namespace (str): O tipo da leitura (ex.: "history").
+        device_id (str): O ID do dispositivo.
+        params (dict): Os demais parâmetros da consulta.
+        compute (Callable[[str], bytes]): Calcula o corpo da resposta, serializado no media type recebido.
+
+    Returns:
+        Response: A resposta, ou 304 Not Modified.
+    """
+    media_type = negotiate(request.headers.get("accept"))
+    cached = response_cache.get_or_compute(namespace, device_id, params, media_type, lambda: compute(media_type))
+    # O cliente deve revalidar a cada uso; a revalidação custa apenas o 304
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and cached.etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type=cached.media_type, headers=headers)
@@ -1,4 +1,18 @@
-from core.database import SessionLocal
+from typing import Optional
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import Settings
+from core.database import SessionLocal, AsyncSessionLocal
+from core.sharding import ShardRouter, shard_router
+from repos.measurementRepository import AsyncMeasurementRepository
+from repos.irregularityRepository import AsyncIrregularityRepository
+from repos.rollupRepository import AsyncRollupRepository
+from repos.deviceStatusRepository import AsyncDeviceStatusRepository
+from services.measurementService import AsyncMeasurementService
+from services.broadcaster import broadcaster
+from services.frameReplies import FrameReplies, frame_replies
+from services.ingestQueue import IngestQueue
+from services.simulationManager import SimulationManager
 
 def get_db():
     """Gera um gerenciador de sessão de banco de dados para cada requisição.
@@ -11,3 +25,74 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_session_factory():
+    """Retorna a fábrica de sessões, para respostas transmitidas que abrem a própria sessão.
+
+    Returns:
+        sessionmaker: fábrica de sessões do banco de dados.
+    """
+    return SessionLocal
+
+async def get_async_db():
+    """Gera um gerenciador de sessão assíncrona de banco de dados para cada requisição.
+
+    Yields:
+        AsyncSession: gerenciador de sessão assíncrona do banco de dados.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def build_async_measurement_service(db: AsyncSession, ingest_queue: Optional[IngestQueue] = None) -> AsyncMeasurementService:
+    """Monta o serviço assíncrono de medições com os repositórios da sessão informada.
+
+    Args:
+        db (AsyncSession): A sessão assíncrona do banco de dados.
+        ingest_queue (Optional[IngestQueue]): A fila de gravação em segundo plano, no modo write-behind.
+
+    Returns:
+        AsyncMeasurementService: o serviço assíncrono de medições.
+    """
+    return AsyncMeasurementService(
+        AsyncMeasurementRepository(db),
+        AsyncIrregularityRepository(db),
+        rollup_repo=AsyncRollupRepository(db),
+        ingest_queue=ingest_queue,
+        enqueue_timeout=Settings.INGEST_ENQUEUE_TIMEOUT_MS / 1000,
+        broadcaster=broadcaster,
+        status_repo=AsyncDeviceStatusRepository(db),
+    )
+
+def get_async_measurement_service(request: Request, db: AsyncSession = Depends(get_async_db)) -> AsyncMeasurementService:
+    """Monta o serviço assíncrono de medições com os repositórios da sessão da requisição.
+
+    Se a aplicação estiver no modo write-behind, o serviço usa a fila de gravação em segundo plano.
+
+    Returns:
+        AsyncMeasurementService: o serviço assíncrono de medições.
+    """
+    return build_async_measurement_service(db, getattr(request.app.state, "ingest_queue", None))
+
+def get_simulation_manager(request: Request) -> SimulationManager:
+    """Retorna o gerenciador de simulações da aplicação.
+
+    Returns:
+        SimulationManager: o gerenciador de simulações, criado na inicialização da aplicação.
+    """
+    return request.app.state.simulation_manager
+
+def get_shard_router() -> ShardRouter:
+    """Retorna o roteador que verifica a afinidade dos dispositivos com esta instância.
+
+    Returns:
+        ShardRouter: o roteador, desativado se SHARD_NODES não estiver configurado.
+    """
+    return shard_router
+
+def get_frame_replies() -> FrameReplies:
+    """Retorna as respostas dos últimos quadros binários de cada dispositivo, para identificar reenvios.
+
+    Returns:
+        FrameReplies: as respostas guardadas na memória do processo.
+    """
+    return frame_replies
@@ -0,0 +1,34 @@
+# backend/api/endpoints/devices.py
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from api.deps import get_db
+from schemas.deviceStatus import DeviceStatusPage
+from repos.deviceStatusRepository import DeviceStatusRepository
+
+router = APIRouter(prefix="/api", tags=["Dispositivos"])
+
+@router.get("/devices", response_model=DeviceStatusPage)
+def get_devices(
+    cursor: Optional[str] = Query(None, description="Cursor retornado pela página anterior (next_cursor)"),
+    limit: int = Query(100, ge=1, le=1000, description="Quantidade máxima de dispositivos na página"),
+    in_irregularity: Optional[bool] = Query(None, description="Lista apenas os dispositivos com (true) ou sem (false) irregularidade ativa"),
+    db: Session = Depends(get_db),
+):
+    """Obtém a situação atual da frota (última medição, anormais na janela e irregularidade ativa de cada
+    dispositivo), em páginas ordenadas pelo ID do dispositivo, com paginação por cursor (keyset).
+
+    A situação é mantida pela ingestão na tabela device_status, e cada página é lida com uma única consulta.
+
+    Args:
+        cursor (str): O cursor da página anterior, ou vazio para a primeira página.
+        limit (int): A quantidade máxima de dispositivos na página.
+        in_irregularity (bool): Se informado, filtra os dispositivos pela irregularidade ativa.
+
+    Returns:
+        DeviceStatusPage: Os dispositivos da página e o cursor da próxima página (nulo na última).
+    """
+    items = DeviceStatusRepository(db).get_page(cursor, limit, in_irregularity)
+
+    next_cursor = items[-1].device_id if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,93 @@
+import tempfile
+from typing import Optional
+import pyarrow as pa
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from api.deps import get_db, get_session_factory, get_shard_router
+from core.sharding import ShardRouter
+from services.historyExport import EXPORT_SCHEMAS, HistoryExportService
+from utils.columnar import FILE_EXTENSIONS, MEDIA_TYPES
+
+router = APIRouter(prefix="/api", tags=["Exportação"])
+
+# Arquivos importados maiores que isso são mantidos em disco em vez de memória
+IMPORT_SPOOL_BYTES = 64 * 1024 * 1024
+
+def _check_kind(kind: str) -> None:
+    if kind not in EXPORT_SCHEMAS:
+        raise HTTPException(status_code=404, detail=f"Tipo inválido, opções: {', '.join(EXPORT_SCHEMAS)}")
+
+@router.get("/export/{kind}")
+def export_history(
+    kind: str,
+    device_id: Optional[str] = Query(None, description="Dispositivo exportado (vazio para todos)"),
+    days: int = Query(30, ge=1, description="Quantidade de dias do histórico"),
+    format: str = Query("parquet", description="Opções: arrow (Arrow IPC stream), parquet"),
+    session_factory=Depends(get_session_factory),
+):
+    """
+    Exporta o histórico de medições ou de irregularidades de um dispositivo (ou de todos) em formato
+    colunar, lendo o banco em blocos e transmitindo o arquivo conforme é gerado.
+
+    Args:
+        kind (str): "measurements" ou "irregularities".
+        device_id (Optional[str]): O ID do dispositivo; se vazio, exporta todos os dispositivos.
+        days (int): A quantidade de dias do histórico.
+        format (str): "arrow" ou "parquet".
+
+    Returns:
+        StreamingResponse: O arquivo Arrow IPC ou Parquet.
+    """
+    _check_kind(kind)
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=422, detail=f"Formato inválido, opções: {', '.join(MEDIA_TYPES)}")
+
+    def generate():
+        # A sessão é aberta dentro do gerador, pois a resposta é transmitida após o fim da requisição
+        db = session_factory()
+        try:
+            yield from HistoryExportService(db).export(kind, device_id, days, format)
+        finally:
+            db.close()
+
+    filename = f"{kind}-{device_id or 'all'}{FILE_EXTENSIONS[format]}"
+    return StreamingResponse(
+        generate(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post(
+    "/import/{kind}",
+    openapi_extra={"requestBody": {"content": {media_type: {"schema": {"type": "string", "format": "binary"}} for media_type in MEDIA_TYPES.values()}}},
+)
+async def import_history(kind: str, request: Request, db: Session = Depends(get_db), shards: ShardRouter = Depends(get_shard_router)):
+    """
+    Importa um arquivo exportado (Arrow IPC ou Parquet) com inserts em lote, para reprocessar
+    ou restaurar o histórico. O formato é identificado pelo conteúdo.
+
+    Com várias instâncias, o arquivo só é importado se todos os dispositivos pertencerem a esta
+    instância, que mantém o estado deles; caso contrário, é redirecionado (307) ou recusado (421).
+
+    Args:
+        kind (str): "measurements" ou "irregularities".
+
+    Returns:
+        dict: O tipo importado e a quantidade de linhas.
+    """
+    _check_kind(kind)
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as source:
+        async for chunk in request.stream():
+            source.write(chunk)
+        source.seek(0)
+        service = HistoryExportService(db)
+        try:
+            if shards.enabled:
+                shards.ensure_local(await run_in_threadpool(service.device_ids, source))
+            rows = await run_in_threadpool(service.import_file, kind, source)
+        except (ValueError, pa.ArrowInvalid) as e:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Arquivo inválido: {e}")
+    return {"kind": kind, "rows": rows}
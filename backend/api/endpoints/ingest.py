@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(prefix="/api", tags=["Ingestão"])
+
+@router.get("/ingest/metrics")
+def get_ingest_metrics(request: Request):
+    """
+    Retorna as métricas da fila de gravação em segundo plano (modo write-behind):
+    profundidade da fila, totais de medições enfileiradas/gravadas/recusadas e latência das gravações.
+
+    Returns:
+        dict: O modo de ingestão e as métricas da fila (nulas no modo direto).
+    """
+    ingest_queue = getattr(request.app.state, "ingest_queue", None)
+    return {
+        "mode": "write_behind" if ingest_queue is not None else "direct",
+        "queue": ingest_queue.metrics() if ingest_queue is not None else None,
+    }
@@ -1,16 +1,20 @@
 # backend/api/endpoints/irregularities.py
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from api.deps import get_db
+from api.caching import cached_response
+from utils.serialization import dumps
 from schemas.irregularity import IrregularityResponse
 from repos.irregularityRepository import IrregularityRepository
 
 router = APIRouter(prefix="/api", tags=["Irregularidades"])
 
 @router.get("/irregularities", response_model=list[IrregularityResponse])
-def get_irregularities(device_id: str = Query(...), db: Session = Depends(get_db)):
+def get_irregularities(request: Request, device_id: str = Query(...), db: Session = Depends(get_db)):
     """
     Retorna todas as irregularidades para um dispositivo específico.
+    A resposta vem do cache enquanto não houver alterações nas irregularidades do dispositivo,
+    e o ETag permite ao cliente revalidá-la (304 Not Modified).
 
     Args:
         device_id: Identificador do dispositivo para o qual as irregularidades devem ser recuperadas.
@@ -18,6 +22,9 @@ def get_irregularities(device_id: str = Query(...), db: Session = Depends(get_db
     Returns:
         list[IrregularityResponse]: Lista de irregularidades registradas pelo dispositivo.
     """
-    irregularity_repo = IrregularityRepository(db)
-    irregularities = irregularity_repo.get_all(device_id)
-    return irregularities
+    def compute(media_type: str) -> bytes:
+        irregularity_repo = IrregularityRepository(db)
+        irregularities = irregularity_repo.get_all(device_id)
+        return dumps([IrregularityResponse.model_validate(i, from_attributes=True).model_dump() for i in irregularities], media_type)
+
+    return cached_response(request, "irregularities", device_id, {}, compute)
@@ -1,17 +1,61 @@
 # backend/api/endpoints/measurements.py
-from fastapi import APIRouter, Depends, Query, Response
+import math
+from datetime import datetime
+from itertools import islice
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
-from api.deps import get_db
-from schemas.measurement import MeasurementRequest, MeasurementResponse
-from repos.measurementRepository import MeasurementRepository
-from repos.irregularityRepository import IrregularityRepository
-from services.measurementService import MeasurementService
+from api.deps import get_db, get_session_factory, get_async_measurement_service, get_shard_router, get_frame_replies
+from api.caching import cached_response
+from core.sharding import ShardRouter
+from schemas.measurement import (
+    MeasurementRequest, MeasurementResponse, MeasurementPage, MeasurementBuckets, MeasurementPoints,
+)
+from repos.measurementRepository import MeasurementRepository, HISTORY_COLUMNS
+from repos.rollupRepository import RollupRepository
+from services.measurementService import AsyncMeasurementService
+from services.frameReplies import FrameReplies
 from models.measurement import Measurement
+from utils.pagination import encode_cursor, decode_cursor
+from utils.downsampling import lttb
+from utils.serialization import encode_rows
+from utils.frames import FRAME_MEDIA_TYPE, decode_frame, encode_alerts
 
 router = APIRouter(prefix="/api", tags=["Medições"])
 
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson")
+
+_batch_adapter = TypeAdapter(list[MeasurementRequest])
+
+HISTORY_FIELDS = tuple(column.key for column in HISTORY_COLUMNS)
+
+# Acima dessa quantidade de medições, o LTTB roda sobre o mínimo e o máximo de cada intervalo, calculados no banco
+DOWNSAMPLE_MAX_RAW_POINTS = 200_000
+# Intervalos da pré-redução por ponto desejado (cada intervalo fornece dois candidatos: o mínimo e o máximo)
+DOWNSAMPLE_BUCKETS_PER_POINT = 2
+
+_POINT_DTYPE = np.dtype([("x", np.float64), ("y", np.float64)])
+
+def _parse_batch(body: bytes, content_type: str) -> list[MeasurementRequest]:
+    """Lê um lote de medições enviado como array JSON ou NDJSON (uma medição por linha)."""
+    try:
+        if content_type.split(";")[0].strip() in NDJSON_MEDIA_TYPES:
+            return [MeasurementRequest.model_validate_json(line) for line in body.splitlines() if line.strip()]
+        return _batch_adapter.validate_json(body)
+    except ValidationError as e:
+        # Sem o valor recebido nos erros: NaN/infinito não podem ser devolvidos em JSON
+        raise RequestValidationError(e.errors(include_input=False))
+
 @router.post("/measurements")
-def add_measurement(device_id: str = Query(...), time_ms: int = Query(...), value: float = Query(...), db: Session = Depends(get_db)):
+async def add_measurement(
+    device_id: str = Query(...), time_ms: int = Query(...), value: float = Query(..., allow_inf_nan=False),
+    service: AsyncMeasurementService = Depends(get_async_measurement_service),
+    shards: ShardRouter = Depends(get_shard_router),
+):
     """Adiciona uma medição ao banco de dados e processa a irregularidade se necessário.
 
     Args:
@@ -22,26 +66,237 @@ def add_measurement(device_id: str = Query(...), time_ms: int = Query(...), valu
     Returns:
         list[]: A medição adicionada, e uma mensagem de alerta, se houver
     """
-    
-    measurement_repo = MeasurementRepository(db)
-    irregularity_repo = IrregularityRepository(db)
-    service = MeasurementService(measurement_repo, irregularity_repo)
+    # Com várias instâncias, cada dispositivo é processado apenas pela instância dona dele
+    shards.ensure_local([device_id])
 
     # Processa a medição (incluindo verificação de irregularidades)
-    result = service.process_measurement(device_id, time_ms, value)
+    result = await service.process_measurement(device_id, time_ms, value)
 
     return {"device_id" : device_id, "time_ms": time_ms, "value": value, "alert": result["alert"]}
 
+@router.post(
+    "/measurements/batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": _batch_adapter.json_schema()},
+                "application/x-ndjson": {"schema": MeasurementRequest.model_json_schema()},
+            },
+        }
+    },
+)
+async def add_measurements_batch(
+    request: Request,
+    service: AsyncMeasurementService = Depends(get_async_measurement_service),
+    shards: ShardRouter = Depends(get_shard_router),
+):
+    """Adiciona um lote de medições com um único insert em lote e processa as irregularidades, em ordem.
+
+    O corpo da requisição pode ser um array JSON de medições ou NDJSON (Content-Type: application/x-ndjson),
+    com uma medição por linha.
+
+    Returns:
+        dict: A quantidade de medições recebidas e, para cada medição, na mesma ordem, a mensagem de alerta, se houver
+    """
+    samples = _parse_batch(await request.body(), request.headers.get("content-type", ""))
+    shards.ensure_local(s.device_id for s in samples)
+
+    results = await service.process_batch([s.model_dump() for s in samples])
+
+    return {"received": len(results), "results": results}
+
+@router.post(
+    "/measurements/frame",
+    response_class=Response,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {FRAME_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+    responses={200: {"content": {FRAME_MEDIA_TYPE: {}}, "description": "Um código de alerta (uint8) por medição"}},
+)
+async def add_measurements_frame(
+    request: Request,
+    service: AsyncMeasurementService = Depends(get_async_measurement_service),
+    shards: ShardRouter = Depends(get_shard_router),
+    replies: FrameReplies = Depends(get_frame_replies),
+):
+    """Adiciona as medições de um dispositivo enviadas no formato binário compacto (utils.frames).
+
+    O corpo é um quadro com o ID do dispositivo, a sequência do quadro e as medições empacotadas
+    (12 bytes cada: time_ms int32 e value float64, little-endian), lido sem cópia. A resposta traz
+    um byte por medição, na mesma ordem: 0 (sem alerta), 1 ("bip") ou 2 ("bipbip"). O reenvio de um
+    quadro (mesma sequência do anterior do dispositivo) recebe a mesma resposta, sem gravar novamente.
+
+    Returns:
+        Response: Os códigos de alerta empacotados (application/octet-stream)
+    """
+    try:
+        frame = decode_frame(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    shards.ensure_local([frame.device_id])
+
+    async def process() -> bytes:
+        results = await service.process_frame(frame.device_id, frame.samples)
+        return encode_alerts(r["alert"] for r in results)
+
+    reply, _ = await replies.reply(frame.device_id, frame.seq, process)
+    return Response(content=reply, media_type=FRAME_MEDIA_TYPE)
+
 @router.get("/measurements/history", response_model=list[MeasurementResponse])
-def get_history(device_id: str = Query(...), db: Session = Depends(get_db)):
+def get_history(request: Request, device_id: str = Query(...), db: Session = Depends(get_db)):
     """Obtém o histórico de medições de um dispositivo. (Últimos 30 dias)
 
+    As medições são lidas como tuplas e serializadas diretamente (JSON com orjson, ou MessagePack
+    com `Accept: application/msgpack`), sem validar cada linha pelo modelo. A resposta vem do cache
+    enquanto não houver novas medições do dispositivo, e o ETag permite ao cliente revalidá-la (304 Not Modified).
+
     Args:
         device_id (str): O ID do dispositivo.
 
     Returns:
         list[MeasurementResponse]: A lista de medições do dispositivo.
     """
+    def compute(media_type: str) -> bytes:
+        measurement_repo = MeasurementRepository(db)
+        return encode_rows(HISTORY_FIELDS, measurement_repo.get_history_rows(device_id), media_type)
+
+    return cached_response(request, "history", device_id, {"days": 30}, compute)
+
+@router.get("/measurements/history/page", response_model=MeasurementPage)
+def get_history_page(
+    device_id: str = Query(...),
+    cursor: str = Query(None, description="Cursor retornado pela página anterior (next_cursor)"),
+    limit: int = Query(1000, ge=1, le=10000, description="Quantidade máxima de medições na página"),
+    days: int = Query(30, ge=1, description="Quantidade de dias do histórico"),
+    db: Session = Depends(get_db),
+):
+    """Obtém o histórico de medições de um dispositivo em páginas, com paginação por cursor (keyset).
+
+    Args:
+        device_id (str): O ID do dispositivo.
+        cursor (str): O cursor da página anterior, ou vazio para a primeira página.
+        limit (int): A quantidade máxima de medições na página.
+        days (int): A quantidade de dias do histórico.
+
+    Returns:
+        MeasurementPage: As medições da página e o cursor da próxima página (nulo na última).
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    measurement_repo = MeasurementRepository(db)
+    items = measurement_repo.get_history_page(device_id, after, limit, days)
+
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].timestamp, items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/measurements/history/stream")
+def stream_history(
+    device_id: str = Query(...),
+    days: int = Query(30, ge=1, description="Quantidade de dias do histórico"),
+    session_factory=Depends(get_session_factory),
+):
+    """Transmite o histórico de medições de um dispositivo em NDJSON (uma medição por linha),
+    lendo o banco em blocos para manter o uso de memória constante.
+
+    Args:
+        device_id (str): O ID do dispositivo.
+        days (int): A quantidade de dias do histórico.
+
+    Returns:
+        StreamingResponse: As medições do dispositivo, uma por linha, ordenadas por timestamp.
+    """
+    def generate():
+        # A sessão é aberta dentro do gerador, pois a resposta é transmitida após o fim da requisição
+        db = session_factory()
+        try:
+            for m in MeasurementRepository(db).iter_history(device_id, days):
+                yield orjson.dumps(dict(zip(HISTORY_FIELDS, m))) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@router.get("/measurements/history/aggregate", response_model=MeasurementBuckets)
+def get_history_aggregate(
+    device_id: str = Query(...),
+    bucket_seconds: int = Query(None, ge=1, description="Tamanho de cada intervalo, em segundos"),
+    points: int = Query(2000, ge=1, le=100000, description="Quantidade aproximada de intervalos (usado se bucket_seconds não for informado)"),
+    days: int = Query(30, ge=1, description="Quantidade de dias do histórico"),
+    db: Session = Depends(get_db),
+):
+    """Obtém o histórico de medições de um dispositivo agregado em intervalos de tempo
+    (mínimo, máximo, média e quantidade de medições por intervalo), calculado no banco de dados.
+
+    Intervalos múltiplos de um minuto ou de uma hora são lidos dos agregados por minuto/hora,
+    que também informam a quantidade de medições anormais de cada intervalo.
+
+    Args:
+        device_id (str): O ID do dispositivo.
+        bucket_seconds (int): O tamanho de cada intervalo, em segundos.
+        points (int): A quantidade aproximada de intervalos, caso bucket_seconds não seja informado.
+        days (int): A quantidade de dias do histórico.
+
+    Returns:
+        MeasurementBuckets: Os intervalos do histórico, ordenados por tempo.
+    """
+    if bucket_seconds is None:
+        bucket_seconds = max(1, math.ceil(days * 86400 / points))
+
+    # Usa o agregado por hora/minuto compatível com o intervalo, ou as medições brutas caso não haja um
+    buckets = RollupRepository(db).get_history_buckets(device_id, bucket_seconds, days)
+    if buckets is None:
+        buckets = MeasurementRepository(db).get_history_buckets(device_id, bucket_seconds, days)
+    return {"device_id": device_id, "bucket_seconds": bucket_seconds, "buckets": [b._asdict() for b in buckets]}
+
+@router.get("/measurements/history/downsample", response_model=MeasurementPoints)
+def get_history_downsample(
+    device_id: str = Query(...),
+    points: int = Query(2000, ge=3, le=100000, description="Quantidade de pontos desejada"),
+    days: int = Query(30, ge=1, description="Quantidade de dias do histórico"),
+    db: Session = Depends(get_db),
+):
+    """Obtém o histórico de medições de um dispositivo reduzido à quantidade de pontos desejada
+    com o algoritmo LTTB, que preserva a forma visual do gráfico.
+
+    Se o período tiver mais de DOWNSAMPLE_MAX_RAW_POINTS medições, o banco primeiro reduz a série ao
+    mínimo e ao máximo de cada intervalo (a partir dos agregados por minuto/hora), e o LTTB escolhe
+    os pontos entre esses candidatos, sem trazer as medições brutas para a memória.
+
+    Args:
+        device_id (str): O ID do dispositivo.
+        points (int): A quantidade de pontos desejada.
+        days (int): A quantidade de dias do histórico.
+
+    Returns:
+        MeasurementPoints: Os pontos escolhidos, ordenados por tempo.
+    """
     measurement_repo = MeasurementRepository(db)
-    history = measurement_repo.get_history(device_id)
-    return history
+    # Intervalos múltiplos de um minuto, para que sejam lidos dos agregados
+    bucket_seconds = 60 * max(1, math.ceil(days * 86400 / (points * DOWNSAMPLE_BUCKETS_PER_POINT) / 60))
+    buckets = RollupRepository(db).get_history_buckets(device_id, bucket_seconds, days)
+    if buckets is None:
+        buckets = measurement_repo.get_history_buckets(device_id, bucket_seconds, days)
+
+    if sum(b.count for b in buckets) <= DOWNSAMPLE_MAX_RAW_POINTS:
+        rows = ((m.timestamp.timestamp(), m.value) for m in measurement_repo.iter_history(device_id, days))
+        series = np.fromiter(islice(rows, DOWNSAMPLE_MAX_RAW_POINTS), dtype=_POINT_DTYPE)
+    else:
+        # Mínimo e máximo de cada intervalo, no início do intervalo (a ordem entre eles não é conhecida)
+        candidates = ((b.bucket_start.timestamp(), value) for b in buckets for value in (b.min, b.max))
+        series = np.fromiter(candidates, dtype=_POINT_DTYPE, count=2 * len(buckets))
+
+    x, y = series["x"], series["y"]
+    selected = lttb(x, y, points)
+    return {
+        "device_id": device_id,
+        "points": [{"timestamp": datetime.fromtimestamp(x[i]), "value": y[i]} for i in selected],
+    }
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from core import metrics
+from core.database import collect_pool_metrics
+
+router = APIRouter(tags=["Métricas"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(request: Request):
+    """
+    Retorna as métricas da aplicação no formato texto do Prometheus: latência por rota,
+    latência das consultas e commits, conexões dos pools, medições ingeridas por dispositivo,
+    alertas e a fila de gravação em segundo plano.
+
+    Returns:
+        PlainTextResponse: As métricas no formato de exposição do Prometheus.
+    """
+    collect_pool_metrics()
+    ingest_queue = getattr(request.app.state, "ingest_queue", None)
+    if ingest_queue is not None:
+        for name, value in ingest_queue.metrics().items():
+            metrics.ingest_queue.set(value, metric=name)
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from api.deps import get_shard_router
+from core.sharding import ShardRouter, WrongShard
+from services.broadcaster import broadcaster
+
+router = APIRouter(prefix="/api", tags=["Tempo real"])
+
+# Intervalo dos comentários de keep-alive do SSE, em segundos
+SSE_KEEPALIVE_SECONDS = 15
+# Código de fechamento do WebSocket de um dispositivo de outra instância (a URL do dono vai no motivo)
+WS_WRONG_SHARD = 4307
+
+@router.websocket("/measurements/ws")
+async def measurements_websocket(websocket: WebSocket, device_id: str = Query(...), shards: ShardRouter = Depends(get_shard_router)):
+    """
+    Canal WebSocket com as medições e os alertas ('bip'/'bipbip') de um dispositivo, em tempo real.
+
+    Cada mensagem é um JSON com a chave "type": "measurement" (nova medição, com o alerta, se houver)
+    ou "irregularity" (abertura ou fechamento de uma irregularidade).
+
+    Os eventos são publicados apenas pela instância dona do dispositivo: em outra instância, a conexão
+    é fechada com o código 4307 e a URL do dono no motivo, para que o cliente se conecte a ela.
+    """
+    await websocket.accept()
+    try:
+        shards.ensure_local([device_id])
+    except WrongShard as e:
+        await websocket.close(code=WS_WRONG_SHARD, reason=next(iter(e.owners)))
+        return
+    subscription = broadcaster.subscribe(device_id)
+    # Detecta a desconexão do cliente enquanto aguarda os eventos
+    receiver = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            getter = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    getter.cancel()
+                    break
+                # Mensagens enviadas pelo cliente são ignoradas
+                receiver = asyncio.ensure_future(websocket.receive())
+            if getter in done:
+                await websocket.send_json(getter.result())
+            else:
+                getter.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        broadcaster.unsubscribe(subscription)
+
+@router.get("/measurements/events")
+async def measurements_events(device_id: str = Query(...), shards: ShardRouter = Depends(get_shard_router)):
+    """
+    Canal Server-Sent Events (text/event-stream) com as medições e os alertas de um dispositivo, em tempo real.
+
+    Os eventos têm o nome "measurement" ou "irregularity", com os mesmos dados JSON do canal WebSocket.
+    Em uma instância que não é a dona do dispositivo, a requisição é redirecionada ao dono (307).
+    """
+    shards.ensure_local([device_id])
+
+    async def generate():
+        # A inscrição é feita dentro do gerador: se o cliente desconectar antes do início da resposta,
+        # o gerador nunca é iniciado e não fica nenhuma inscrição sem a remoção correspondente
+        subscription = broadcaster.subscribe(device_id)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
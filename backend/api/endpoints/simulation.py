@@ -1,12 +1,11 @@
 import asyncio
 import random
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from api.deps import get_db
-from repos.measurementRepository import MeasurementRepository
-from repos.irregularityRepository import IrregularityRepository
-from services.measurementService import MeasurementService
-from utils.simulation import generate_baseline
+from fastapi import APIRouter, Depends, HTTPException, Query
+from api.deps import get_async_measurement_service, get_simulation_manager, get_shard_router
+from core.sharding import ShardRouter
+from services.measurementService import AsyncMeasurementService
+from services.simulationManager import SimulationManager
+from utils.simulation import generate_baseline, SIMULATION_MODES
 
 router = APIRouter(prefix="/api", tags=["Simulações"])
 
@@ -16,7 +15,8 @@ async def simulate(
     mode: str = Query("normal", description="Opções: normal, anormal, misto"),
     count: int = Query(100, description="Quantidade de medições a enviar"),
     interval: int = Query(15, description="Intervalo das medições em ms"),
-    db: Session = Depends(get_db)
+    service: AsyncMeasurementService = Depends(get_async_measurement_service),
+    shards: ShardRouter = Depends(get_shard_router),
 ):
     """
     Simula medições de um dispositivo com diferentes modos de simulação diretamente na API.
@@ -32,11 +32,12 @@ async def simulate(
     - count: a quantidade de medições a serem geradas (padrão: 100)
     - interval: o intervalo das medições em milissegundos (padrão: 15)
 
+    Com várias instâncias, a simulação de um dispositivo de outra instância é redirecionada a ela.
+
     Retorna uma lista de medições simuladas.
     """
-    measurement_repo = MeasurementRepository(db)
-    irregularity_repo = IrregularityRepository(db)
-    service = MeasurementService(measurement_repo, irregularity_repo)
+    # As medições simuladas passam pelo estado em memória: apenas a instância dona do dispositivo pode gerá-las
+    shards.ensure_local([device_id])
 
     results = []
     for i in range(count):
@@ -50,7 +51,7 @@ async def simulate(
             if random.random() < 0.2:
                 value = baseline * 1.3
 
-        alert_result = service.process_measurement(device_id, time_ms, value)
+        alert_result = await service.process_measurement(device_id, time_ms, value)
 
         results.append({
             "time_ms": time_ms,
@@ -59,3 +60,59 @@ async def simulate(
         })
         await asyncio.sleep(interval / 1000)
     return {"device_id": device_id, "simulated_measurements": results}
+
+@router.post("/simulations")
+async def start_simulation(
+    devices: int = Query(1, ge=1, le=10000, description="Quantidade de dispositivos simulados simultaneamente"),
+    device_prefix: str = Query("sim", max_length=40, description="Prefixo dos IDs dos dispositivos (ex.: sim-0, sim-1...)"),
+    mode: str = Query("normal", description="Opções: normal, anormal, misto"),
+    count: int = Query(100, ge=1, description="Quantidade de medições por dispositivo"),
+    interval: int = Query(15, ge=0, description="Intervalo das medições em ms (0 para enviar o mais rápido possível)"),
+    batch_size: int = Query(100, ge=1, le=10000, description="Quantidade de medições enviadas por lote"),
+    manager: SimulationManager = Depends(get_simulation_manager),
+    shards: ShardRouter = Depends(get_shard_router),
+):
+    """
+    Inicia uma simulação em segundo plano com vários dispositivos simultâneos, e retorna imediatamente.
+
+    Cada dispositivo é simulado em uma tarefa própria, que envia as medições em lotes pelo caminho
+    de ingestão em lote. O andamento, a vazão (medições por segundo) e os alertas gerados podem ser
+    acompanhados em /api/simulations/{job_id}.
+
+    Com várias instâncias, a simulação só é iniciada se todos os dispositivos pertencerem a esta
+    instância; caso contrário, é redirecionada (307) ou recusada (421), como a ingestão.
+
+    Retorna o estado inicial da simulação, com o seu ID.
+    """
+    if mode not in SIMULATION_MODES:
+        raise HTTPException(status_code=422, detail=f"Modo inválido, opções: {', '.join(SIMULATION_MODES)}")
+    shards.ensure_local(SimulationManager.device_ids(devices, device_prefix))
+    job = manager.start(devices, device_prefix, mode, count, interval, batch_size)
+    return job.to_dict()
+
+@router.get("/simulations")
+def list_simulations(manager: SimulationManager = Depends(get_simulation_manager)):
+    """
+    Retorna as simulações em segundo plano, da mais recente para a mais antiga.
+    """
+    return [job.to_dict() for job in manager.list()]
+
+@router.get("/simulations/{job_id}")
+def get_simulation(job_id: str, manager: SimulationManager = Depends(get_simulation_manager)):
+    """
+    Retorna o estado de uma simulação: andamento, vazão e alertas gerados.
+    """
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulação não encontrada")
+    return job.to_dict()
+
+@router.delete("/simulations/{job_id}")
+async def cancel_simulation(job_id: str, manager: SimulationManager = Depends(get_simulation_manager)):
+    """
+    Cancela uma simulação em execução.
+    """
+    job = await manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulação não encontrada")
+    return job.to_dict()
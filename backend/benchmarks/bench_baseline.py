@@ -0,0 +1,52 @@
+"""
+Compara o cálculo da baseline/anormalidade escalar original (quatro funções trigonométricas
+por medição) com a tabela pré-calculada e com a versão vetorizada em NumPy.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_baseline [--samples 1000000]
+"""
+import argparse
+import json
+import math
+import random
+import time
+import numpy as np
+from utils.baseline import compute_baseline, compute_baseline_array, is_abnormal, is_abnormal_array
+
+def scalar_formula(time_ms: int) -> float:
+    """A implementação original da baseline, avaliando a fórmula a cada medição."""
+    x = time_ms
+    return (-0.06366 +
+            0.12613 * (math.cos(math.pi * x / 500)) +
+            0.12258 * (math.cos(math.pi * x / 250)) +
+            0.01593 * (math.sin(math.pi * x / 500)) +
+            0.03147 * (math.sin(math.pi * x / 250)))
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def run(samples: int) -> dict:
+    """Executa o benchmark e retorna as medições por segundo de cada implementação."""
+    time_ms = [random.randrange(0, 100_000) for _ in range(samples)]
+    values = [random.uniform(-0.2, 0.3) for _ in range(samples)]
+    time_ms_array = np.asarray(time_ms, dtype=np.int64)
+    values_array = np.asarray(values, dtype=np.float64)
+
+    results = {
+        "scalar_formula": _timed(lambda: [is_abnormal(v, scalar_formula(t)) for t, v in zip(time_ms, values)]),
+        "scalar_table": _timed(lambda: [is_abnormal(v, compute_baseline(t)) for t, v in zip(time_ms, values)]),
+        "vectorized": _timed(lambda: is_abnormal_array(values_array, compute_baseline_array(time_ms_array))),
+    }
+    return {
+        "samples": samples,
+        "samples_per_second": {name: samples / elapsed for name, elapsed in results.items()},
+        "speedup_vs_scalar_formula": {name: results["scalar_formula"] / elapsed for name, elapsed in results.items()},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.samples), indent=2))
@@ -0,0 +1,43 @@
+"""
+Benchmark da exportação do histórico: JSON por linha (como /api/measurements/history)
+comparado à exportação colunar em Arrow IPC e Parquet (tamanho e tempo de serialização).
+"""
+import json
+import time
+from benchmarks.common import seed_measurements
+
+def run(rows: int = 200_000, device_id: str = "bench-export") -> dict:
+    """
+    Insere `rows` medições sintéticas em um dispositivo e mede cada formato de exportação.
+
+    Args:
+        rows (int): A quantidade de medições exportadas.
+        device_id (str): O ID do dispositivo usado.
+    """
+    from core.database import SessionLocal
+    from repos.measurementRepository import MeasurementRepository
+    from schemas.measurement import MeasurementResponse
+    from services.historyExport import HistoryExportService
+
+    seed_measurements(device_id, rows)
+    results = {"rows": rows}
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        payload = json.dumps([
+            MeasurementResponse.model_validate(m, from_attributes=True).model_dump(mode="json")
+            for m in MeasurementRepository(db).get_history(device_id)
+        ]).encode()
+        results["json"] = {"bytes": len(payload), "seconds": time.perf_counter() - start}
+
+        for file_format in ("arrow", "parquet"):
+            start = time.perf_counter()
+            size = sum(len(chunk) for chunk in HistoryExportService(db).export("measurements", device_id, 30, file_format))
+            results[file_format] = {"bytes": size, "seconds": time.perf_counter() - start}
+    finally:
+        db.close()
+
+    for file_format in ("arrow", "parquet"):
+        results[file_format]["size_ratio_vs_json"] = results["json"]["bytes"] / results[file_format]["bytes"]
+        results[file_format]["speedup_vs_json"] = results["json"]["seconds"] / results[file_format]["seconds"]
+    return results
@@ -0,0 +1,81 @@
+"""
+Benchmark de ponta a ponta da ingestão por HTTP, com vários dispositivos simulados enviando
+medições simultaneamente.
+
+Sem `base_url`, a aplicação é executada no próprio processo (httpx.ASGITransport); com
+`base_url`, as requisições são enviadas a um servidor em execução (ex.: uvicorn).
+"""
+import asyncio
+import time
+from typing import Optional
+import httpx
+from benchmarks.common import reset_state, summarize
+from utils.frames import FRAME_MEDIA_TYPE, encode_frame
+
+async def _device(client: httpx.AsyncClient, device_id: str, samples: int, batch_size: int, frames: bool, latencies: list, errors: list, sizes: list):
+    """Envia as medições de um dispositivo, uma por requisição, em lotes ou em quadros binários."""
+    for offset in range(0, samples, batch_size):
+        count = min(batch_size, samples - offset)
+        start = time.perf_counter()
+        if frames:
+            response = await client.post(
+                "/api/measurements/frame",
+                content=encode_frame(device_id, [(offset + i) * 15 for i in range(count)], [0.1] * count),
+                headers={"Content-Type": FRAME_MEDIA_TYPE},
+            )
+        elif batch_size == 1:
+            response = await client.post("/api/measurements", params={"device_id": device_id, "time_ms": offset * 15, "value": 0.1})
+        else:
+            response = await client.post("/api/measurements/batch", json=[
+                {"device_id": device_id, "time_ms": (offset + i) * 15, "value": 0.1} for i in range(count)
+            ])
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(response.request.content) + len(response.content))
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+
+async def _run(base_url: Optional[str], devices: int, samples: int, batch_size: int, frames: bool) -> dict:
+    if base_url:
+        transport = None
+    else:
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    latencies, errors, sizes = [], [], []
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _device(client, f"bench-http-{d}", samples, batch_size, frames, latencies, errors, sizes)
+            for d in range(devices)
+        ))
+        elapsed = time.perf_counter() - start
+
+    sent = devices * samples
+    return {
+        "devices": devices,
+        "samples_per_device": samples,
+        "batch_size": batch_size,
+        "frames": frames,
+        "request_latency": summarize(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "samples_per_second": sent / elapsed,
+        # Bytes do corpo da requisição e da resposta, por medição (sem os cabeçalhos HTTP)
+        "body_bytes_per_sample": sum(sizes) / sent,
+        "errors": len(errors),
+    }
+
+def run(base_url: Optional[str] = None, devices: int = 20, samples: int = 200, batch_size: int = 1, frames: bool = False) -> dict:
+    """
+    Executa o benchmark de ingestão por HTTP.
+
+    Args:
+        base_url (Optional[str]): A URL de um servidor em execução; se None, usa a aplicação no próprio processo.
+        devices (int): A quantidade de dispositivos simultâneos.
+        samples (int): A quantidade de medições por dispositivo.
+        batch_size (int): A quantidade de medições por requisição (1 usa POST /api/measurements).
+        frames (bool): Envia as medições no formato binário (POST /api/measurements/frame).
+    """
+    if not base_url:
+        reset_state()
+    return asyncio.run(_run(base_url, devices, samples, batch_size, frames))
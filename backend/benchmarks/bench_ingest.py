@@ -0,0 +1,90 @@
+"""
+Benchmark da ingestão pelo serviço (sem HTTP): latência por medição e vazão em lote.
+"""
+import asyncio
+import time
+from benchmarks.common import reset_state, summarize
+
+def run_sync(samples: int = 2000, devices: int = 10) -> dict:
+    """Latência por medição de MeasurementService.process_measurement (sessão síncrona)."""
+    from core.database import SessionLocal
+    from repos.measurementRepository import MeasurementRepository
+    from repos.irregularityRepository import IrregularityRepository
+    from repos.rollupRepository import RollupRepository
+    from repos.deviceStatusRepository import DeviceStatusRepository
+    from services.measurementService import MeasurementService
+
+    reset_state()
+    db = SessionLocal()
+    try:
+        service = MeasurementService(
+            MeasurementRepository(db), IrregularityRepository(db),
+            rollup_repo=RollupRepository(db), status_repo=DeviceStatusRepository(db),
+        )
+        latencies = []
+        for i in range(samples):
+            start = time.perf_counter()
+            service.process_measurement(f"bench-sync-{i % devices}", i * 15, 0.1)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        db.close()
+    return {**summarize(latencies), "samples_per_second": samples / sum(latencies)}
+
+def run_async(samples: int = 2000, devices: int = 10) -> dict:
+    """Latência por medição de AsyncMeasurementService.process_measurement, com dispositivos simultâneos."""
+    from core.database import AsyncSessionLocal
+    from api.deps import build_async_measurement_service
+
+    reset_state()
+    latencies = []
+
+    async def device(index: int, count: int):
+        async with AsyncSessionLocal() as db:
+            service = build_async_measurement_service(db)
+            for i in range(count):
+                start = time.perf_counter()
+                await service.process_measurement(f"bench-async-{index}", i * 15, 0.1)
+                latencies.append(time.perf_counter() - start)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(device(d, samples // devices) for d in range(devices)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+    return {**summarize(latencies), "samples_per_second": len(latencies) / elapsed}
+
+def run_batch(samples: int = 100_000, batch_size: int = 1000, devices: int = 10) -> dict:
+    """Vazão e latência por lote de AsyncMeasurementService.process_batch."""
+    from core.database import AsyncSessionLocal
+    from api.deps import build_async_measurement_service
+
+    reset_state()
+    batch = [
+        {"device_id": f"bench-batch-{i % devices}", "time_ms": i * 15, "value": 0.1}
+        for i in range(batch_size)
+    ]
+    latencies = []
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            service = build_async_measurement_service(db)
+            for _ in range(samples // batch_size):
+                start = time.perf_counter()
+                await service.process_batch(batch)
+                latencies.append(time.perf_counter() - start)
+
+    asyncio.run(main())
+    return {
+        "batch_size": batch_size,
+        "batch_latency": summarize(latencies),
+        "samples_per_second": len(latencies) * batch_size / sum(latencies),
+    }
+
+def run(samples: int = 2000, batch_samples: int = 100_000) -> dict:
+    """Executa os benchmarks de ingestão pelo serviço."""
+    return {
+        "process_measurement_sync": run_sync(samples),
+        "process_measurement_async": run_async(samples),
+        "process_batch": run_batch(batch_samples),
+    }
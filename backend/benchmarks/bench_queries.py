@@ -0,0 +1,52 @@
+"""
+Benchmark das consultas do histórico sobre um dispositivo com muitas medições.
+"""
+import time
+from benchmarks.common import seed_measurements, summarize
+
+def _measure(fn, repeat: int) -> dict:
+    latencies = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn()
+        latencies.append(time.perf_counter() - start)
+    return {**summarize(latencies), "rows": rows}
+
+def run(rows: int = 1_000_000, repeat: int = 20, device_id: str = "bench-history") -> dict:
+    """
+    Insere `rows` medições sintéticas em um dispositivo e mede as consultas de histórico.
+
+    Args:
+        rows (int): A quantidade de medições do dispositivo (ex.: 1M localmente, 100M em um MySQL dedicado).
+        repeat (int): A quantidade de repetições das consultas rápidas.
+        device_id (str): O ID do dispositivo usado.
+    """
+    from core.database import SessionLocal
+    from repos.measurementRepository import MeasurementRepository
+    from repos.rollupRepository import RollupRepository
+
+    results = {"rows": rows, "seed_rows_per_second": seed_measurements(device_id, rows)}
+    db = SessionLocal()
+    try:
+        repo = MeasurementRepository(db)
+        results["get_last_n_60"] = _measure(lambda: len(repo.get_last_n(device_id, 60)), repeat)
+        results["get_history_page_1000"] = _measure(lambda: len(repo.get_history_page(device_id, limit=1000)), repeat)
+        results["get_history_buckets_raw_1h"] = _measure(lambda: len(repo.get_history_buckets(device_id, 3600)), 3)
+        results["get_history_buckets_rollup_1h"] = _measure(
+            lambda: len(RollupRepository(db).get_history_buckets(device_id, 3600)), repeat,
+        )
+
+        # Consultas que percorrem o histórico inteiro são executadas uma única vez
+        start = time.perf_counter()
+        streamed = sum(1 for _ in repo.iter_history(device_id))
+        elapsed = time.perf_counter() - start
+        results["iter_history"] = {"rows": streamed, "seconds": elapsed, "rows_per_second": streamed / elapsed}
+
+        start = time.perf_counter()
+        loaded = len(repo.get_history(device_id))
+        elapsed = time.perf_counter() - start
+        results["get_history"] = {"rows": loaded, "seconds": elapsed, "rows_per_second": loaded / elapsed}
+    finally:
+        db.close()
+    return results
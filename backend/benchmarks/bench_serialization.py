@@ -0,0 +1,52 @@
+"""
+Benchmark da serialização do histórico: o caminho original (entidades ORM validadas uma a uma
+pelo response_model do FastAPI) comparado às tuplas de colunas codificadas com orjson e MessagePack.
+"""
+import time
+from benchmarks.common import seed_measurements
+
+def run(rows: int = 100_000, device_id: str = "bench-serialization") -> dict:
+    """
+    Insere `rows` medições sintéticas em um dispositivo e mede cada caminho (consulta + serialização).
+
+    Args:
+        rows (int): A quantidade de medições serializadas.
+        device_id (str): O ID do dispositivo usado.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from core.database import SessionLocal
+    from repos.measurementRepository import MeasurementRepository
+    from schemas.measurement import MeasurementResponse
+    from api.endpoints.measurements import HISTORY_FIELDS
+    from utils.serialization import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, dumps, encode_rows
+
+    seed_measurements(device_id, rows)
+    adapter = TypeAdapter(list[MeasurementResponse])
+
+    def orm_pydantic(repo):
+        # Equivalente ao response_model=list[MeasurementResponse]: valida cada entidade e converte para JSON
+        history = repo.get_history(device_id)
+        return dumps(jsonable_encoder(adapter.validate_python(history, from_attributes=True)))
+
+    paths = {
+        "orm_pydantic": orm_pydantic,
+        "rows_orjson": lambda repo: encode_rows(HISTORY_FIELDS, repo.get_history_rows(device_id), JSON_MEDIA_TYPE),
+        "rows_msgpack": lambda repo: encode_rows(HISTORY_FIELDS, repo.get_history_rows(device_id), MSGPACK_MEDIA_TYPE),
+    }
+
+    results = {"rows": rows}
+    db = SessionLocal()
+    try:
+        for name, path in paths.items():
+            db.expunge_all()
+            start = time.perf_counter()
+            body = path(MeasurementRepository(db))
+            elapsed = time.perf_counter() - start
+            results[name] = {"seconds": elapsed, "rows_per_second": rows / elapsed, "bytes": len(body)}
+    finally:
+        db.close()
+
+    for name in paths:
+        results[name]["speedup_vs_orm_pydantic"] = results["orm_pydantic"]["seconds"] / results[name]["seconds"]
+    return results
@@ -0,0 +1,30 @@
+"""
+Benchmark da máquina de estados das irregularidades (janela deslizante em memória).
+"""
+import random
+import time
+from services.deviceState import DeviceState
+
+def run(samples: int = 1_000_000, abnormal_ratio: float = 0.05) -> dict:
+    """
+    Mede a vazão e a latência de DeviceState.push com medições aleatórias.
+
+    Args:
+        samples (int): A quantidade de medições.
+        abnormal_ratio (float): A proporção de medições anormais.
+    """
+    rng = random.Random(0)
+    flags = [rng.random() < abnormal_ratio for _ in range(samples)]
+    state = DeviceState()
+    alerts = 0
+    start = time.perf_counter()
+    for flag in flags:
+        if state.push(flag) is not None:
+            alerts += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "samples": samples,
+        "alerts": alerts,
+        "samples_per_second": samples / elapsed,
+        "mean_latency_us": elapsed / samples * 1e6,
+    }
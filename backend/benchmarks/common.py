@@ -0,0 +1,98 @@
+"""
+Funções auxiliares comuns aos benchmarks: banco de dados, dados sintéticos e estatísticas.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+def configure_database(database_url: str = None) -> str:
+    """
+    Define a DATABASE_URL usada pelos módulos da aplicação. Deve ser chamada antes de importá-los.
+
+    Args:
+        database_url (str): A URL do banco; se vazia, usa um banco SQLite temporário.
+
+    Returns:
+        str: A URL configurada.
+    """
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = database_url
+    return database_url
+
+def create_schema() -> None:
+    """Cria os engines da aplicação e aplica as migrações no banco configurado."""
+    from core.database import init_engine
+    from core.migrations import migrate
+    migrate(init_engine())
+
+def reset_state() -> None:
+    """Descarta o estado em memória dos dispositivos, como em um processo novo."""
+    from services.deviceState import device_states
+    device_states.clear()
+
+def summarize(latencies: List[float]) -> dict:
+    """
+    Resume uma lista de latências (em segundos) em p50/p90/p99/média/máximo, em milissegundos.
+    """
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+@contextmanager
+def timer(results: dict, key: str) -> Iterator[None]:
+    """Mede o tempo do bloco e o registra em `results[key]`, em segundos."""
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+def seed_measurements(device_id: str, rows: int, days: int = 30, chunk_size: int = 50_000) -> float:
+    """
+    Insere medições sintéticas de um dispositivo, distribuídas uniformemente nos últimos `days` dias,
+    junto com os agregados por minuto e por hora.
+
+    Returns:
+        float: As linhas inseridas por segundo.
+    """
+    from core.database import SessionLocal
+    from repos.measurementRepository import MeasurementRepository
+    from repos.rollupRepository import RollupRepository
+    from utils.baseline import compute_baseline, is_abnormal
+
+    start_time = datetime.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(rows, 1)
+    rng = random.Random(0)
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        repo = MeasurementRepository(db)
+        for offset in range(0, rows, chunk_size):
+            chunk = [
+                {"device_id": device_id, "time_ms": (i * 15) % 1000, "value": rng.uniform(-0.2, 0.3), "timestamp": start_time + step * i}
+                for i in range(offset, min(offset + chunk_size, rows))
+            ]
+            # Os agregados são mantidos junto com as medições, como na ingestão
+            RollupRepository(db).accumulate([
+                {**m, "abnormal": is_abnormal(m["value"], compute_baseline(m["time_ms"]))} for m in chunk
+            ])
+            repo.create_many(chunk)
+    finally:
+        db.close()
+    return rows / (time.perf_counter() - start)
@@ -0,0 +1,80 @@
+"""
+Executa a suíte de benchmarks da ingestão e das consultas e imprime um relatório em JSON
+(latências p50/p99 e vazão), para comparar versões do servidor.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.run [--database-url URL] [--only state,ingest,queries,http,export,serialization]
+                             [--rows 1000000] [--samples 2000] [--devices 20]
+                             [--base-url http://localhost:8000] [--output relatorio.json]
+
+Sem --database-url, usa um banco SQLite temporário. Para volumes como 100M de medições,
+aponte --database-url para um MySQL dedicado (os dados sintéticos são inseridos nele).
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from benchmarks.common import configure_database, create_schema
+
+BENCHMARKS = ("state", "ingest", "queries", "http", "export", "serialization")
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Benchmarks executados, separados por vírgula")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Medições do dispositivo usado nas consultas")
+    parser.add_argument("--samples", type=int, default=2000, help="Medições por benchmark de ingestão individual")
+    parser.add_argument("--batch-samples", type=int, default=100_000, help="Medições do benchmark de ingestão em lote")
+    parser.add_argument("--devices", type=int, default=20, help="Dispositivos simultâneos no benchmark HTTP")
+    parser.add_argument("--http-samples", type=int, default=200, help="Medições por dispositivo no benchmark HTTP")
+    parser.add_argument("--batch-size", type=int, default=1, help="Medições por requisição no benchmark HTTP")
+    parser.add_argument("--frames", action="store_true", help="Usa o formato binário (POST /api/measurements/frame) no benchmark HTTP")
+    parser.add_argument("--export-rows", type=int, default=200_000, help="Medições do benchmark de exportação")
+    parser.add_argument("--serialization-rows", type=int, default=100_000, help="Medições do benchmark de serialização")
+    parser.add_argument("--base-url", default=None, help="Servidor em execução para o benchmark HTTP")
+    parser.add_argument("--output", default=None, help="Arquivo do relatório (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Benchmarks desconhecidos: {', '.join(sorted(unknown))}")
+
+    # A URL do banco precisa ser definida antes de importar os módulos da aplicação
+    database_url = configure_database(args.database_url)
+    create_schema()
+    from benchmarks import bench_export, bench_http, bench_ingest, bench_queries, bench_serialization, bench_state_machine
+    from core.database import get_engine
+
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": get_engine().dialect.name,
+        "results": {},
+    }
+    if "state" in selected:
+        report["results"]["state_machine"] = bench_state_machine.run()
+    if "ingest" in selected:
+        report["results"]["ingest"] = bench_ingest.run(args.samples, args.batch_samples)
+    if "queries" in selected:
+        report["results"]["queries"] = bench_queries.run(args.rows)
+    if "http" in selected:
+        report["results"]["http"] = bench_http.run(args.base_url, args.devices, args.http_samples, args.batch_size, args.frames)
+    if "export" in selected:
+        report["results"]["export"] = bench_export.run(args.export_rows)
+    if "serialization" in selected:
+        report["results"]["serialization"] = bench_serialization.run(args.serialization_rows)
+    report["finished_at"] = datetime.now().isoformat()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return report
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,150 @@
+"""
+Comandos de manutenção do servidor HBM+.
+
+Uso (a partir da pasta backend):
+    python cli.py migrate [--timeout 60]
+    python cli.py partitions
+    python cli.py retention [--days 90] [--archive-dir /arquivo] [--format csv|parquet] [--dry-run]
+    python cli.py export measurements|irregularities --output arquivo [--device-id ID] [--days 30] [--format arrow|parquet]
+    python cli.py import measurements|irregularities arquivo
+    python cli.py replay [--device-id ID ...] [--days 30] [--deviation 0.2 0.25] [--open-count 5] [--close-samples 60] [--workers N] [--summary]
+"""
+import argparse
+import itertools
+import json
+import sys
+from core.config import Settings
+
+def migrate_command(args) -> dict:
+    """Cria o banco de dados, se necessário, e aplica as migrações pendentes do esquema."""
+    from core.database import get_engine
+    from core.migrations import migrate, wait_for_database
+
+    return {"applied": wait_for_database(get_engine(), migrate, args.timeout)}
+
+def partitions_command(args) -> dict:
+    """Particiona a tabela de medições por dia (MySQL) e cria as partições futuras."""
+    from core.database import database_lock, get_engine
+    from services.partitioning import MeasurementPartitions
+    from services.retention import MAINTENANCE_LOCK
+
+    partitions = MeasurementPartitions(get_engine(), args.days_ahead)
+    if not partitions.supported:
+        return {"supported": False, "executed": []}
+    with database_lock(get_engine(), MAINTENANCE_LOCK) as acquired:
+        if not acquired:
+            return {"supported": True, "skipped": "Manutenção em execução por outro processo"}
+        executed = partitions.ensure()
+    return {"supported": True, "executed": executed, "days": [d.isoformat() for d in partitions.list_days()]}
+
+def retention_command(args) -> dict:
+    """Arquiva e remove as medições mais antigas que o período de retenção."""
+    from core.database import SessionLocal, database_lock, get_engine
+    from services.partitioning import MeasurementPartitions
+    from services.retention import MAINTENANCE_LOCK, RetentionService
+
+    service = RetentionService(
+        SessionLocal,
+        args.days,
+        archive_dir=args.archive_dir or None,
+        archive_format=args.format,
+        partitions=MeasurementPartitions(get_engine()),
+    )
+    with database_lock(get_engine(), MAINTENANCE_LOCK) as acquired:
+        if not acquired:
+            return {"cutoff": service.cutoff().isoformat(), "skipped": "Manutenção em execução por outro processo"}
+        return {"cutoff": service.cutoff().isoformat(), "days": service.run(dry_run=args.dry_run)}
+
+def export_command(args) -> dict:
+    """Exporta o histórico em Arrow IPC ou Parquet para um arquivo."""
+    from core.database import SessionLocal
+    from services.historyExport import HistoryExportService
+
+    size = 0
+    with SessionLocal() as db, open(args.output, "wb") as f:
+        for chunk in HistoryExportService(db).export(args.kind, args.device_id, args.days, args.format):
+            f.write(chunk)
+            size += len(chunk)
+    return {"kind": args.kind, "output": args.output, "bytes": size}
+
+def import_command(args) -> dict:
+    """Importa um arquivo Arrow IPC ou Parquet exportado para o banco."""
+    from core.database import SessionLocal
+    from services.historyExport import HistoryExportService
+
+    with SessionLocal() as db, open(args.path, "rb") as f:
+        rows = HistoryExportService(db).import_file(args.kind, f)
+    return {"kind": args.kind, "rows": rows}
+
+def replay_command(args) -> list:
+    """Reprocessa o histórico com os limites informados (todas as combinações), sem gravar no banco."""
+    from services.replay import DetectionThresholds, ReplayEngine
+
+    # Parâmetros não informados usam os valores da ingestão
+    defaults = DetectionThresholds()
+    thresholds = [
+        DetectionThresholds(*values)
+        for values in itertools.product(*(getattr(args, name) or [getattr(defaults, name)] for name in DetectionThresholds._fields))
+    ]
+    engine = ReplayEngine(Settings.DATABASE_URL, chunk_size=args.chunk_size, workers=args.workers)
+    report = engine.run(thresholds, args.device_id, args.days)
+    if args.summary:
+        for entry in report:
+            for device in entry["devices"]:
+                del device["intervals"]
+    return report
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="Cria o banco e aplica as migrações do esquema")
+    migrate.add_argument("--timeout", type=float, default=Settings.DB_CONNECT_TIMEOUT_SECONDS, help="Espera máxima pelo banco, em segundos")
+    migrate.set_defaults(handler=migrate_command)
+
+    partitions = commands.add_parser("partitions", help="Particiona a tabela de medições por dia (MySQL)")
+    partitions.add_argument("--days-ahead", type=int, default=Settings.PARTITION_DAYS_AHEAD)
+    partitions.set_defaults(handler=partitions_command)
+
+    retention = commands.add_parser("retention", help="Arquiva e remove as medições expiradas")
+    retention.add_argument("--days", type=int, default=Settings.RETENTION_DAYS or 90, help="Dias mantidos no banco")
+    retention.add_argument("--archive-dir", default=Settings.RETENTION_ARCHIVE_DIR, help="Pasta dos arquivos (vazia para não arquivar)")
+    retention.add_argument("--format", choices=("csv", "parquet"), default=Settings.RETENTION_ARCHIVE_FORMAT)
+    retention.add_argument("--dry-run", action="store_true", help="Apenas lista os dias expirados")
+    retention.set_defaults(handler=retention_command)
+
+    export = commands.add_parser("export", help="Exporta o histórico em Arrow IPC ou Parquet")
+    export.add_argument("kind", choices=("measurements", "irregularities"))
+    export.add_argument("--output", required=True)
+    export.add_argument("--device-id", default=None, help="Dispositivo exportado (padrão: todos)")
+    export.add_argument("--days", type=int, default=30)
+    export.add_argument("--format", choices=("arrow", "parquet"), default="parquet")
+    export.set_defaults(handler=export_command)
+
+    import_ = commands.add_parser("import", help="Importa um arquivo Arrow IPC ou Parquet exportado")
+    import_.add_argument("kind", choices=("measurements", "irregularities"))
+    import_.add_argument("path")
+    import_.set_defaults(handler=import_command)
+
+    replay = commands.add_parser("replay", help="Reprocessa o histórico com outros limites de detecção")
+    replay.add_argument("--device-id", action="append", default=None, help="Dispositivo reprocessado (repetível; padrão: todos)")
+    replay.add_argument("--days", type=int, default=30)
+    replay.add_argument("--deviation", type=float, nargs="+", default=None)
+    replay.add_argument("--window-size", type=int, nargs="+", default=None)
+    replay.add_argument("--open-count", type=int, nargs="+", default=None)
+    replay.add_argument("--close-samples", type=int, nargs="+", default=None)
+    replay.add_argument("--workers", type=int, default=None, help="Processos em paralelo (padrão: um por núcleo)")
+    replay.add_argument("--chunk-size", type=int, default=50000)
+    replay.add_argument("--summary", action="store_true", help="Omite as irregularidades de cada dispositivo")
+    replay.set_defaults(handler=replay_command)
+    return parser
+
+def main(argv=None) -> None:
+    from core.database import init_engine
+
+    args = build_parser().parse_args(argv)
+    init_engine()
+    print(json.dumps(args.handler(args), indent=2, default=str))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,229 @@
+"""
+Cache das leituras por dispositivo (histórico e irregularidades), invalidado pelas gravações.
+
+As entradas de um dispositivo incluem na chave a sua "geração"; invalidar o dispositivo troca a
+geração, e as entradas antigas deixam de ser encontradas (e expiram pelo TTL/LRU). Assim a
+invalidação funciona com qualquer backend, sem precisar listar ou remover chaves por prefixo.
+
+A invalidação só alcança os outros processos se o backend for compartilhado entre eles (um
+backend externo, configurado como "modulo:fabrica"). O backend "memory" é local ao processo:
+com vários workers do uvicorn ou várias instâncias da API, cada processo continuaria respondendo
+as leituras já guardadas, sem ver as gravações dos demais, até o TTL. Por isso o padrão ("auto")
+usa a memória apenas com um único processo, e desativa o cache nos demais casos.
+
+Os repositórios marcam os dispositivos alterados na sessão, e a invalidação acontece no commit
+da sessão: uma leitura concorrente nunca guarda dados anteriores a uma gravação já confirmada.
+"""
+import hashlib
+import importlib
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from core.config import Settings
+from core import metrics
+
+class CacheBackend:
+    """
+    Interface dos backends do cache. Um backend externo (ex.: Redis) deve implementar estes
+    métodos e ser configurado em CACHE_BACKEND como "modulo:fabrica".
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        """Retorna o valor da chave, ou None se não existir ou tiver expirado."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Define o valor da chave, com validade de `ttl` segundos."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove a chave, se existir."""
+        raise NotImplementedError
+
+def _entry_size(value: Any) -> int:
+    """Tamanho aproximado de um valor em memória: o corpo das respostas, ou o tamanho do objeto."""
+    body = getattr(value, "body", None)
+    return len(body) if body is not None else sys.getsizeof(value)
+
+class MemoryCache(CacheBackend):
+    """
+    Cache em memória do processo, com descarte do menos usado (LRU) e validade por entrada (TTL),
+    limitado pela quantidade de entradas e pelo total de bytes (as respostas do histórico podem ser grandes).
+    """
+
+    def __init__(self, maxsize: int = 1024, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            maxsize (int): A quantidade máxima de entradas.
+            max_bytes (int): O total máximo de bytes das entradas; um valor maior que isso não é guardado.
+        """
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        size = _entry_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.maxsize or self.total_bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Remove todas as entradas."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class CachedResponse:
+    """Corpo serializado de uma leitura, o seu formato e o seu ETag."""
+
+    __slots__ = ("body", "media_type", "etag")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+class ResponseCache:
+    """
+    Cache das respostas de leitura por dispositivo e parâmetros da consulta.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float = 30.0, max_entry_bytes: int = 8 * 1024 * 1024):
+        """
+        Args:
+            backend (Optional[CacheBackend]): O backend; se None, o cache fica desativado (apenas gera o ETag).
+            ttl (float): A validade das entradas, em segundos.
+            max_entry_bytes (int): O tamanho máximo de uma resposta guardada; as maiores são sempre recalculadas.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+
+    def _generation(self, device_id: str) -> str:
+        key = f"generation:{device_id}"
+        generation = self.backend.get(key)
+        if generation is None:
+            # Sem geração (primeiro uso, expirada ou descartada pelo backend), começa uma nova:
+            # as entradas antigas do dispositivo nunca são reaproveitadas
+            generation = uuid.uuid4().hex
+            self.backend.set(key, generation, self.ttl * 2)
+        return generation
+
+    def get_or_compute(self, namespace: str, device_id: str, params: dict, media_type: str, compute: Callable[[], bytes]) -> CachedResponse:
+        """
+        Retorna a resposta em cache ou a calcula e guarda.
+
+        Args:
+            namespace (str): O tipo da leitura (ex.: "history").
+            device_id (str): O ID do dispositivo.
+            params (dict): Os demais parâmetros da consulta.
+            media_type (str): O formato da resposta (faz parte da chave).
+            compute (Callable[[], bytes]): Calcula o corpo da resposta, já serializado no formato.
+
+        Returns:
+            CachedResponse: O corpo da resposta e o seu ETag.
+        """
+        if self.backend is None:
+            return CachedResponse(compute(), media_type)
+
+        # A geração é lida antes de consultar o banco: se houver uma gravação no meio, a entrada
+        # é guardada com a geração antiga e descartada pela invalidação
+        key = f"{namespace}:{device_id}:{self._generation(device_id)}:{media_type}:{json.dumps(params, sort_keys=True)}"
+        cached = self.backend.get(key)
+        if cached is not None:
+            metrics.cache_requests.inc(namespace=namespace, result="hit")
+            return cached
+
+        metrics.cache_requests.inc(namespace=namespace, result="miss")
+        response = CachedResponse(compute(), media_type)
+        if len(response.body) <= self.max_entry_bytes:
+            self.backend.set(key, response, self.ttl)
+        return response
+
+    def invalidate(self, device_ids: Iterable[str]) -> None:
+        """Invalida todas as entradas dos dispositivos."""
+        if self.backend is None:
+            return
+        for device_id in device_ids:
+            self.backend.set(f"generation:{device_id}", uuid.uuid4().hex, self.ttl * 2)
+
+def build_backend(spec: str, maxsize: int, max_bytes: int = 256 * 1024 * 1024) -> Optional[CacheBackend]:
+    """
+    Cria o backend configurado: "auto", "memory", "none" (desativado) ou "modulo:fabrica" (backend externo).
+
+    Com "auto", usa "memory" se a API for executada em um único processo, e "none" com vários workers
+    (WEB_CONCURRENCY) ou várias instâncias (SHARD_NODES), em que o cache local ficaria desatualizado.
+    """
+    if spec == "auto":
+        single_process = Settings.WEB_CONCURRENCY <= 1 and not Settings.SHARD_NODES.strip()
+        spec = "memory" if single_process else "none"
+    if spec == "none":
+        return None
+    if spec == "memory":
+        return MemoryCache(maxsize, max_bytes)
+    module_name, _, factory = spec.partition(":")
+    return getattr(importlib.import_module(module_name), factory)()
+
+response_cache = ResponseCache(
+    build_backend(Settings.CACHE_BACKEND, Settings.CACHE_MAX_ENTRIES, Settings.CACHE_MAX_BYTES),
+    Settings.CACHE_TTL_SECONDS,
+    Settings.CACHE_MAX_ENTRY_BYTES,
+)
+
+def mark_changed(db, device_ids: Iterable[str]) -> None:
+    """
+    Marca os dispositivos alterados na transação atual da sessão; o cache deles é invalidado no commit.
+
+    Args:
+        db (Session | AsyncSession): A sessão em que as gravações foram feitas.
+        device_ids (Iterable[str]): Os IDs dos dispositivos alterados.
+    """
+    db.info.setdefault("cache_changed_devices", set()).update(device_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    device_ids = session.info.pop("cache_changed_devices", None)
+    if device_ids:
+        response_cache.invalidate(device_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("cache_changed_devices", None)
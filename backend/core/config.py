@@ -2,3 +2,59 @@ import os
 
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # URL do banco para o driver assíncrono; se não definida, é derivada da DATABASE_URL
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL")
+
+    # Modo de ingestão: "direct" (grava antes de responder) ou "write_behind" (responde e grava em segundo plano)
+    INGEST_MODE: str = os.getenv("INGEST_MODE", "direct")
+    # Capacidade da fila de gravação em segundo plano, em medições
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "100000"))
+    # A fila é gravada a cada INGEST_FLUSH_INTERVAL_MS ou quando acumula INGEST_FLUSH_ROWS medições
+    INGEST_FLUSH_INTERVAL_MS: int = int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "50"))
+    INGEST_FLUSH_ROWS: int = int(os.getenv("INGEST_FLUSH_ROWS", "5000"))
+    # Novas tentativas de gravar um lote que falhou, e a espera antes da primeira (dobra a cada tentativa)
+    INGEST_FLUSH_RETRIES: int = int(os.getenv("INGEST_FLUSH_RETRIES", "3"))
+    INGEST_RETRY_DELAY_MS: int = int(os.getenv("INGEST_RETRY_DELAY_MS", "100"))
+    # Tempo máximo de espera por espaço na fila antes de recusar a medição (HTTP 503)
+    INGEST_ENQUEUE_TIMEOUT_MS: int = int(os.getenv("INGEST_ENQUEUE_TIMEOUT_MS", "1000"))
+
+    # Consultas mais lentas que SLOW_QUERY_MS são registradas no log (0 desativa)
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+    # Particionamento diário da tabela de medições (apenas MySQL), com partições criadas antecipadamente
+    PARTITION_MEASUREMENTS: bool = os.getenv("PARTITION_MEASUREMENTS", "false").lower() in ("1", "true", "yes")
+    PARTITION_DAYS_AHEAD: int = int(os.getenv("PARTITION_DAYS_AHEAD", "7"))
+    # Retenção das medições brutas, em dias (0 desativa); os dias expirados são arquivados antes de removidos
+    RETENTION_DAYS: int = int(os.getenv("RETENTION_DAYS", "0"))
+    # Pasta dos arquivos (vazia para remover sem arquivar) e formato: "csv" (CSV com gzip) ou "parquet"
+    RETENTION_ARCHIVE_DIR: str = os.getenv("RETENTION_ARCHIVE_DIR", "")
+    RETENTION_ARCHIVE_FORMAT: str = os.getenv("RETENTION_ARCHIVE_FORMAT", "csv")
+    # Intervalo da manutenção periódica (partições e retenção) executada pela API (0 desativa)
+    RETENTION_INTERVAL_HOURS: float = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+
+    # Cache das leituras de histórico e irregularidades: "auto", "memory", "none" ou "modulo:fabrica" (backend
+    # externo, compartilhado entre processos). "memory" é local ao processo e só é correto com um único worker;
+    # "auto" usa "memory" com um único processo e desativa o cache com vários workers ou instâncias
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "auto")
+    # Quantidade de workers do uvicorn (a mesma variável lida pelo uvicorn para --workers)
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    # Total de bytes do cache em memória, e o tamanho máximo de uma resposta guardada (as maiores não são guardadas)
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    CACHE_MAX_ENTRY_BYTES: int = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+
+    # Afinidade de dispositivos entre as instâncias da API: URLs base de todas as instâncias, separadas
+    # por vírgula (vazio desativa), e a URL desta instância. Cada dispositivo é processado por uma única instância
+    SHARD_NODES: str = os.getenv("SHARD_NODES", "")
+    SHARD_SELF: str = os.getenv("SHARD_SELF", "")
+
+    # Ingestão por UDP no formato binário compacto (utils.frames): porta de escuta (0 desativa) e endereço
+    UDP_INGEST_PORT: int = int(os.getenv("UDP_INGEST_PORT", "0"))
+    UDP_INGEST_HOST: str = os.getenv("UDP_INGEST_HOST", "0.0.0.0")
+
+    # Aplica as migrações do esquema na inicialização da API (desativado por padrão: as migrações são
+    # aplicadas uma única vez, com `python cli.py migrate`, antes de iniciar os workers)
+    AUTO_MIGRATE: bool = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+    # Tempo máximo de espera pelo banco de dados na inicialização, em segundos
+    DB_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", "60"))
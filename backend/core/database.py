@@ -1,16 +1,191 @@
-from sqlalchemy import create_engine
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy_utils import database_exists, create_database
+from sqlalchemy.orm import Session, sessionmaker
 from core.config import Settings
+from core import metrics
 
-DATABASE_URL = Settings.DATABASE_URL
+logger = logging.getLogger(__name__)
 
-engine = create_engine(DATABASE_URL)
+# Driver assíncrono equivalente a cada backend suportado
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+}
 
-if not database_exists(engine.url):
-    create_database(engine.url)
+def to_async_url(url) -> URL:
+    """Converte a URL de conexão síncrona para a URL equivalente com driver assíncrono.
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Args:
+        url (str | URL): A URL de conexão síncrona (ex.: mysql+mysqlconnector://...).
+
+    Returns:
+        URL: A URL com o driver assíncrono (ex.: mysql+aiomysql://...).
+    """
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+# Os engines são criados por init_engine (na inicialização da API, na CLI ou nos testes), e não na
+# importação: importar os módulos não abre conexões com o banco de dados
+engine = None
+async_engine = None
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def init_engine(database_url: Optional[str] = None, async_database_url: Optional[str] = None, **engine_options) -> Engine:
+    """
+    Cria os engines síncrono e assíncrono e associa as fábricas de sessões a eles.
+    Nenhuma conexão é aberta: a primeira acontece no primeiro uso.
+
+    Args:
+        database_url (Optional[str]): A URL do banco (padrão: DATABASE_URL).
+        async_database_url (Optional[str]): A URL assíncrona (padrão: ASYNC_DATABASE_URL, ou derivada da síncrona).
+        **engine_options: Opções adicionais dos engines (ex.: poolclass).
+
+    Returns:
+        Engine: O engine síncrono.
+    """
+    global engine, async_engine
+    engine = create_engine(database_url or Settings.DATABASE_URL, **engine_options)
+    async_url = async_database_url or (Settings.ASYNC_DATABASE_URL if database_url is None else None) or to_async_url(engine.url)
+    async_engine = create_async_engine(async_url, **engine_options)
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+    SessionLocal.configure(bind=engine)
+    AsyncSessionLocal.configure(bind=async_engine)
+    return engine
+
+def get_engine() -> Engine:
+    """Retorna o engine síncrono, criando-o com a configuração padrão se ainda não existir."""
+    return engine if engine is not None else init_engine()
 
 Base = declarative_base()
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+@contextmanager
+def database_lock(bind: Engine, name: str, timeout: float = 0) -> Iterator[bool]:
+    """
+    Trava nomeada, compartilhada por todos os processos que usam o banco, para tarefas que devem
+    ser executadas por um único processo de cada vez (ex.: a manutenção das medições, iniciada por
+    todos os workers e instâncias da API).
+
+    No MySQL, usa GET_LOCK, mantida pela conexão durante o bloco (e liberada pelo banco se a conexão
+    cair). Nos demais bancos (ex.: SQLite, local a um único servidor), a trava vale apenas no processo.
+
+    Args:
+        bind (Engine): O engine do banco de dados.
+        name (str): O nome da trava.
+        timeout (float): A espera máxima pela trava, em segundos (0: não aguarda).
+
+    Yields:
+        bool: True se a trava foi obtida; se False, outro processo está executando a tarefa.
+    """
+    if bind.dialect.name == "mysql":
+        with bind.connect() as conn:
+            acquired = conn.scalar(text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout}) == 1
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    conn.scalar(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+        return
+
+    with _local_locks_guard:
+        lock = _local_locks.setdefault(name, threading.Lock())
+    acquired = lock.acquire(timeout=timeout) if timeout > 0 else lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+_TABLE_PATTERNS = {
+    "SELECT": re.compile(r"\bFROM\s+[`\"]?(\w+)", re.IGNORECASE),
+    "DELETE": re.compile(r"\bFROM\s+[`\"]?(\w+)", re.IGNORECASE),
+    "INSERT": re.compile(r"\bINTO\s+[`\"]?(\w+)", re.IGNORECASE),
+    "UPDATE": re.compile(r"^\s*UPDATE\s+[`\"]?(\w+)", re.IGNORECASE),
+}
+
+@lru_cache(maxsize=1024)
+def describe_statement(statement: str) -> Tuple[str, str]:
+    """
+    Identifica a operação e a tabela principal de uma instrução SQL, usadas como rótulos das métricas.
+
+    Args:
+        statement (str): A instrução SQL.
+
+    Returns:
+        Tuple[str, str]: A operação (ex.: SELECT) e a tabela (vazia se não identificada).
+    """
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    pattern = _TABLE_PATTERNS.get(operation)
+    match = pattern.search(statement) if pattern is not None else None
+    return operation, match.group(1) if match else ""
+
+def instrument_engine(sync_engine, name: str) -> None:
+    """
+    Registra a latência de cada consulta do engine nas métricas e, acima de SLOW_QUERY_MS, no log.
+
+    Args:
+        sync_engine (Engine): O engine síncrono (para o assíncrono, `async_engine.sync_engine`).
+        name (str): O nome do engine nos rótulos das métricas.
+    """
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation, table = describe_statement(statement)
+        metrics.db_query_duration.observe(elapsed, engine=name, operation=operation, table=table)
+        if Settings.SLOW_QUERY_MS and elapsed * 1000 >= Settings.SLOW_QUERY_MS:
+            metrics.db_slow_queries.inc(engine=name, operation=operation, table=table)
+            logger.warning("Consulta lenta (%.1f ms, engine %s): %s", elapsed * 1000, name, statement)
+
+    # Um erro na consulta não chama after_cursor_execute; descarta o início pendente
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+# O commit não passa por before/after_cursor_execute; é medido pelos eventos das sessões
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    session.info["commit_start"] = time.perf_counter()
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    start = session.info.pop("commit_start", None)
+    if start is not None:
+        metrics.db_commit_duration.observe(time.perf_counter() - start)
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("commit_start", None)
+
+def collect_pool_metrics() -> None:
+    """Atualiza as métricas de conexões dos pools dos engines síncrono e assíncrono."""
+    if engine is None:
+        return
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            # Nem todo pool expõe essas estatísticas (ex.: NullPool, StaticPool)
+            if hasattr(pool, state):
+                metrics.db_pool.set(getattr(pool, state)(), engine=name, state=state)
@@ -0,0 +1,197 @@
+"""
+Métricas da aplicação (contadores, gauges e histogramas) expostas no formato texto do Prometheus.
+"""
+import math
+import threading
+from collections import Counter as _Tally
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Limites padrão dos histogramas de latência, em segundos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """Base das métricas: nome, descrição, rótulos e os valores por combinação de rótulos."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Retorna a métrica no formato texto do Prometheus."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Incrementa o contador da combinação de rótulos informada."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Retorna o valor atual do contador."""
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(_Metric):
+    """Valor instantâneo, que pode subir ou descer."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        """Define o valor da combinação de rótulos informada."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(_Metric):
+    """Distribuição de valores (ex.: latências) em faixas cumulativas, com soma e contagem."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de rótulos: [contagem por faixa (não cumulativa)..., soma, contagem]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Registra uma observação na combinação de rótulos informada."""
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        """Retorna a quantidade de observações da combinação de rótulos informada."""
+        state = self._values.get(self._key(labels))
+        return state[-1] if state is not None else 0
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, (("le", _format_value(bound)),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state[-2])}"
+            yield f"{self.name}_count{labels} {state[-1]}"
+
+class Registry:
+    """Conjunto de métricas expostas pela aplicação."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Registra a métrica, retornando-a."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Retorna todas as métricas no formato texto do Prometheus."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "hbm_http_request_duration_seconds", "Latência das requisições HTTP por rota.", ("method", "route", "status"),
+))
+db_query_duration = registry.register(Histogram(
+    "hbm_db_query_duration_seconds", "Latência das consultas ao banco por operação e tabela.", ("engine", "operation", "table"),
+))
+db_commit_duration = registry.register(Histogram(
+    "hbm_db_commit_duration_seconds", "Latência dos commits das sessões (inclui o flush pendente).",
+))
+db_slow_queries = registry.register(Counter(
+    "hbm_db_slow_queries_total", "Consultas acima do limite de SLOW_QUERY_MS.", ("engine", "operation", "table"),
+))
+db_pool = registry.register(Gauge(
+    "hbm_db_pool_connections", "Conexões do pool por estado.", ("engine", "state"),
+))
+ingested_measurements = registry.register(Counter(
+    "hbm_ingested_measurements_total", "Medições ingeridas por dispositivo.", ("device_id",),
+))
+ingest_alerts = registry.register(Counter(
+    "hbm_ingest_alerts_total", "Alertas emitidos pela ingestão (bip abre e bipbip fecha uma irregularidade).", ("alert",),
+))
+ingest_queue = registry.register(Gauge(
+    "hbm_ingest_queue", "Métricas da fila de gravação em segundo plano (modo write-behind).", ("metric",),
+))
+
+cache_requests = registry.register(Counter(
+    "hbm_cache_requests_total", "Leituras do cache de respostas por resultado (hit ou miss).", ("namespace", "result"),
+))
+
+def record_ingest(results: List[dict]) -> None:
+    """
+    Contabiliza as medições ingeridas por dispositivo e os alertas emitidos.
+
+    Args:
+        results (List[dict]): As medições processadas, com as chaves "device_id" e "alert".
+    """
+    for device_id, count in _Tally(r["device_id"] for r in results).items():
+        ingested_measurements.inc(count, device_id=device_id)
+    for r in results:
+        if r["alert"] is not None:
+            ingest_alerts.inc(alert=r["alert"])
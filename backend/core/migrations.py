@@ -0,0 +1,228 @@
+"""
+Migrações do esquema do banco de dados.
+
+As migrações são executadas uma única vez (pela CLI, com `python cli.py migrate`, ou na
+inicialização da API com AUTO_MIGRATE), e não na importação dos módulos. As já aplicadas ficam
+registradas na tabela schema_migrations; cada migração também verifica o esquema atual, para
+que bancos criados por versões anteriores (com `create_all`) sejam atualizados sem erros.
+
+Processos que migram o mesmo banco ao mesmo tempo (ex.: vários workers com AUTO_MIGRATE) aplicam
+as migrações um de cada vez, com uma trava no banco (core.database.database_lock).
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Callable, List
+import numpy as np
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy_utils import create_database, database_exists
+from core.database import Base, database_lock
+
+logger = logging.getLogger(__name__)
+
+# Trava das migrações, e a espera máxima por ela (em segundos) enquanto outro processo migra o banco
+MIGRATION_LOCK = "hbm_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 300
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def _load_models() -> None:
+    import models.measurement, models.irregularity, models.measurementRollup, models.deviceStatus  # noqa: F401  (registra os modelos)
+
+def _add_missing_columns(conn: Connection, table_name: str, column_names: List[str]) -> List[str]:
+    """Adiciona à tabela as colunas do modelo que ainda não existem no banco."""
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    table = Base.metadata.tables[table_name]
+    added = []
+    for name in column_names:
+        if name not in existing:
+            column_ddl = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+            added.append(name)
+    return added
+
+def _create_tables(conn: Connection) -> None:
+    """Cria as tabelas e os índices que ainda não existem."""
+    Base.metadata.create_all(bind=conn)
+
+def _irregularity_open_key(conn: Connection) -> None:
+    """
+    Adiciona a coluna open_key (índice único da irregularidade aberta de cada dispositivo).
+    Se algum dispositivo tiver mais de uma irregularidade aberta, apenas a mais recente é mantida aberta.
+    """
+    if not _add_missing_columns(conn, "irregularities", ["open_key"]):
+        return
+    irregularities = Base.metadata.tables["irregularities"]
+    open_rows = conn.execute(
+        select(irregularities.c.id, irregularities.c.device_id)
+        .where(irregularities.c.end_timestamp.is_(None))
+        .order_by(irregularities.c.device_id, irregularities.c.start_timestamp.desc(), irregularities.c.id.desc())
+    ).all()
+    seen = set()
+    now = datetime.now()
+    for id, device_id in open_rows:
+        if device_id in seen:
+            values = {"end_timestamp": now}
+        else:
+            values = {"open_key": device_id}
+            seen.add(device_id)
+        conn.execute(update(irregularities).where(irregularities.c.id == id).values(**values))
+    # DDL direto: um Index com as colunas do modelo seria incluído nos metadados e recriado por create_all
+    conn.execute(text("CREATE UNIQUE INDEX uq_irregularities_open_key ON irregularities (open_key)"))
+
+def _irregularity_summary(conn: Connection) -> None:
+    """Adiciona as colunas do resumo das irregularidades (sample_count, abnormal_samples e peak_deviation)."""
+    _add_missing_columns(conn, "irregularities", ["sample_count", "abnormal_samples", "peak_deviation"])
+
+def _model_indexes(conn: Connection) -> None:
+    """
+    Cria os índices dos modelos que ainda não existem (ex.: os índices compostos das consultas do
+    histórico, ausentes nas tabelas criadas por versões anteriores, que `create_all` não altera).
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+def _device_status_backfill(conn: Connection) -> None:
+    """
+    Preenche a situação dos dispositivos que ainda não têm uma linha em device_status (bancos anteriores à
+    tabela): a última medição, as anormais entre as últimas WINDOW_SIZE medições e a irregularidade aberta
+    (open_key), para que a frota liste os dispositivos antes de eles enviarem uma nova medição.
+    """
+    from services.deviceState import WINDOW_SIZE
+    from utils import baseline as baseline_lib
+
+    measurements = Base.metadata.tables["measurements"]
+    irregularities = Base.metadata.tables["irregularities"]
+    device_status = Base.metadata.tables["device_status"]
+
+    existing = set(conn.scalars(select(device_status.c.device_id)))
+    open_ids = dict(conn.execute(
+        select(irregularities.c.open_key, irregularities.c.id).where(irregularities.c.open_key.is_not(None))
+    ).all())
+    device_ids = set(conn.scalars(select(measurements.c.device_id).distinct())) | set(open_ids)
+
+    statuses = []
+    for device_id in sorted(device_ids - existing):
+        last = conn.execute(
+            select(measurements.c.time_ms, measurements.c.timestamp, measurements.c.value)
+            .where(measurements.c.device_id == device_id)
+            .order_by(measurements.c.timestamp.desc(), measurements.c.id.desc())
+            .limit(WINDOW_SIZE)
+        ).all()
+        active_id = open_ids.get(device_id)
+        status = {
+            "device_id": device_id, "last_value": None, "last_time_ms": None, "last_timestamp": None,
+            "abnormal_count": 0, "active_irregularity_id": active_id, "in_irregularity": active_id is not None,
+        }
+        if last:
+            time_ms = np.array([m.time_ms for m in last], dtype=np.int64)
+            values = np.array([m.value for m in last], dtype=np.float64)
+            status.update(
+                last_value=last[0].value, last_time_ms=last[0].time_ms, last_timestamp=last[0].timestamp,
+                abnormal_count=int(baseline_lib.is_abnormal_array(values, baseline_lib.compute_baseline_array(time_ms)).sum()),
+            )
+        statuses.append(status)
+    if statuses:
+        conn.execute(device_status.insert(), statuses)
+
+# Migrações, em ordem de aplicação
+MIGRATIONS = [
+    ("0001_create_tables", _create_tables),
+    ("0002_irregularity_open_key", _irregularity_open_key),
+    ("0003_irregularity_summary", _irregularity_summary),
+    ("0004_model_indexes", _model_indexes),
+    ("0005_device_status_backfill", _device_status_backfill),
+]
+
+def migrate(engine: Engine) -> List[str]:
+    """
+    Cria o banco de dados, se não existir, e aplica as migrações pendentes, cada uma em sua transação.
+    Se outro processo estiver migrando o banco, aguarda-o e aplica apenas o que ainda estiver pendente.
+
+    Args:
+        engine (Engine): O engine do banco de dados.
+
+    Returns:
+        List[str]: As versões aplicadas nesta execução.
+
+    Raises:
+        TimeoutError: Se outro processo mantiver a trava das migrações por mais de MIGRATION_LOCK_TIMEOUT segundos.
+    """
+    if not database_exists(engine.url):
+        try:
+            create_database(engine.url)
+        except DBAPIError:
+            # Outro processo pode ter criado o banco ao mesmo tempo
+            if not database_exists(engine.url):
+                raise
+    _load_models()
+
+    with database_lock(engine, MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            raise TimeoutError(f"Outro processo mantém a trava das migrações há mais de {MIGRATION_LOCK_TIMEOUT} s")
+        _metadata.create_all(bind=engine)
+
+        with engine.connect() as conn:
+            applied = set(conn.scalars(select(schema_migrations.c.version)))
+
+        executed = []
+        for version, step in MIGRATIONS:
+            if version in applied:
+                continue
+            with engine.begin() as conn:
+                step(conn)
+                conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.now()))
+            logger.info("Migração aplicada: %s", version)
+            executed.append(version)
+    return executed
+
+def check_connection(engine: Engine) -> List[str]:
+    """Apenas verifica a conexão com o banco de dados, sem aplicar migrações."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return []
+
+def wait_for_database(
+    engine: Engine,
+    prepare: Callable[[Engine], List[str]] = check_connection,
+    timeout: float = 60.0,
+    initial_delay: float = 0.5,
+    max_delay: float = 5.0,
+) -> List[str]:
+    """
+    Executa a preparação do banco (migração ou verificação da conexão), tentando novamente com
+    espera exponencial enquanto o banco não aceitar conexões (ex.: o contêiner ainda está subindo).
+
+    Args:
+        engine (Engine): O engine do banco de dados.
+        prepare (Callable[[Engine], List[str]]): A preparação (padrão: apenas verificar a conexão).
+        timeout (float): O tempo máximo de espera, em segundos.
+        initial_delay (float): A espera antes da segunda tentativa, em segundos; dobra a cada tentativa.
+        max_delay (float): A espera máxima entre tentativas, em segundos.
+
+    Returns:
+        List[str]: O retorno da preparação (as versões aplicadas, na migração).
+
+    Raises:
+        OperationalError: Se o banco não aceitar conexões dentro do tempo máximo.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            return prepare(engine)
+        except OperationalError as e:
+            if time.monotonic() + delay > deadline:
+                raise
+            logger.warning("Banco de dados indisponível (%s); nova tentativa em %.1f s", e.orig, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
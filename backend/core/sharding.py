@@ -0,0 +1,134 @@
+"""
+Afinidade de dispositivos entre os nós da API (sharding), por hash consistente do device_id.
+
+Cada dispositivo pertence a um único nó (SHARD_NODES), que processa as suas medições em ordem,
+com o estado em memória (janela das 60 medições) sempre atualizado. Um nó que recebe medições
+de dispositivos de outro nó as recusa, indicando o dono: a requisição é redirecionada (307) quando
+todos os dispositivos pertencem ao mesmo nó, ou recusada (421) com o dono de cada dispositivo.
+
+Com o hash consistente, incluir ou remover um nó muda o dono de apenas ~1/N dos dispositivos.
+
+A afinidade é por nó (URL), e não por processo: cada nó deve ser executado com um único worker
+(ver `ensure_single_worker`). Para usar mais núcleos, execute mais nós, cada um com a sua URL.
+"""
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+from core.config import Settings
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class HashRing:
+    """Anel de hash consistente, com nós virtuais para distribuir os dispositivos de forma uniforme."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = 100):
+        """
+        Args:
+            nodes (Iterable[str]): Os nós (ex.: as URLs base de cada instância da API).
+            vnodes (int): A quantidade de pontos de cada nó no anel.
+
+        Raises:
+            ValueError: Se nenhum nó for informado.
+        """
+        self.nodes = sorted(set(nodes))
+        if not self.nodes:
+            raise ValueError("O anel de hash precisa de ao menos um nó")
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        """
+        Retorna o nó dono da chave: o primeiro ponto do anel a partir do hash da chave.
+
+        Args:
+            key (str): A chave (ex.: o ID do dispositivo).
+
+        Returns:
+            str: O nó dono da chave.
+        """
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[index]
+
+class WrongShard(Exception):
+    """Medições de dispositivos que pertencem a outros nós."""
+
+    def __init__(self, owners: Dict[str, List[str]]):
+        """
+        Args:
+            owners (Dict[str, List[str]]): Para cada nó dono, os dispositivos recebidos que pertencem a ele.
+        """
+        super().__init__("Dispositivos pertencentes a outros nós: " + ", ".join(sorted(owners)))
+        self.owners = owners
+
+class ShardRouter:
+    """Verifica se os dispositivos pertencem ao nó atual."""
+
+    def __init__(self, ring: Optional[HashRing] = None, self_node: str = ""):
+        """
+        Args:
+            ring (Optional[HashRing]): O anel dos nós; se None, o sharding fica desativado (nó único).
+            self_node (str): O nó atual, como aparece no anel.
+
+        Raises:
+            ValueError: Se o nó atual não fizer parte do anel.
+        """
+        if ring is not None and self_node not in ring.nodes:
+            raise ValueError(f"SHARD_SELF ({self_node!r}) não está em SHARD_NODES")
+        self.ring = ring
+        self.self_node = self_node
+
+    @property
+    def enabled(self) -> bool:
+        """Se o sharding está ativo (SHARD_NODES configurado)."""
+        return self.ring is not None
+
+    @classmethod
+    def from_settings(cls) -> "ShardRouter":
+        """Cria o roteador a partir de SHARD_NODES (nós separados por vírgula) e SHARD_SELF."""
+        nodes = [node.strip().rstrip("/") for node in Settings.SHARD_NODES.split(",") if node.strip()]
+        if not nodes:
+            return cls()
+        return cls(HashRing(nodes), Settings.SHARD_SELF.rstrip("/"))
+
+    def ensure_local(self, device_ids: Iterable[str]) -> None:
+        """
+        Verifica se todos os dispositivos pertencem ao nó atual.
+
+        Args:
+            device_ids (Iterable[str]): Os IDs dos dispositivos.
+
+        Raises:
+            WrongShard: Se algum dispositivo pertencer a outro nó.
+        """
+        if self.ring is None:
+            return
+        owners: Dict[str, List[str]] = {}
+        for device_id in dict.fromkeys(device_ids):
+            owner = self.ring.owner(device_id)
+            owners.setdefault(owner, []).append(device_id)
+        if set(owners) - {self.self_node}:
+            raise WrongShard(owners)
+
+def ensure_single_worker(workers: int) -> None:
+    """
+    Verifica que o nó é executado em um único processo.
+
+    O estado da detecção (a janela das medições de cada dispositivo) fica na memória do processo:
+    com vários workers atrás da mesma URL, cada um decidiria os alertas de um dispositivo sobre
+    apenas uma parte das suas medições.
+
+    Args:
+        workers (int): A quantidade de workers do nó (WEB_CONCURRENCY).
+
+    Raises:
+        RuntimeError: Se houver mais de um worker.
+    """
+    if workers > 1:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={workers}: o estado da detecção fica na memória do processo, e cada instância deve ter "
+            "um único worker. Para usar mais núcleos, execute várias instâncias e configure SHARD_NODES/SHARD_SELF"
+        )
+
+shard_router = ShardRouter.from_settings()
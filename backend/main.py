@@ -1,12 +1,83 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from core.database import engine, Base
-from api.endpoints import measurements, irregularities, simulation
+from fastapi.responses import JSONResponse
+from core.config import Settings
+from core.sharding import WrongShard, ensure_single_worker
+from core import metrics as app_metrics
+from core.database import AsyncSessionLocal, SessionLocal, get_engine
+from core.migrations import check_connection, migrate, wait_for_database
+from api.endpoints import measurements, irregularities, simulation, ingest, realtime, metrics, export, devices
+from api.deps import build_async_measurement_service
+from services.ingestQueue import IngestQueue, IngestQueueFull
+from services.simulationManager import SimulationManager
+from services.partitioning import MeasurementPartitions
+from services.retention import RetentionService, run_maintenance
+from services.udpIngest import UdpIngestServer
 
-# Cria as tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Verifica que a instância tem um único worker, cria os engines do banco de dados (se ainda não criados, ex.: pelos testes) e aguarda o banco aceitar
+    conexões (aplicando as migrações, com AUTO_MIGRATE), inicia a fila de gravação em segundo plano (modo write-behind), o gerenciador
+    de simulações, a ingestão por UDP e a manutenção periódica das medições (partições e retenção),
+    se configuradas. Ao encerrar a aplicação, cancela as simulações e grava o que restou na fila antes de sair.
+    """
+    ensure_single_worker(Settings.WEB_CONCURRENCY)
+    engine = get_engine()
+    await asyncio.to_thread(
+        wait_for_database, engine, migrate if Settings.AUTO_MIGRATE else check_connection, Settings.DB_CONNECT_TIMEOUT_SECONDS,
+    )
 
-app = FastAPI(title="Servidor HBM+")
+    ingest_queue = None
+    if Settings.INGEST_MODE == "write_behind":
+        ingest_queue = IngestQueue(
+            AsyncSessionLocal,
+            maxsize=Settings.INGEST_QUEUE_SIZE,
+            flush_interval_ms=Settings.INGEST_FLUSH_INTERVAL_MS,
+            flush_rows=Settings.INGEST_FLUSH_ROWS,
+            flush_retries=Settings.INGEST_FLUSH_RETRIES,
+            retry_delay_ms=Settings.INGEST_RETRY_DELAY_MS,
+        )
+        ingest_queue.start()
+    app.state.ingest_queue = ingest_queue
+    app.state.simulation_manager = SimulationManager(
+        AsyncSessionLocal, lambda db: build_async_measurement_service(db, ingest_queue),
+    )
+
+    udp_ingest = None
+    if Settings.UDP_INGEST_PORT > 0:
+        udp_ingest = UdpIngestServer(AsyncSessionLocal, lambda db: build_async_measurement_service(db, ingest_queue))
+        await udp_ingest.start(Settings.UDP_INGEST_HOST, Settings.UDP_INGEST_PORT)
+
+    maintenance = None
+    partitions = MeasurementPartitions(engine, Settings.PARTITION_DAYS_AHEAD) if Settings.PARTITION_MEASUREMENTS else None
+    retention = None
+    if Settings.RETENTION_DAYS > 0:
+        retention = RetentionService(
+            SessionLocal,
+            Settings.RETENTION_DAYS,
+            archive_dir=Settings.RETENTION_ARCHIVE_DIR or None,
+            archive_format=Settings.RETENTION_ARCHIVE_FORMAT,
+            partitions=partitions,
+        )
+    if Settings.RETENTION_INTERVAL_HOURS > 0 and (partitions is not None or retention is not None):
+        maintenance = asyncio.create_task(run_maintenance(engine, partitions, retention, Settings.RETENTION_INTERVAL_HOURS * 3600))
+    try:
+        yield
+    finally:
+        if maintenance is not None:
+            maintenance.cancel()
+            await asyncio.gather(maintenance, return_exceptions=True)
+        if udp_ingest is not None:
+            await udp_ingest.stop()
+        await app.state.simulation_manager.shutdown()
+        if ingest_queue is not None:
+            await ingest_queue.stop()
+
+app = FastAPI(title="Servidor HBM+", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,10 +87,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Registra a latência de cada requisição no histograma da rota correspondente."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Usa o caminho da rota (ex.: /api/simulations/{job_id}) para não criar um rótulo por URL
+        route = request.scope.get("route")
+        app_metrics.http_request_duration.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
 
 app.include_router(measurements.router)
 app.include_router(irregularities.router)
+app.include_router(devices.router)
 app.include_router(simulation.router)
+app.include_router(ingest.router)
+app.include_router(realtime.router)
+app.include_router(metrics.router)
+app.include_router(export.router)
+
+@app.exception_handler(IngestQueueFull)
+async def ingest_queue_full_handler(request: Request, exc: IngestQueueFull):
+    # Backpressure: o cliente deve reenviar as medições mais tarde
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(WrongShard)
+async def wrong_shard_handler(request: Request, exc: WrongShard):
+    # Dispositivos de uma única outra instância: redireciona a requisição (307 preserva o método e o corpo)
+    if len(exc.owners) == 1:
+        owner = next(iter(exc.owners))
+        location = owner + request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        return JSONResponse(status_code=307, content={"detail": str(exc)}, headers={"Location": location})
+    # Lote com dispositivos de várias instâncias: o cliente deve dividi-lo pelo dono de cada dispositivo
+    return JSONResponse(status_code=421, content={"detail": str(exc), "owners": exc.owners})
 
 @app.get("/")
 async def redirect_to_docs():
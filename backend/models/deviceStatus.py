@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, Boolean, Index
+from core.database import Base
+
+class DeviceStatus(Base):
+    """
+    Situação atual de cada dispositivo (última medição, anormais na janela e irregularidade ativa),
+    atualizada a cada ingestão, para a visão geral da frota sem consultar as medições.
+    """
+    __tablename__ = "device_status"
+    device_id = Column(String(50), primary_key=True)
+    last_value = Column(Float)
+    last_time_ms = Column(Integer)
+    last_timestamp = Column(DateTime)
+    abnormal_count = Column(Integer, nullable=False, default=0)
+    active_irregularity_id = Column(Integer, nullable=True)
+    in_irregularity = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        # Listagem da frota filtrada pelos dispositivos em irregularidade, paginada por device_id
+        Index("ix_device_status_in_irregularity_device_id", "in_irregularity", "device_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index
 from core.database import Base
 
 class Irregularity(Base):
@@ -7,3 +7,16 @@ class Irregularity(Base):
     device_id = Column(String(50), index=True)
     start_timestamp = Column(DateTime)
     end_timestamp = Column(DateTime, nullable=True)
+    # Igual ao device_id enquanto a irregularidade está aberta e nulo depois de fechada: o índice único
+    # garante no banco uma única irregularidade aberta por dispositivo, mesmo com vários processos
+    open_key = Column(String(50), unique=True, nullable=True)
+    # Resumo da irregularidade, atualizado a cada lote: medições desde o início, medições anormais
+    # e o maior desvio relativo em relação ao baseline
+    sample_count = Column(Integer, nullable=False, default=0, server_default="0")
+    abnormal_samples = Column(Integer, nullable=False, default=0, server_default="0")
+    peak_deviation = Column(Float, nullable=False, default=0.0, server_default="0")
+
+    __table_args__ = (
+        # Busca da irregularidade ativa (end_timestamp nulo) de um dispositivo
+        Index("ix_irregularities_device_id_end_timestamp", "device_id", "end_timestamp"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, func
+from sqlalchemy import Column, Integer, Float, String, DateTime, Index, func
 from core.database import Base
 
 class Measurement(Base):
@@ -8,3 +8,8 @@ class Measurement(Base):
     time_ms = Column(Integer)
     timestamp = Column(DateTime, default=func.now())
     value = Column(Float)
+
+    __table_args__ = (
+        # Consultas por dispositivo ordenadas/filtradas por período
+        Index("ix_measurements_device_id_timestamp", "device_id", "timestamp"),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime
+from core.database import Base
+
+class MeasurementRollupMixin:
+    """
+    Colunas comuns dos agregados de medições por dispositivo e intervalo de tempo.
+    """
+    device_id = Column(String(50), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0)
+    min = Column(Float)
+    max = Column(Float)
+    abnormal_count = Column(Integer, nullable=False, default=0)
+
+class MeasurementMinute(MeasurementRollupMixin, Base):
+    __tablename__ = "measurements_minute"
+    BUCKET_SECONDS = 60
+
+class MeasurementHour(MeasurementRollupMixin, Base):
+    __tablename__ = "measurements_hour"
+    BUCKET_SECONDS = 3600
+
+# Agregados disponíveis, do mais grosso para o mais fino
+ROLLUP_MODELS = (MeasurementHour, MeasurementMinute)
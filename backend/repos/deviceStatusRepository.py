@@ -0,0 +1,109 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models.deviceStatus import DeviceStatus
+from models.irregularity import Irregularity
+
+# Linhas por upsert, para respeitar o limite de parâmetros por instrução (ex.: SQLite)
+UPSERT_CHUNK_ROWS = 500
+
+def _upsert_statement(statuses: List[dict], dialect_name: str):
+    """
+    Monta o insert que substitui a situação dos dispositivos (upsert), conforme o banco.
+
+    A irregularidade ativa é lida pelo próprio banco (índice único em open_key), na mesma
+    transação em que ela foi aberta ou fechada.
+    """
+    values = []
+    for status in statuses:
+        active_id = select(Irregularity.id).where(Irregularity.open_key == status["device_id"]).scalar_subquery()
+        values.append({**status, "active_irregularity_id": active_id, "in_irregularity": active_id.is_not(None)})
+    columns = ("last_value", "last_time_ms", "last_timestamp", "abnormal_count", "active_irregularity_id", "in_irregularity")
+
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(DeviceStatus).values(values)
+        return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in columns})
+
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(DeviceStatus).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[DeviceStatus.device_id],
+        set_={column: stmt.excluded[column] for column in columns},
+    )
+
+def _upsert_statements(statuses: List[dict], dialect_name: str):
+    for start in range(0, len(statuses), UPSERT_CHUNK_ROWS):
+        yield _upsert_statement(statuses[start:start + UPSERT_CHUNK_ROWS], dialect_name)
+
+def _page_query(after: Optional[str], limit: int, in_irregularity: Optional[bool]):
+    """Monta a consulta de uma página da frota, em ordem de device_id (keyset)."""
+    query = select(DeviceStatus)
+    if in_irregularity is not None:
+        query = query.where(DeviceStatus.in_irregularity == in_irregularity)
+    if after is not None:
+        query = query.where(DeviceStatus.device_id > after)
+    return query.order_by(DeviceStatus.device_id).limit(limit)
+
+class DeviceStatusRepository:
+    """
+    Responsável pela situação atual dos dispositivos.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def upsert_many(self, statuses: List[dict]) -> None:
+        """
+        Grava a situação atual dos dispositivos, na transação atual (sem commit).
+
+        Args:
+            statuses (List[dict]): A situação de cada dispositivo, com as chaves "device_id", "last_value",
+                "last_time_ms", "last_timestamp" e "abnormal_count".
+        """
+        if not statuses:
+            return
+        dialect_name = self.db.get_bind().dialect.name
+        for stmt in _upsert_statements(statuses, dialect_name):
+            self.db.execute(stmt)
+
+    def get_page(self, after: Optional[str] = None, limit: int = 100, in_irregularity: Optional[bool] = None) -> List[DeviceStatus]:
+        """
+        Obtém uma página da frota, em ordem de device_id, com paginação por cursor (keyset).
+
+        Args:
+            after (Optional[str]): O último device_id da página anterior, ou None para a primeira página.
+            limit (int): A quantidade máxima de dispositivos na página.
+            in_irregularity (Optional[bool]): Se informado, lista apenas os dispositivos com (ou sem) irregularidade ativa.
+
+        Returns:
+            List[DeviceStatus]: A situação dos dispositivos da página.
+        """
+        return list(self.db.scalars(_page_query(after, limit, in_irregularity)))
+
+
+class AsyncDeviceStatusRepository:
+    """
+    Responsável pela situação atual dos dispositivos, com sessão assíncrona.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def upsert_many(self, statuses: List[dict]) -> None:
+        """
+        Grava a situação atual dos dispositivos, na transação atual (sem commit).
+
+        Args:
+            statuses (List[dict]): A situação de cada dispositivo, com as chaves "device_id", "last_value",
+                "last_time_ms", "last_timestamp" e "abnormal_count".
+        """
+        if not statuses:
+            return
+        dialect_name = self.db.get_bind().dialect.name
+        for stmt in _upsert_statements(statuses, dialect_name):
+            await self.db.execute(stmt)
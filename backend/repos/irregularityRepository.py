@@ -1,7 +1,44 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from models.irregularity import Irregularity
-from datetime import datetime
+from core.cache import mark_changed
+from datetime import datetime, timedelta
+
+def _open_statement(device_id: str, start_timestamp: datetime, stats: Optional[dict], dialect_name: str):
+    """Insert da irregularidade aberta que é ignorado se o dispositivo já tiver uma aberta (open_key único)."""
+    values = {"device_id": device_id, "start_timestamp": start_timestamp, "open_key": device_id, **(stats or {})}
+    if dialect_name == "mysql":
+        return insert(Irregularity).prefix_with("IGNORE").values(**values)
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    return dialect_insert(Irregularity).values(**values).on_conflict_do_nothing(index_elements=["open_key"])
+
+def _stats_values(stats: Optional[dict]) -> dict:
+    """Valores do update que somam o resumo das novas medições ao da irregularidade."""
+    if not stats:
+        return {}
+    return {
+        "sample_count": Irregularity.sample_count + stats["sample_count"],
+        "abnormal_samples": Irregularity.abnormal_samples + stats["abnormal_samples"],
+        "peak_deviation": case(
+            (Irregularity.peak_deviation < stats["peak_deviation"], stats["peak_deviation"]),
+            else_=Irregularity.peak_deviation,
+        ),
+    }
+
+def _update_open_statement(device_id: str, **values):
+    """Update da irregularidade aberta do dispositivo, se houver."""
+    return (
+        update(Irregularity)
+        .where(Irregularity.open_key == device_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
 
 class IrregularityRepository:
     """
@@ -11,17 +48,27 @@ class IrregularityRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def create(self, irregularity: Irregularity) -> Irregularity:
+    def create(self, irregularity: Irregularity, commit: bool = True) -> Irregularity:
         """
         Cria e adiciona uma nova irregularidade ao banco de dados.
 
         Args:
             irregularity (Irregularity): A irregularidade a ser adicionada.
+            commit (bool): Se False, apenas envia a irregularidade à transação atual, sem commit.
 
         Returns:
             Irregularity: A irregularidade adicionada com seu ID atualizado.
+
+        Raises:
+            IntegrityError: Se a irregularidade estiver aberta e o dispositivo já tiver outra aberta.
         """
+        if irregularity.end_timestamp is None:
+            irregularity.open_key = irregularity.device_id
         self.db.add(irregularity)
+        mark_changed(self.db, [irregularity.device_id])
+        if not commit:
+            self.db.flush()
+            return irregularity
         self.db.commit()
         self.db.refresh(irregularity)
         return irregularity
@@ -42,21 +89,93 @@ class IrregularityRepository:
             .first()
         )
 
-    def close_irregularity(self, irregularity: Irregularity) -> Irregularity:
+    def close_irregularity(self, irregularity: Irregularity, commit: bool = True) -> Irregularity:
         """
         Fecha uma irregularidade atualizando seu timestamp de término.
 
         Args:
             irregularity (Irregularity): A irregularidade a ser fechada.
+            commit (bool): Se False, apenas envia a alteração à transação atual, sem commit.
 
         Returns:
             Irregularity: A irregularidade fechada com o timestamp de término atualizado.
         """
         irregularity.end_timestamp = datetime.now()
+        irregularity.open_key = None
+        mark_changed(self.db, [irregularity.device_id])
+        if not commit:
+            self.db.flush()
+            return irregularity
         self.db.commit()
         self.db.refresh(irregularity)
         return irregularity
 
+    def open_if_absent(self, device_id: str, start_timestamp: datetime, stats: Optional[dict] = None, commit: bool = True) -> bool:
+        """
+        Abre uma irregularidade para o dispositivo, de forma atômica, se ele ainda não tiver uma aberta.
+
+        A verificação é feita pelo próprio banco (índice único em open_key), sem leitura prévia:
+        dois processos que decidam abrir a irregularidade ao mesmo tempo abrem apenas uma.
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+            start_timestamp (datetime): O início da irregularidade.
+            stats (Optional[dict]): O resumo das medições da irregularidade ainda não gravado
+                (chaves "sample_count", "abnormal_samples" e "peak_deviation"), se houver.
+            commit (bool): Se False, apenas executa o insert na transação atual, sem commit.
+
+        Returns:
+            bool: True se a irregularidade foi aberta, False se o dispositivo já tinha uma aberta.
+        """
+        dialect_name = self.db.get_bind().dialect.name
+        opened = self.db.execute(_open_statement(device_id, start_timestamp, stats, dialect_name)).rowcount == 1
+        if opened:
+            mark_changed(self.db, [device_id])
+        if commit:
+            self.db.commit()
+        return opened
+
+    def close_active(self, device_id: str, stats: Optional[dict] = None, commit: bool = True) -> bool:
+        """
+        Fecha, de forma atômica, a irregularidade aberta do dispositivo, se houver.
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+            stats (Optional[dict]): O resumo das medições da irregularidade ainda não gravado
+                (chaves "sample_count", "abnormal_samples" e "peak_deviation"), se houver.
+            commit (bool): Se False, apenas executa o update na transação atual, sem commit.
+
+        Returns:
+            bool: True se uma irregularidade foi fechada, False se o dispositivo não tinha nenhuma aberta.
+        """
+        statement = _update_open_statement(device_id, end_timestamp=datetime.now(), open_key=None, **_stats_values(stats))
+        closed = self.db.execute(statement).rowcount == 1
+        if closed:
+            mark_changed(self.db, [device_id])
+        if commit:
+            self.db.commit()
+        return closed
+
+    def add_samples(self, device_id: str, stats: dict, commit: bool = True) -> bool:
+        """
+        Soma o resumo de novas medições ao da irregularidade aberta do dispositivo, se houver,
+        com um único update (sem ler a irregularidade).
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+            stats (dict): O resumo das medições (chaves "sample_count", "abnormal_samples" e "peak_deviation").
+            commit (bool): Se False, apenas executa o update na transação atual, sem commit.
+
+        Returns:
+            bool: True se o dispositivo tinha uma irregularidade aberta.
+        """
+        updated = self.db.execute(_update_open_statement(device_id, **_stats_values(stats))).rowcount == 1
+        if updated:
+            mark_changed(self.db, [device_id])
+        if commit:
+            self.db.commit()
+        return updated
+
     def get_all(self, device_id: str) -> List[Irregularity]:
         """
         Retorna todas as irregularidades de um dispositivo específico ordenadas por timestamp de início.
@@ -72,4 +191,227 @@ class IrregularityRepository:
             .filter(Irregularity.device_id == device_id)
             .order_by(Irregularity.start_timestamp)
             .all()
-        )
\ No newline at end of file
+        )
+
+    def iter_all(self, device_id: Optional[str] = None, days: int = 30, chunk_size: int = 1000) -> Iterator[Row]:
+        """
+        Percorre as irregularidades iniciadas nos últimos dias em blocos, com cursor no servidor.
+
+        Args:
+            device_id (Optional[str]): Identificador do dispositivo; se None, percorre as de todos os dispositivos.
+            days (int): O número de dias a obter (padrão 30).
+            chunk_size (int): A quantidade de linhas lidas do banco por vez.
+
+        Yields:
+            Row: As irregularidades (id, device_id, start_timestamp, end_timestamp, sample_count,
+            abnormal_samples, peak_deviation), ordenadas pelo início.
+        """
+        since = datetime.now() - timedelta(days=days)
+        query = (
+            select(
+                Irregularity.id, Irregularity.device_id, Irregularity.start_timestamp, Irregularity.end_timestamp,
+                Irregularity.sample_count, Irregularity.abnormal_samples, Irregularity.peak_deviation,
+            )
+            .where(Irregularity.start_timestamp >= since)
+        )
+        if device_id is not None:
+            query = query.where(Irregularity.device_id == device_id)
+        result = self.db.execute(
+            query.order_by(Irregularity.start_timestamp, Irregularity.id).execution_options(yield_per=chunk_size)
+        )
+        try:
+            yield from result
+        finally:
+            result.close()
+
+    def create_many(self, irregularities: List[dict], commit: bool = True) -> int:
+        """
+        Adiciona várias irregularidades ao banco de dados com um único insert em lote.
+
+        Cada dispositivo mantém no máximo uma irregularidade aberta: das irregularidades abertas
+        recebidas, apenas a mais recente de cada dispositivo continua aberta (recebendo o open_key),
+        e somente se o dispositivo ainda não tiver uma aberta no banco. As demais são fechadas no
+        instante da importação.
+
+        Args:
+            irregularities (List[dict]): As irregularidades (device_id, start_timestamp, end_timestamp e,
+                opcionalmente, o resumo: sample_count, abnormal_samples e peak_deviation).
+            commit (bool): Se False, apenas executa o insert na transação atual, sem commit.
+
+        Returns:
+            int: A quantidade de irregularidades adicionadas.
+        """
+        if irregularities:
+            irregularities = [dict(i, open_key=None) for i in irregularities]
+            opened = [i for i in irregularities if i["end_timestamp"] is None]
+            if opened:
+                already_open = set(self.db.scalars(
+                    select(Irregularity.open_key).where(Irregularity.open_key.in_({i["device_id"] for i in opened}))
+                ))
+                now = datetime.now()
+                for i in sorted(opened, key=lambda i: i["start_timestamp"], reverse=True):
+                    if i["device_id"] in already_open:
+                        i["end_timestamp"] = now
+                    else:
+                        i["open_key"] = i["device_id"]
+                        already_open.add(i["device_id"])
+            self.db.execute(insert(Irregularity), irregularities)
+            mark_changed(self.db, {i["device_id"] for i in irregularities})
+        if commit:
+            self.db.commit()
+        return len(irregularities)
+
+
+class AsyncIrregularityRepository:
+    """
+    Responsável pela persistência das irregularidades, com sessão assíncrona.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, irregularity: Irregularity, commit: bool = True) -> Irregularity:
+        """
+        Cria e adiciona uma nova irregularidade ao banco de dados.
+
+        Args:
+            irregularity (Irregularity): A irregularidade a ser adicionada.
+            commit (bool): Se False, apenas envia a irregularidade à transação atual, sem commit.
+
+        Returns:
+            Irregularity: A irregularidade adicionada com seu ID atualizado.
+
+        Raises:
+            IntegrityError: Se a irregularidade estiver aberta e o dispositivo já tiver outra aberta.
+        """
+        if irregularity.end_timestamp is None:
+            irregularity.open_key = irregularity.device_id
+        self.db.add(irregularity)
+        mark_changed(self.db, [irregularity.device_id])
+        if not commit:
+            await self.db.flush()
+            return irregularity
+        await self.db.commit()
+        await self.db.refresh(irregularity)
+        return irregularity
+
+    async def get_active(self, device_id: str) -> Optional[Irregularity]:
+        """
+        Obtém a irregularidade ativa para um dispositivo específico.
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+
+        Returns:
+            Optional[Irregularity]: A irregularidade ativa, se existir, caso contrário, None.
+        """
+        result = await self.db.scalars(
+            select(Irregularity)
+            .where(Irregularity.device_id == device_id, Irregularity.end_timestamp.is_(None))
+            .limit(1)
+        )
+        return result.first()
+
+    async def close_irregularity(self, irregularity: Irregularity, commit: bool = True) -> Irregularity:
+        """
+        Fecha uma irregularidade atualizando seu timestamp de término.
+
+        Args:
+            irregularity (Irregularity): A irregularidade a ser fechada.
+            commit (bool): Se False, apenas envia a alteração à transação atual, sem commit.
+
+        Returns:
+            Irregularity: A irregularidade fechada com o timestamp de término atualizado.
+        """
+        irregularity.end_timestamp = datetime.now()
+        irregularity.open_key = None
+        mark_changed(self.db, [irregularity.device_id])
+        if not commit:
+            await self.db.flush()
+            return irregularity
+        await self.db.commit()
+        await self.db.refresh(irregularity)
+        return irregularity
+
+    async def open_if_absent(self, device_id: str, start_timestamp: datetime, stats: Optional[dict] = None, commit: bool = True) -> bool:
+        """
+        Abre uma irregularidade para o dispositivo, de forma atômica, se ele ainda não tiver uma aberta.
+
+        A verificação é feita pelo próprio banco (índice único em open_key), sem leitura prévia:
+        dois processos que decidam abrir a irregularidade ao mesmo tempo abrem apenas uma.
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+            start_timestamp (datetime): O início da irregularidade.
+            stats (Optional[dict]): O resumo das medições da irregularidade ainda não gravado
+                (chaves "sample_count", "abnormal_samples" e "peak_deviation"), se houver.
+            commit (bool): Se False, apenas executa o insert na transação atual, sem commit.
+
+        Returns:
+            bool: True se a irregularidade foi aberta, False se o dispositivo já tinha uma aberta.
+        """
+        dialect_name = self.db.get_bind().dialect.name
+        opened = (await self.db.execute(_open_statement(device_id, start_timestamp, stats, dialect_name))).rowcount == 1
+        if opened:
+            mark_changed(self.db, [device_id])
+        if commit:
+            await self.db.commit()
+        return opened
+
+    async def close_active(self, device_id: str, stats: Optional[dict] = None, commit: bool = True) -> bool:
+        """
+        Fecha, de forma atômica, a irregularidade aberta do dispositivo, se houver.
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+            stats (Optional[dict]): O resumo das medições da irregularidade ainda não gravado
+                (chaves "sample_count", "abnormal_samples" e "peak_deviation"), se houver.
+            commit (bool): Se False, apenas executa o update na transação atual, sem commit.
+
+        Returns:
+            bool: True se uma irregularidade foi fechada, False se o dispositivo não tinha nenhuma aberta.
+        """
+        statement = _update_open_statement(device_id, end_timestamp=datetime.now(), open_key=None, **_stats_values(stats))
+        closed = (await self.db.execute(statement)).rowcount == 1
+        if closed:
+            mark_changed(self.db, [device_id])
+        if commit:
+            await self.db.commit()
+        return closed
+
+    async def add_samples(self, device_id: str, stats: dict, commit: bool = True) -> bool:
+        """
+        Soma o resumo de novas medições ao da irregularidade aberta do dispositivo, se houver,
+        com um único update (sem ler a irregularidade).
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+            stats (dict): O resumo das medições (chaves "sample_count", "abnormal_samples" e "peak_deviation").
+            commit (bool): Se False, apenas executa o update na transação atual, sem commit.
+
+        Returns:
+            bool: True se o dispositivo tinha uma irregularidade aberta.
+        """
+        updated = (await self.db.execute(_update_open_statement(device_id, **_stats_values(stats)))).rowcount == 1
+        if updated:
+            mark_changed(self.db, [device_id])
+        if commit:
+            await self.db.commit()
+        return updated
+
+    async def get_all(self, device_id: str) -> List[Irregularity]:
+        """
+        Retorna todas as irregularidades de um dispositivo específico ordenadas por timestamp de início.
+
+        Args:
+            device_id (str): Identificador do dispositivo.
+
+        Returns:
+            List[Irregularity]: Lista de todas as irregularidades associadas ao dispositivo.
+        """
+        result = await self.db.scalars(
+            select(Irregularity)
+            .where(Irregularity.device_id == device_id)
+            .order_by(Irregularity.start_timestamp)
+        )
+        return list(result)
@@ -1,8 +1,20 @@
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from models.measurement import Measurement
+from utils.sql import bucket_floor, from_epoch_seconds, time_bucket
+from core.cache import mark_changed
 from datetime import datetime, timedelta
 
+# As últimas medições são buscadas primeiro no período recente, para que o banco leia apenas
+# as partições mais novas; o histórico inteiro só é consultado se não houver medições suficientes
+LAST_N_RECENT_DAYS = 1
+
+# Colunas das leituras que retornam tuplas em vez de entidades ORM
+HISTORY_COLUMNS = (Measurement.id, Measurement.device_id, Measurement.time_ms, Measurement.timestamp, Measurement.value)
+
 class MeasurementRepository:
     """
     Responsável pela persistência das medições.
@@ -22,10 +34,29 @@ class MeasurementRepository:
             Measurement: A medição adicionada.
         """
         self.db.add(measurement)
+        mark_changed(self.db, [measurement.device_id])
         self.db.commit()
         self.db.refresh(measurement)
         return measurement
 
+    def create_many(self, measurements: List[dict], commit: bool = True) -> int:
+        """
+        Adiciona várias medições à base de dados com um único insert em lote e um único commit.
+        
+        Args:
+            measurements (List[dict]): As medições a serem adicionadas (device_id, time_ms, value).
+            commit (bool): Se False, apenas executa o insert na transação atual, sem commit.
+        
+        Returns:
+            int: A quantidade de medições adicionadas.
+        """
+        if measurements:
+            self.db.execute(insert(Measurement), measurements)
+            mark_changed(self.db, {m["device_id"] for m in measurements})
+        if commit:
+            self.db.commit()
+        return len(measurements)
+
     def get_last_n(self, device_id: str, n: int) -> List[Measurement]:
         """
         Obtém as últimas N medições de um dispositivo.
@@ -37,13 +68,14 @@ class MeasurementRepository:
         Returns:
             List[Measurement]: A lista de medições do dispositivo.
         """
-        return (
-            self.db.query(Measurement)
-            .filter(Measurement.device_id == device_id)
-            .order_by(Measurement.timestamp.desc())
-            .limit(n)
-            .all()
-        )
+        recent = self._last_n(device_id, n, datetime.now() - timedelta(days=LAST_N_RECENT_DAYS))
+        return recent if len(recent) >= n else self._last_n(device_id, n)
+
+    def _last_n(self, device_id: str, n: int, since: Optional[datetime] = None) -> List[Measurement]:
+        query = self.db.query(Measurement).filter(Measurement.device_id == device_id)
+        if since is not None:
+            query = query.filter(Measurement.timestamp >= since)
+        return query.order_by(Measurement.timestamp.desc(), Measurement.id.desc()).limit(n).all()
 
     def get_history(self, device_id: str, days: int = 30) -> List[Measurement]:
         """
@@ -62,4 +94,282 @@ class MeasurementRepository:
             .filter(Measurement.device_id == device_id, Measurement.timestamp >= since)
             .order_by(Measurement.timestamp)
             .all()
-        )
\ No newline at end of file
+        )
+
+    def get_history_rows(self, device_id: str, days: int = 30) -> List[Row]:
+        """
+        Obtém o histórico de medições de um dispositivo como tuplas de colunas, sem criar entidades ORM,
+        para respostas serializadas diretamente.
+        
+        Args:
+            device_id (str): O ID do dispositivo.
+            days (int): O número de dias a obter (padrão 30).
+        
+        Returns:
+            List[Row]: As medições (id, device_id, time_ms, timestamp, value), ordenadas por timestamp.
+        """
+        since = datetime.now() - timedelta(days=days)
+        return self.db.execute(
+            select(*HISTORY_COLUMNS)
+            .where(Measurement.device_id == device_id, Measurement.timestamp >= since)
+            .order_by(Measurement.timestamp)
+        ).all()
+
+    def get_history_page(self, device_id: str, after: Optional[Tuple[datetime, int]] = None, limit: int = 1000, days: int = 30) -> List[Measurement]:
+        """
+        Obtém uma página do histórico de medições de um dispositivo, com paginação por cursor (keyset).
+        
+        Args:
+            device_id (str): O ID do dispositivo.
+            after (Optional[Tuple[datetime, int]]): A posição (timestamp, id) da última medição da página anterior.
+            limit (int): O número máximo de medições da página.
+            days (int): O número de dias a obter (padrão 30).
+        
+        Returns:
+            List[Measurement]: A lista de medições da página, ordenada por timestamp.
+        """
+        since = datetime.now() - timedelta(days=days)
+        query = (
+            self.db.query(Measurement)
+            .filter(Measurement.device_id == device_id, Measurement.timestamp >= since)
+        )
+        if after is not None:
+            after_timestamp, after_id = after
+            query = query.filter(or_(
+                Measurement.timestamp > after_timestamp,
+                and_(Measurement.timestamp == after_timestamp, Measurement.id > after_id),
+            ))
+        return query.order_by(Measurement.timestamp, Measurement.id).limit(limit).all()
+
+    def iter_history(self, device_id: Optional[str], days: int = 30, chunk_size: int = 1000) -> Iterator[Row]:
+        """
+        Percorre o histórico de medições de um dispositivo em blocos, com cursor no servidor,
+        mantendo o uso de memória constante independente do tamanho do período.
+        
+        Args:
+            device_id (Optional[str]): O ID do dispositivo; se None, percorre as medições de todos os dispositivos.
+            days (int): O número de dias a obter (padrão 30).
+            chunk_size (int): A quantidade de linhas lidas do banco por vez.
+        
+        Yields:
+            Row: As medições (id, device_id, time_ms, timestamp, value), ordenadas por timestamp.
+        """
+        since = datetime.now() - timedelta(days=days)
+        query = (
+            select(*HISTORY_COLUMNS)
+            .where(Measurement.timestamp >= since)
+        )
+        if device_id is not None:
+            query = query.where(Measurement.device_id == device_id)
+        result = self.db.execute(
+            query.order_by(Measurement.timestamp, Measurement.id).execution_options(yield_per=chunk_size)
+        )
+        try:
+            yield from result
+        finally:
+            result.close()
+
+    def get_history_buckets(self, device_id: str, bucket_seconds: int, days: int = 30) -> List[Row]:
+        """
+        Obtém o histórico de medições de um dispositivo agregado em intervalos de tempo, calculado no banco.
+        O primeiro intervalo é completo (o início do período é arredondado para o início do seu intervalo).
+        
+        Args:
+            device_id (str): O ID do dispositivo.
+            bucket_seconds (int): O tamanho de cada intervalo, em segundos.
+            days (int): O número de dias a obter (padrão 30).
+        
+        Returns:
+            List[Row]: Os intervalos (bucket_start, count, min, max, avg), ordenados por bucket_start.
+        """
+        dialect_name = self.db.get_bind().dialect.name
+        since = datetime.now() - timedelta(days=days)
+        bucket = time_bucket(Measurement.timestamp, bucket_seconds, dialect_name).label("bucket")
+        subquery = (
+            select(
+                bucket,
+                func.count().label("count"),
+                func.min(Measurement.value).label("min"),
+                func.max(Measurement.value).label("max"),
+                func.avg(Measurement.value).label("avg"),
+            )
+            .where(Measurement.device_id == device_id, Measurement.timestamp >= bucket_floor(since, bucket_seconds, dialect_name))
+            .group_by(bucket)
+            .subquery()
+        )
+        return self.db.execute(
+            select(
+                from_epoch_seconds(subquery.c.bucket, dialect_name).label("bucket_start"),
+                subquery.c["count"], subquery.c["min"], subquery.c["max"], subquery.c["avg"],
+            )
+            .order_by(subquery.c.bucket)
+        ).all()
+
+    def get_device_ids(self, days: int = 30) -> List[str]:
+        """
+        Obtém os IDs dos dispositivos com medições nos últimos dias.
+
+        Args:
+            days (int): O número de dias considerados (padrão 30).
+
+        Returns:
+            List[str]: Os IDs dos dispositivos, em ordem alfabética.
+        """
+        since = datetime.now() - timedelta(days=days)
+        return list(self.db.scalars(
+            select(Measurement.device_id).where(Measurement.timestamp >= since).distinct().order_by(Measurement.device_id)
+        ))
+
+    def get_device_ids_in_range(self, start: datetime, end: datetime) -> List[str]:
+        """
+        Obtém os IDs dos dispositivos com medições em um intervalo de tempo.
+
+        Args:
+            start (datetime): O início do intervalo (inclusivo).
+            end (datetime): O fim do intervalo (exclusivo).
+
+        Returns:
+            List[str]: Os IDs dos dispositivos, em ordem alfabética.
+        """
+        return list(self.db.scalars(
+            select(Measurement.device_id)
+            .where(Measurement.timestamp >= start, Measurement.timestamp < end)
+            .distinct()
+            .order_by(Measurement.device_id)
+        ))
+
+    def get_time_range(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Obtém o instante da medição mais antiga e o da mais recente, de todos os dispositivos.
+        
+        Returns:
+            Tuple[Optional[datetime], Optional[datetime]]: Os instantes (None se não houver medições).
+        """
+        return tuple(self.db.execute(select(func.min(Measurement.timestamp), func.max(Measurement.timestamp))).one())
+
+    def iter_range(self, start: datetime, end: datetime, chunk_size: int = 10000) -> Iterator[Row]:
+        """
+        Percorre as medições de todos os dispositivos em um intervalo de tempo, em blocos.
+        
+        Args:
+            start (datetime): O início do intervalo (inclusivo).
+            end (datetime): O fim do intervalo (exclusivo).
+            chunk_size (int): A quantidade de linhas lidas do banco por vez.
+        
+        Yields:
+            Row: As medições (id, device_id, time_ms, timestamp, value), ordenadas por timestamp.
+        """
+        result = self.db.execute(
+            select(*HISTORY_COLUMNS)
+            .where(Measurement.timestamp >= start, Measurement.timestamp < end)
+            .order_by(Measurement.timestamp, Measurement.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        try:
+            yield from result
+        finally:
+            result.close()
+
+    def delete_range(self, start: datetime, end: datetime, commit: bool = True) -> int:
+        """
+        Remove as medições de todos os dispositivos em um intervalo de tempo, com um único DELETE.
+        O cache das leituras dos dispositivos afetados é invalidado no commit.
+        
+        Args:
+            start (datetime): O início do intervalo (inclusivo).
+            end (datetime): O fim do intervalo (exclusivo).
+            commit (bool): Se False, apenas executa o DELETE na transação atual, sem commit.
+        
+        Returns:
+            int: A quantidade de medições removidas.
+        """
+        device_ids = self.get_device_ids_in_range(start, end)
+        result = self.db.execute(
+            delete(Measurement).where(Measurement.timestamp >= start, Measurement.timestamp < end)
+        )
+        mark_changed(self.db, device_ids)
+        if commit:
+            self.db.commit()
+        return result.rowcount
+
+class AsyncMeasurementRepository:
+    """
+    Responsável pela persistência das medições, com sessão assíncrona.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, measurement: Measurement) -> Measurement:
+        """
+        Adiciona uma nova medição à base de dados.
+        
+        Args:
+            measurement (Measurement): A medição a ser adicionada.
+        
+        Returns:
+            Measurement: A medição adicionada.
+        """
+        self.db.add(measurement)
+        mark_changed(self.db, [measurement.device_id])
+        await self.db.commit()
+        await self.db.refresh(measurement)
+        return measurement
+
+    async def create_many(self, measurements: List[dict], commit: bool = True) -> int:
+        """
+        Adiciona várias medições à base de dados com um único insert em lote e um único commit.
+        
+        Args:
+            measurements (List[dict]): As medições a serem adicionadas (device_id, time_ms, value).
+            commit (bool): Se False, apenas executa o insert na transação atual, sem commit.
+        
+        Returns:
+            int: A quantidade de medições adicionadas.
+        """
+        if measurements:
+            await self.db.execute(insert(Measurement), measurements)
+            mark_changed(self.db, {m["device_id"] for m in measurements})
+        if commit:
+            await self.db.commit()
+        return len(measurements)
+
+    async def get_last_n(self, device_id: str, n: int) -> List[Measurement]:
+        """
+        Obtém as últimas N medições de um dispositivo.
+        
+        Args:
+            device_id (str): O ID do dispositivo.
+            n (int): O número de medições a obter.
+        
+        Returns:
+            List[Measurement]: A lista de medições do dispositivo.
+        """
+        recent = await self._last_n(device_id, n, datetime.now() - timedelta(days=LAST_N_RECENT_DAYS))
+        return recent if len(recent) >= n else await self._last_n(device_id, n)
+
+    async def _last_n(self, device_id: str, n: int, since: Optional[datetime] = None) -> List[Measurement]:
+        query = select(Measurement).where(Measurement.device_id == device_id)
+        if since is not None:
+            query = query.where(Measurement.timestamp >= since)
+        result = await self.db.scalars(query.order_by(Measurement.timestamp.desc(), Measurement.id.desc()).limit(n))
+        return list(result)
+
+    async def get_history(self, device_id: str, days: int = 30) -> List[Measurement]:
+        """
+        Obtém o histórico de medições de um dispositivo com base na quantidade de dias.
+        
+        Args:
+            device_id (str): O ID do dispositivo.
+            days (int): O número de dias a obter (padrão 30).
+        
+        Returns:
+            List[Measurement]: A lista de medições do dispositivo.
+        """
+        since = datetime.now() - timedelta(days=days)
+        result = await self.db.scalars(
+            select(Measurement)
+            .where(Measurement.device_id == device_id, Measurement.timestamp >= since)
+            .order_by(Measurement.timestamp)
+        )
+        return list(result)
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models.measurementRollup import ROLLUP_MODELS
+from utils.sql import bucket_floor, from_epoch_seconds, time_bucket
+
+def rollup_for(bucket_seconds: int):
+    """
+    Escolhe o agregado mais grosso cujo intervalo divide o intervalo desejado.
+
+    Args:
+        bucket_seconds (int): O tamanho do intervalo desejado, em segundos.
+
+    Returns:
+        O modelo do agregado, ou None se nenhum agregado for compatível (deve-se usar as medições brutas).
+    """
+    for model in ROLLUP_MODELS:
+        if bucket_seconds % model.BUCKET_SECONDS == 0:
+            return model
+    return None
+
+def _aggregate(samples: List[dict]) -> Dict[type, List[dict]]:
+    """Agrega as medições (device_id, timestamp, value, abnormal) por agregado, dispositivo e intervalo."""
+    aggregated = {}
+    for model in ROLLUP_MODELS:
+        buckets: Dict[Tuple[str, datetime], dict] = {}
+        for s in samples:
+            ts = s["timestamp"]
+            bucket_start = ts - timedelta(seconds=(ts.minute * 60 + ts.second) % model.BUCKET_SECONDS, microseconds=ts.microsecond)
+            key = (s["device_id"], bucket_start)
+            b = buckets.get(key)
+            if b is None:
+                buckets[key] = {
+                    "device_id": s["device_id"], "bucket_start": bucket_start, "count": 1, "sum": s["value"],
+                    "min": s["value"], "max": s["value"], "abnormal_count": int(s["abnormal"]),
+                }
+            else:
+                b["count"] += 1
+                b["sum"] += s["value"]
+                b["min"] = min(b["min"], s["value"])
+                b["max"] = max(b["max"], s["value"])
+                b["abnormal_count"] += int(s["abnormal"])
+        aggregated[model] = list(buckets.values())
+    return aggregated
+
+def _upsert_statement(model, values: List[dict], dialect_name: str):
+    """Monta o insert que soma os valores aos agregados já existentes (upsert), conforme o banco."""
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(model).values(values)
+        return stmt.on_duplicate_key_update(
+            count=model.count + stmt.inserted["count"],
+            sum=model.sum + stmt.inserted["sum"],
+            min=func.least(model.min, stmt.inserted["min"]),
+            max=func.greatest(model.max, stmt.inserted["max"]),
+            abnormal_count=model.abnormal_count + stmt.inserted["abnormal_count"],
+        )
+
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        least, greatest = func.min, func.max
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+        least, greatest = func.least, func.greatest
+    stmt = insert(model).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[model.device_id, model.bucket_start],
+        set_={
+            "count": model.count + stmt.excluded["count"],
+            "sum": model.sum + stmt.excluded["sum"],
+            "min": least(model.min, stmt.excluded["min"]),
+            "max": greatest(model.max, stmt.excluded["max"]),
+            "abnormal_count": model.abnormal_count + stmt.excluded["abnormal_count"],
+        },
+    )
+
+# Linhas por upsert, para respeitar o limite de parâmetros por instrução (ex.: SQLite)
+UPSERT_CHUNK_ROWS = 500
+
+def _upsert_statements(samples: List[dict], dialect_name: str):
+    """Gera os upserts dos agregados das medições, com no máximo UPSERT_CHUNK_ROWS linhas cada."""
+    for model, values in _aggregate(samples).items():
+        for start in range(0, len(values), UPSERT_CHUNK_ROWS):
+            yield _upsert_statement(model, values[start:start + UPSERT_CHUNK_ROWS], dialect_name)
+
+def _buckets_query(model, device_id: str, bucket_seconds: int, since: datetime, dialect_name: str):
+    """Monta a consulta que reagrega os agregados no intervalo desejado."""
+    bucket = time_bucket(model.bucket_start, bucket_seconds, dialect_name).label("bucket")
+    subquery = (
+        select(
+            bucket,
+            func.sum(model.count).label("count"),
+            func.min(model.min).label("min"),
+            func.max(model.max).label("max"),
+            (func.sum(model.sum) / func.sum(model.count)).label("avg"),
+            func.sum(model.abnormal_count).label("abnormal_count"),
+        )
+        .where(model.device_id == device_id, model.bucket_start >= bucket_floor(since, bucket_seconds, dialect_name))
+        .group_by(bucket)
+        .subquery()
+    )
+    return (
+        select(
+            from_epoch_seconds(subquery.c.bucket, dialect_name).label("bucket_start"),
+            subquery.c["count"], subquery.c["min"], subquery.c["max"], subquery.c["avg"], subquery.c["abnormal_count"],
+        )
+        .order_by(subquery.c.bucket)
+    )
+
+class RollupRepository:
+    """
+    Responsável pelos agregados de medições por minuto e por hora.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def accumulate(self, samples: List[dict]) -> None:
+        """
+        Soma as medições aos agregados por minuto e por hora, na transação atual (sem commit).
+
+        Args:
+            samples (List[dict]): As medições, com as chaves "device_id", "timestamp", "value" e "abnormal".
+        """
+        if not samples:
+            return
+        dialect_name = self.db.get_bind().dialect.name
+        for stmt in _upsert_statements(samples, dialect_name):
+            self.db.execute(stmt)
+
+    def get_history_buckets(self, device_id: str, bucket_seconds: int, days: int = 30) -> Optional[List[Row]]:
+        """
+        Obtém o histórico agregado em intervalos de tempo a partir do agregado mais grosso compatível,
+        com custo proporcional à quantidade de intervalos, e não de medições. Como nas medições brutas,
+        o primeiro intervalo é completo (o início do período é arredondado para o início do seu intervalo).
+
+        Args:
+            device_id (str): O ID do dispositivo.
+            bucket_seconds (int): O tamanho de cada intervalo, em segundos.
+            days (int): O número de dias a obter (padrão 30).
+
+        Returns:
+            Optional[List[Row]]: Os intervalos (bucket_start, count, min, max, avg, abnormal_count), ordenados por
+            bucket_start, ou None se nenhum agregado for compatível com o intervalo.
+        """
+        model = rollup_for(bucket_seconds)
+        if model is None:
+            return None
+        dialect_name = self.db.get_bind().dialect.name
+        since = datetime.now() - timedelta(days=days)
+        return self.db.execute(_buckets_query(model, device_id, bucket_seconds, since, dialect_name)).all()
+
+class AsyncRollupRepository:
+    """
+    Responsável pelos agregados de medições por minuto e por hora, com sessão assíncrona.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def accumulate(self, samples: List[dict]) -> None:
+        """
+        Soma as medições aos agregados por minuto e por hora, na transação atual (sem commit).
+
+        Args:
+            samples (List[dict]): As medições, com as chaves "device_id", "timestamp", "value" e "abnormal".
+        """
+        if not samples:
+            return
+        dialect_name = self.db.get_bind().dialect.name
+        for stmt in _upsert_statements(samples, dialect_name):
+            await self.db.execute(stmt)
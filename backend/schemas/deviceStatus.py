@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class DeviceStatusResponse(BaseModel):
+    device_id: str
+    last_value: Optional[float] = None
+    last_time_ms: Optional[int] = None
+    last_timestamp: Optional[datetime] = None
+    abnormal_count: int
+    active_irregularity_id: Optional[int] = None
+    in_irregularity: bool
+
+    class Config:
+        orm_mode = True
+
+class DeviceStatusPage(BaseModel):
+    items: list[DeviceStatusResponse]
+    next_cursor: Optional[str] = None
@@ -7,6 +7,9 @@ class IrregularityResponse(BaseModel):
     device_id: str
     start_timestamp: datetime
     end_timestamp: Optional[datetime] = None
+    sample_count: int = 0
+    abnormal_samples: int = 0
+    peak_deviation: float = 0.0
 
     class Config:
         orm_mode = True
@@ -1,10 +1,12 @@
 from datetime import datetime
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, confloat
 
 class MeasurementRequest(BaseModel):
     device_id: str
     time_ms: int
-    value: float
+    # NaN e infinito não são medições válidas (e não podem ser somados aos agregados)
+    value: confloat(allow_inf_nan=False)
 
 class MeasurementResponse(BaseModel):
     id: int
@@ -15,3 +17,28 @@ class MeasurementResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+class MeasurementPage(BaseModel):
+    items: list[MeasurementResponse]
+    next_cursor: Optional[str] = None
+
+class MeasurementBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+    min: float
+    max: float
+    avg: float
+    abnormal_count: Optional[int] = None
+
+class MeasurementBuckets(BaseModel):
+    device_id: str
+    bucket_seconds: int
+    buckets: list[MeasurementBucket]
+
+class MeasurementPoint(BaseModel):
+    timestamp: datetime
+    value: float
+
+class MeasurementPoints(BaseModel):
+    device_id: str
+    points: list[MeasurementPoint]
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+class Subscription:
+    """
+    Inscrição de um cliente nos eventos de um dispositivo, com uma fila limitada própria.
+    """
+
+    def __init__(self, device_id: str, queue_size: int):
+        self.device_id = device_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def _put(self, event: dict) -> None:
+        """Entrega o evento; se o cliente estiver lento e a fila cheia, descarta o evento mais antigo."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        """Aguarda o próximo evento."""
+        return await self.queue.get()
+
+class Broadcaster:
+    """
+    Distribuição em memória (pub/sub) dos eventos de cada dispositivo para os clientes inscritos,
+    de forma que vários painéis acompanhem um mesmo dispositivo sem carga extra no banco de dados.
+    """
+
+    def __init__(self, queue_size: int = 1000):
+        """
+        Args:
+            queue_size (int): Quantidade máxima de eventos pendentes por cliente.
+        """
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._guard = threading.Lock()
+
+    def subscribe(self, device_id: str) -> Subscription:
+        """Inscreve um cliente nos eventos do dispositivo (deve ser chamado dentro do event loop)."""
+        subscription = Subscription(device_id, self.queue_size)
+        with self._guard:
+            self._subscriptions.setdefault(device_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a inscrição do cliente."""
+        with self._guard:
+            subscriptions = self._subscriptions.get(subscription.device_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.device_id, None)
+
+    def has_subscribers(self, device_id: str) -> bool:
+        """Verifica se há clientes inscritos no dispositivo."""
+        return device_id in self._subscriptions
+
+    def subscriber_count(self) -> int:
+        """Quantidade total de clientes inscritos."""
+        with self._guard:
+            return sum(len(s) for s in self._subscriptions.values())
+
+    def publish(self, device_id: str, events: List[dict]) -> None:
+        """
+        Publica eventos do dispositivo para todos os clientes inscritos, sem bloquear.
+        Pode ser chamado de qualquer thread ou event loop.
+
+        Args:
+            device_id (str): O ID do dispositivo.
+            events (List[dict]): Os eventos, em ordem.
+        """
+        with self._guard:
+            subscriptions = list(self._subscriptions.get(device_id, ()))
+        if not subscriptions:
+            return
+
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+
+        for subscription in subscriptions:
+            for event in events:
+                if subscription.loop is current_loop:
+                    subscription._put(event)
+                elif not subscription.loop.is_closed():
+                    subscription.loop.call_soon_threadsafe(subscription._put, event)
+
+    def publish_measurements(self, measurements: List[dict], timestamp: datetime) -> None:
+        """
+        Publica as medições processadas (e os alertas 'bip'/'bipbip' gerados por elas) aos clientes
+        inscritos nos respectivos dispositivos.
+
+        Args:
+            measurements (List[dict]): As medições, em ordem, com as chaves "device_id", "time_ms", "value" e "alert".
+            timestamp (datetime): O timestamp de registro das medições.
+        """
+        events: Dict[str, List[dict]] = {}
+        for m in measurements:
+            device_id = m["device_id"]
+            if not self.has_subscribers(device_id):
+                continue
+            device_events = events.setdefault(device_id, [])
+            device_events.append({
+                "type": "measurement",
+                "device_id": device_id,
+                "time_ms": m["time_ms"],
+                "value": m["value"],
+                "timestamp": timestamp.isoformat(),
+                "alert": m["alert"],
+            })
+            if m["alert"] is not None:
+                device_events.append({
+                    "type": "irregularity",
+                    "device_id": device_id,
+                    "alert": m["alert"],
+                    "status": "open" if m["alert"] == "bip" else "closed",
+                    "timestamp": timestamp.isoformat(),
+                })
+        for device_id, device_events in events.items():
+            self.publish(device_id, device_events)
+
+# Distribuição compartilhada pelas requisições do processo
+broadcaster = Broadcaster()
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+# Parâmetros da detecção de irregularidades
+WINDOW_SIZE = 60
+OPEN_THRESHOLD = 5
+CLOSE_SAMPLES = 60
+
+class DeviceState:
+    """
+    Estado em memória de um dispositivo: janela deslizante das últimas medições
+    (normal/anormal), contagem de anormais na janela e a irregularidade ativa.
+    """
+
+    def __init__(self, flags: Iterable[bool] = (), in_irregularity: bool = False, samples_since_irregularity: int = 0):
+        """
+        Inicializa o estado a partir das últimas medições do dispositivo.
+
+        Args:
+            flags (Iterable[bool]): Flags de anormalidade das últimas medições, da mais antiga para a mais recente.
+            in_irregularity (bool): Se o dispositivo possui uma irregularidade ativa.
+            samples_since_irregularity (int): Quantidade de medições desde o início da irregularidade ativa.
+        """
+        self.window: Deque[bool] = deque(maxlen=WINDOW_SIZE)
+        self.abnormal_count = 0
+        for flag in flags:
+            self._append(flag)
+        self.in_irregularity = in_irregularity
+        self.samples_since_irregularity = samples_since_irregularity if in_irregularity else 0
+        self._reset_pending()
+
+    def _reset_pending(self) -> None:
+        # Resumo das medições da irregularidade ainda não gravado no banco
+        self.pending_samples = 0
+        self.pending_abnormal = 0
+        self.pending_peak = 0.0
+
+    def _track(self, abnormal: bool, deviation: float) -> None:
+        """Soma a medição ao resumo pendente da irregularidade."""
+        self.pending_samples += 1
+        if abnormal:
+            self.pending_abnormal += 1
+        if deviation > self.pending_peak:
+            self.pending_peak = deviation
+
+    def take_pending(self) -> dict:
+        """
+        Retorna e zera o resumo pendente da irregularidade: as medições registradas desde a última
+        gravação, quantas delas são anormais e o maior desvio relativo entre elas.
+
+        Returns:
+            dict: As chaves "sample_count", "abnormal_samples" e "peak_deviation".
+        """
+        pending = {"sample_count": self.pending_samples, "abnormal_samples": self.pending_abnormal, "peak_deviation": self.pending_peak}
+        self._reset_pending()
+        return pending
+
+    def snapshot(self) -> tuple:
+        """Retorna uma cópia do estado, para desfazer as medições de um lote que não foi aceito (ver `restore`)."""
+        return (
+            deque(self.window, maxlen=WINDOW_SIZE), self.abnormal_count, self.in_irregularity, self.samples_since_irregularity,
+            self.pending_samples, self.pending_abnormal, self.pending_peak,
+        )
+
+    def restore(self, snapshot: tuple) -> None:
+        """Volta o estado à cópia feita por `snapshot`."""
+        (
+            self.window, self.abnormal_count, self.in_irregularity, self.samples_since_irregularity,
+            self.pending_samples, self.pending_abnormal, self.pending_peak,
+        ) = snapshot
+
+    def _append(self, abnormal: bool) -> None:
+        """Adiciona uma flag à janela, mantendo a contagem de anormais em O(1)."""
+        if len(self.window) == self.window.maxlen and self.window[0]:
+            self.abnormal_count -= 1
+        self.window.append(abnormal)
+        if abnormal:
+            self.abnormal_count += 1
+
+    def push(self, abnormal: bool, deviation: float = 0.0) -> Optional[str]:
+        """
+        Registra uma nova medição na janela e decide se envia 'bip' ou 'bipbip'.
+
+        As medições desde o início da irregularidade (inclusive a que a abre e a que a fecha)
+        são somadas ao resumo pendente, gravado pelo serviço com `take_pending`.
+
+        Args:
+            abnormal (bool): Se a medição é anormal.
+            deviation (float): O desvio relativo da medição em relação ao baseline.
+
+        Returns:
+            Optional[str]: "bip" se uma irregularidade deve ser aberta, "bipbip" se a irregularidade
+            ativa deve ser fechada, None caso contrário.
+        """
+        self._append(abnormal)
+
+        if self.in_irregularity:
+            self.samples_since_irregularity += 1
+            self._track(abnormal, deviation)
+
+        if self.abnormal_count >= OPEN_THRESHOLD and not self.in_irregularity:
+            self.in_irregularity = True
+            self.samples_since_irregularity = 1
+            self._reset_pending()
+            self._track(abnormal, deviation)
+            return "bip"  # sinal de emergência
+        if self.abnormal_count == 0 and self.in_irregularity and self.samples_since_irregularity >= CLOSE_SAMPLES:
+            self.in_irregularity = False
+            self.samples_since_irregularity = 0
+            return "bipbip"  # fecha emergência
+        return None
+
+class DeviceStateStore:
+    """
+    Armazena o estado em memória de cada dispositivo, com um lock por dispositivo
+    para que as medições de um mesmo dispositivo sejam processadas em ordem.
+
+    O caminho síncrono usa `lock` e o assíncrono usa `async_lock`. Os dois não se excluem entre si,
+    então cada dispositivo fica associado ao caminho do seu primeiro uso, e o outro é recusado.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, DeviceState] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, device_id: str) -> Optional[DeviceState]:
+        """Retorna o estado do dispositivo, ou None se ainda não foi carregado."""
+        return self._states.get(device_id)
+
+    def set(self, device_id: str, state: DeviceState) -> None:
+        """Define o estado do dispositivo."""
+        self._states[device_id] = state
+
+    def discard(self, device_id: str) -> None:
+        """Descarta o estado do dispositivo, forçando o recarregamento no próximo uso."""
+        self._states.pop(device_id, None)
+
+    def lock(self, device_id: str) -> threading.Lock:
+        """
+        Retorna o lock do dispositivo, criando-o se necessário.
+
+        Raises:
+            RuntimeError: Se o dispositivo já foi ingerido pelo caminho assíncrono neste processo.
+        """
+        with self._guard:
+            lock = self._locks.get(device_id)
+            if lock is None:
+                if device_id in self._async_locks:
+                    raise RuntimeError(f"O dispositivo {device_id} já é ingerido pelo caminho assíncrono")
+                lock = self._locks[device_id] = threading.Lock()
+            return lock
+
+    def async_lock(self, device_id: str) -> asyncio.Lock:
+        """
+        Retorna o lock assíncrono do dispositivo, criando-o se necessário.
+
+        Raises:
+            RuntimeError: Se o dispositivo já foi ingerido pelo caminho síncrono neste processo.
+        """
+        lock = self._async_locks.get(device_id)
+        if lock is None:
+            with self._guard:
+                if device_id in self._locks:
+                    raise RuntimeError(f"O dispositivo {device_id} já é ingerido pelo caminho síncrono")
+                lock = self._async_locks.setdefault(device_id, asyncio.Lock())
+        return lock
+
+    def clear(self) -> None:
+        """Descarta o estado de todos os dispositivos."""
+        with self._guard:
+            self._states.clear()
+            self._locks.clear()
+            self._async_locks.clear()
+
+# Estado compartilhado pelas requisições do processo
+device_states = DeviceStateStore()
@@ -0,0 +1,62 @@
+"""
+Respostas dos quadros binários de medições (utils.frames), para que o reenvio de um quadro
+(ex.: a resposta UDP se perdeu) não grave as medições duas vezes nem avance duas vezes a
+máquina de estados das irregularidades.
+
+Para cada dispositivo é guardada a resposta do último quadro com sequência. Um quadro com a
+mesma sequência recebe a mesma resposta, sem ser processado; se o original ainda estiver em
+processamento, o reenvio aguarda o resultado dele. As respostas ficam na memória do processo,
+que é o único a receber as medições do dispositivo (ver core.sharding).
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+class FrameReplies:
+    """Resposta do último quadro de cada dispositivo, por sequência."""
+
+    def __init__(self):
+        self._last: Dict[str, Tuple[int, asyncio.Future]] = {}
+
+    async def reply(self, device_id: str, seq: int, process: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, bool]:
+        """
+        Processa o quadro, ou retorna a resposta já dada a ele se for um reenvio.
+
+        Args:
+            device_id (str): O ID do dispositivo.
+            seq (int): A sequência do quadro (0: sempre processado).
+            process (Callable[[], Awaitable[bytes]]): Processa o quadro e retorna a resposta.
+
+        Returns:
+            Tuple[bytes, bool]: A resposta, e True se o quadro era um reenvio.
+
+        Raises:
+            Exception: O erro do processamento; o quadro não é registrado, e um reenvio é processado normalmente.
+        """
+        if seq == 0:
+            return await process(), False
+        last = self._last.get(device_id)
+        if last is not None and last[0] == seq:
+            return await asyncio.shield(last[1]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._last[device_id] = (seq, future)
+        try:
+            result = await process()
+        except BaseException as e:
+            if self._last.get(device_id) == (seq, future):
+                del self._last[device_id]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Evita o aviso de exceção não lida quando nenhum reenvio aguardava o resultado
+                future.exception()
+            raise
+        future.set_result(result)
+        return result, False
+
+    def clear(self) -> None:
+        """Descarta todas as respostas guardadas."""
+        self._last.clear()
+
+frame_replies = FrameReplies()
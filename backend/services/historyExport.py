@@ -0,0 +1,159 @@
+from typing import BinaryIO, Iterable, Iterator, Optional, Set
+import numpy as np
+from sqlalchemy.orm import Session
+from repos.measurementRepository import MeasurementRepository
+from repos.irregularityRepository import IrregularityRepository
+from repos.rollupRepository import RollupRepository
+from repos.deviceStatusRepository import DeviceStatusRepository
+from services.deviceState import DeviceStateStore, WINDOW_SIZE, device_states
+from utils import baseline as baseline_lib
+from utils.columnar import IRREGULARITY_SCHEMA, MEASUREMENT_SCHEMA, decode, encode, to_batches
+
+# Tipos de dado exportáveis e o esquema colunar de cada um
+EXPORT_SCHEMAS = {
+    "measurements": MEASUREMENT_SCHEMA,
+    "irregularities": IRREGULARITY_SCHEMA,
+}
+
+# Colunas ausentes nos arquivos exportados por versões anteriores, e o valor usado na importação
+OPTIONAL_COLUMNS = {
+    "measurements": {},
+    "irregularities": {"sample_count": 0, "abnormal_samples": 0, "peak_deviation": 0.0},
+}
+
+class HistoryExportService:
+    """
+    Exportação e importação do histórico (medições e irregularidades) em formato colunar
+    (Arrow IPC ou Parquet), lendo e gravando o banco em blocos.
+    """
+
+    def __init__(self, db: Session, states: DeviceStateStore = device_states, chunk_size: int = 10000):
+        """
+        Args:
+            db (Session): A sessão do banco de dados.
+            states (DeviceStateStore): Estado em memória dos dispositivos, descartado para os dispositivos importados.
+            chunk_size (int): A quantidade de linhas por bloco lido do banco ou do arquivo.
+        """
+        self.db = db
+        self.states = states
+        self.chunk_size = chunk_size
+
+    def export(self, kind: str, device_id: Optional[str] = None, days: int = 30, file_format: str = "parquet") -> Iterator[bytes]:
+        """
+        Exporta o histórico de um dispositivo (ou de todos) com cursor no servidor, em blocos.
+
+        Args:
+            kind (str): "measurements" ou "irregularities".
+            device_id (Optional[str]): O ID do dispositivo; se None, exporta todos os dispositivos.
+            days (int): A quantidade de dias do histórico.
+            file_format (str): "arrow" (Arrow IPC stream) ou "parquet".
+
+        Yields:
+            bytes: Os trechos do arquivo, em ordem.
+        """
+        if kind == "measurements":
+            rows = MeasurementRepository(self.db).iter_history(device_id, days, self.chunk_size)
+        else:
+            rows = IrregularityRepository(self.db).iter_all(device_id, days, self.chunk_size)
+        schema = EXPORT_SCHEMAS[kind]
+        yield from encode(to_batches(rows, schema, self.chunk_size), schema, file_format)
+
+    def device_ids(self, source: BinaryIO) -> Set[str]:
+        """
+        Retorna os dispositivos de um arquivo exportado, lendo apenas a coluna device_id
+        (usado para verificar, antes de importar, se eles pertencem a esta instância).
+
+        Args:
+            source (BinaryIO): O arquivo, posicionado no início e com suporte a seek; volta ao início ao final.
+
+        Returns:
+            Set[str]: Os IDs dos dispositivos.
+
+        Raises:
+            pyarrow.ArrowInvalid: Se o conteúdo não for um arquivo Arrow ou Parquet válido.
+        """
+        device_ids = set()
+        for batch in decode(source, self.chunk_size, ["device_id"]):
+            device_ids.update(batch.column(0).unique().to_pylist())
+        source.seek(0)
+        return device_ids
+
+    def import_file(self, kind: str, source: BinaryIO) -> int:
+        """
+        Importa um arquivo exportado (Arrow IPC ou Parquet) com inserts em lote, um commit por bloco.
+
+        Os IDs do arquivo são descartados e gerados novamente pelo banco. As medições importadas
+        também são somadas aos agregados por minuto/hora, a situação dos dispositivos importados
+        (visão da frota) é atualizada, e o estado em memória deles é descartado, para ser recarregado
+        do banco no próximo uso. Com várias instâncias, a importação deve ser feita pela instância
+        dona dos dispositivos, a única que mantém o estado deles (ver `device_ids`). As colunas de
+        OPTIONAL_COLUMNS (o resumo das irregularidades, ausente nos arquivos de versões anteriores)
+        recebem o valor padrão quando não estão no arquivo.
+
+        Args:
+            kind (str): "measurements" ou "irregularities".
+            source (BinaryIO): O arquivo, posicionado no início e com suporte a seek.
+
+        Returns:
+            int: A quantidade de linhas importadas.
+
+        Raises:
+            ValueError: Se faltar alguma coluna obrigatória no arquivo.
+            pyarrow.ArrowInvalid: Se o conteúdo não for um arquivo Arrow ou Parquet válido.
+        """
+        columns = [name for name in EXPORT_SCHEMAS[kind].names if name != "id"]
+        optional = OPTIONAL_COLUMNS[kind]
+        device_ids = set()
+        total = 0
+        for batch in decode(source, self.chunk_size):
+            missing = set(columns) - set(batch.schema.names)
+            if missing - set(optional):
+                raise ValueError(f"Colunas ausentes no arquivo: {', '.join(sorted(missing - set(optional)))}")
+            rows = batch.select([name for name in columns if name not in missing]).to_pylist()
+            if missing:
+                defaults = {name: optional[name] for name in missing}
+                rows = [{**defaults, **row} for row in rows]
+            if kind == "measurements":
+                self._import_measurements(batch, rows)
+            else:
+                IrregularityRepository(self.db).create_many(rows, commit=False)
+            self.db.commit()
+            device_ids.update(batch.column("device_id").unique().to_pylist())
+            total += len(rows)
+
+        self._refresh_statuses(device_ids)
+        self.db.commit()
+        for device_id in device_ids:
+            self.states.discard(device_id)
+        return total
+
+    def _refresh_statuses(self, device_ids: Iterable[str]) -> None:
+        """
+        Atualiza, na transação atual, a situação dos dispositivos a partir do banco: a última medição,
+        as anormais entre as últimas WINDOW_SIZE medições e a irregularidade aberta (lida no upsert).
+        """
+        measurement_repo = MeasurementRepository(self.db)
+        statuses = []
+        for device_id in sorted(device_ids):
+            last = measurement_repo.get_last_n(device_id, WINDOW_SIZE)
+            status = {"device_id": device_id, "last_value": None, "last_time_ms": None, "last_timestamp": None, "abnormal_count": 0}
+            if last:
+                time_ms = np.array([m.time_ms for m in last], dtype=np.int64)
+                values = np.array([m.value for m in last], dtype=np.float64)
+                status.update(
+                    last_value=last[0].value, last_time_ms=last[0].time_ms, last_timestamp=last[0].timestamp,
+                    abnormal_count=int(baseline_lib.is_abnormal_array(values, baseline_lib.compute_baseline_array(time_ms)).sum()),
+                )
+            statuses.append(status)
+        DeviceStatusRepository(self.db).upsert_many(statuses)
+
+    def _import_measurements(self, batch, rows: list) -> None:
+        """Insere um bloco de medições e o soma aos agregados, na transação atual."""
+        time_ms = batch.column("time_ms").to_numpy(zero_copy_only=False).astype(np.int64)
+        values = batch.column("value").to_numpy(zero_copy_only=False).astype(np.float64)
+        flags = baseline_lib.is_abnormal_array(values, baseline_lib.compute_baseline_array(time_ms))
+        RollupRepository(self.db).accumulate([
+            {"device_id": row["device_id"], "timestamp": row["timestamp"], "value": row["value"], "abnormal": bool(abnormal)}
+            for row, abnormal in zip(rows, flags)
+        ])
+        MeasurementRepository(self.db).create_many(rows, commit=False)
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from repos.measurementRepository import AsyncMeasurementRepository
+from repos.irregularityRepository import AsyncIrregularityRepository
+from repos.rollupRepository import AsyncRollupRepository
+from repos.deviceStatusRepository import AsyncDeviceStatusRepository
+from services.deviceState import DeviceStateStore, device_states
+
+logger = logging.getLogger(__name__)
+
+# Item da fila: ("measurement", medição), ("open", irregularidade aberta), ("close", irregularidade fechada)
+# ("samples", resumo das medições da irregularidade ativa) ou ("status", situação atual do dispositivo)
+IngestItem = Tuple[str, dict]
+
+class IngestQueueFull(Exception):
+    """
+    A fila de gravação não teve espaço para as medições dentro do tempo de espera.
+    """
+
+class IngestQueue:
+    """
+    Fila limitada de gravação em segundo plano (write-behind).
+
+    As medições e as aberturas/fechamentos de irregularidades são enfileirados na ordem em que
+    foram decididos, e uma tarefa em segundo plano os grava em lote, com um único commit,
+    a cada `flush_interval_ms` ou quando a fila acumula `flush_rows` itens.
+
+    Um lote que falha é gravado novamente (até `flush_retries` vezes, com espera crescente), antes
+    dos lotes seguintes, para manter a ordem. Se ainda assim falhar, ele é descartado (os alertas já
+    enviados aos clientes não podem ser desfeitos).
+
+    Na primeira falha, o estado em memória dos dispositivos do lote é descartado: as medições
+    seguintes deles não são decididas sobre um estado que conta com um lote que pode ser perdido.
+    O estado é recarregado do banco apenas depois que os itens ainda na fila desses dispositivos
+    forem gravados ou descartados (ver `wait_settled`).
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        maxsize: int = 100000,
+        flush_interval_ms: int = 50,
+        flush_rows: int = 5000,
+        flush_retries: int = 3,
+        retry_delay_ms: int = 100,
+        states: DeviceStateStore = device_states,
+    ):
+        """
+        Inicializa a fila de gravação.
+
+        Args:
+            session_factory (async_sessionmaker): Fábrica de sessões assíncronas usada nas gravações.
+            maxsize (int): Quantidade máxima de itens na fila.
+            flush_interval_ms (int): Intervalo máximo entre as gravações, em milissegundos.
+            flush_rows (int): Quantidade máxima de itens gravados por lote.
+            flush_retries (int): Quantidade de novas tentativas de gravar um lote que falhou.
+            retry_delay_ms (int): Espera antes da primeira nova tentativa, em milissegundos; dobra a cada tentativa.
+            states (DeviceStateStore): Estado em memória dos dispositivos, descartado quando a gravação de um lote falha.
+        """
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_rows = flush_rows
+        self.flush_retries = flush_retries
+        self.retry_delay = retry_delay_ms / 1000
+        self.states = states
+
+        self._buffer: Deque[IngestItem] = deque()
+        # Itens de cada dispositivo ainda não gravados nem descartados (na fila ou no lote em gravação)
+        self._pending: Dict[str, int] = {}
+        self._settled: Optional[asyncio.Condition] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Métricas
+        self.enqueued_total = 0
+        self.rejected_total = 0
+        self.flushed_total = 0
+        # Itens descartados após esgotar as novas tentativas, e novas tentativas de gravação
+        self.failed_total = 0
+        self.retry_count = 0
+        self.flush_count = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Quantidade de itens aguardando gravação."""
+        return len(self._buffer)
+
+    def start(self) -> None:
+        """Inicia a tarefa de gravação em segundo plano (deve ser chamado dentro do event loop)."""
+        self._space = asyncio.Condition()
+        self._settled = asyncio.Condition()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para de aceitar itens, grava tudo o que está na fila e encerra a tarefa em segundo plano."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def put(self, items: List[IngestItem], timeout: float = 1.0) -> None:
+        """
+        Enfileira itens para gravação, aguardando espaço na fila (backpressure).
+
+        Args:
+            items (List[IngestItem]): Os itens, na ordem em que devem ser gravados.
+            timeout (float): Tempo máximo de espera por espaço na fila, em segundos.
+
+        Raises:
+            IngestQueueFull: Se não houver espaço na fila dentro do tempo de espera, ou se a fila estiver parando.
+        """
+        if self._task is None or self._stopping:
+            raise IngestQueueFull("A fila de gravação não está em execução")
+        if len(items) > self.maxsize:
+            raise IngestQueueFull("O lote é maior que a capacidade da fila de gravação")
+
+        async with self._space:
+            try:
+                await asyncio.wait_for(
+                    self._space.wait_for(lambda: len(self._buffer) + len(items) <= self.maxsize),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                self.rejected_total += len(items)
+                raise IngestQueueFull("A fila de gravação está cheia")
+            self._buffer.extend(items)
+            self.enqueued_total += len(items)
+            for _, payload in items:
+                device_id = payload["device_id"]
+                self._pending[device_id] = self._pending.get(device_id, 0) + 1
+
+        if len(self._buffer) >= self.flush_rows:
+            self._wakeup.set()
+
+    async def wait_settled(self, device_id: str) -> None:
+        """
+        Aguarda até que todos os itens do dispositivo na fila sejam gravados (ou descartados),
+        antecipando a gravação. Usado antes de recarregar do banco o estado do dispositivo.
+
+        Args:
+            device_id (str): O ID do dispositivo.
+        """
+        if self._settled is None:
+            return
+        async with self._settled:
+            while self._pending.get(device_id):
+                self._wakeup.set()
+                await self._settled.wait()
+
+    def metrics(self) -> dict:
+        """Retorna as métricas da fila (profundidade, totais e latência das gravações)."""
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "enqueued_total": self.enqueued_total,
+            "rejected_total": self.rejected_total,
+            "flushed_total": self.flushed_total,
+            "failed_total": self.failed_total,
+            "retry_count": self.retry_count,
+            "flush_count": self.flush_count,
+            "flush_seconds_total": self.flush_seconds_total,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+        }
+
+    async def _run(self) -> None:
+        """Laço da tarefa em segundo plano: grava a fila periodicamente até ser parada e esvaziada."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), self.flush_rows))]
+                async with self._space:
+                    self._space.notify_all()
+                await self._flush(batch)
+                async with self._settled:
+                    for device_id, count in Counter(payload["device_id"] for _, payload in batch).items():
+                        left = self._pending[device_id] - count
+                        if left:
+                            self._pending[device_id] = left
+                        else:
+                            del self._pending[device_id]
+                    self._settled.notify_all()
+                # Lotes cheios são gravados em seguida; o restante aguarda o próximo intervalo
+                if len(self._buffer) < self.flush_rows and not self._stopping:
+                    break
+
+            if self._stopping and not self._buffer:
+                return
+
+    async def _flush(self, batch: List[IngestItem]) -> None:
+        """
+        Grava um lote de itens, tentando novamente em caso de falha. Na primeira falha, descarta o
+        estado em memória dos dispositivos do lote; se todas as tentativas falharem, descarta o lote.
+        """
+        delay = self.retry_delay
+        for attempt in range(self.flush_retries + 1):
+            if attempt:
+                self.retry_count += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+            try:
+                await self._write(batch)
+                self.flushed_total += len(batch)
+                return
+            except Exception:
+                logger.exception("Falha ao gravar %d itens da fila de ingestão (tentativa %d)", len(batch), attempt + 1)
+                if not attempt:
+                    for device_id in {payload["device_id"] for _, payload in batch}:
+                        self.states.discard(device_id)
+
+        self.failed_total += len(batch)
+        logger.error("%d itens da fila de ingestão descartados após %d tentativas", len(batch), self.flush_retries + 1)
+
+    async def _write(self, batch: List[IngestItem]) -> None:
+        """Grava um lote de itens, em ordem, com um único commit."""
+        start = time.perf_counter()
+        try:
+            async with self.session_factory() as db:
+                measurement_repo = AsyncMeasurementRepository(db)
+                irregularity_repo = AsyncIrregularityRepository(db)
+                rows = []
+                rollup_samples = []
+                statuses = {}
+                for kind, payload in batch:
+                    if kind == "measurement":
+                        rows.append({k: payload[k] for k in ("device_id", "time_ms", "value", "timestamp")})
+                        rollup_samples.append(payload)
+                        continue
+                    if kind == "status":
+                        # Apenas a situação mais recente de cada dispositivo é gravada, ao final do lote
+                        statuses[payload["device_id"]] = payload
+                        continue
+
+                    # As medições anteriores ao evento são gravadas antes dele, preservando a ordem
+                    await measurement_repo.create_many(rows, commit=False)
+                    rows = []
+                    # Abertura e fechamento atômicos: uma transição já aplicada por outro processo é ignorada
+                    if kind == "open":
+                        await irregularity_repo.open_if_absent(payload["device_id"], payload["start_timestamp"], payload.get("stats"), commit=False)
+                    elif kind == "close":
+                        await irregularity_repo.close_active(payload["device_id"], payload.get("stats"), commit=False)
+                    elif kind == "samples":
+                        await irregularity_repo.add_samples(payload["device_id"], payload["stats"], commit=False)
+
+                await measurement_repo.create_many(rows, commit=False)
+                await AsyncRollupRepository(db).accumulate(rollup_samples)
+                await AsyncDeviceStatusRepository(db).upsert_many(list(statuses.values()))
+                await db.commit()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.flush_count += 1
+            self.flush_seconds_total += elapsed
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
@@ -1,21 +1,89 @@
-import math
 import datetime
+import numpy as np
+from contextlib import AsyncExitStack, ExitStack
+from typing import Dict, List, Optional, Tuple
 from models.measurement import Measurement
 from models.irregularity import Irregularity
-from repos.measurementRepository import MeasurementRepository
-from repos.irregularityRepository import IrregularityRepository
+from repos.measurementRepository import MeasurementRepository, AsyncMeasurementRepository
+from repos.irregularityRepository import IrregularityRepository, AsyncIrregularityRepository
+from repos.rollupRepository import RollupRepository, AsyncRollupRepository
+from repos.deviceStatusRepository import DeviceStatusRepository, AsyncDeviceStatusRepository
+from utils import baseline as baseline_lib
+from core.metrics import record_ingest
+from services.ingestQueue import IngestQueue
+from services.broadcaster import Broadcaster
+from services.deviceState import DeviceState, DeviceStateStore, device_states, WINDOW_SIZE
+
+def _build_state(last_measurements: List[Measurement], active_irreg: Optional[Irregularity]) -> DeviceState:
+    """Monta o estado do dispositivo a partir das suas últimas medições (mais recentes primeiro) e da irregularidade ativa."""
+    flags = [baseline_lib.is_abnormal(m.value, baseline_lib.compute_baseline(m.time_ms)) for m in reversed(last_measurements)]
+    # As medições desde o início da irregularidade ativa ficam no resumo dela
+    samples_since = active_irreg.sample_count if active_irreg is not None else 0
+    return DeviceState(flags, active_irreg is not None, samples_since)
+
+def _decide(
+    samples: List[dict], deviations: List[float], states: Dict[str, DeviceState], now: datetime.datetime,
+) -> Tuple[List[tuple], Dict[str, dict], List[dict]]:
+    """
+    Executa a máquina de estados sobre as medições, em ordem, sem acessar o banco.
+
+    Returns:
+        Para cada medição, a medição, se é anormal, o alerta e o resumo da irregularidade aberta/fechada por ela;
+        o resumo pendente das irregularidades ativas; e a situação de cada dispositivo.
+    """
+    decided = []
+    for s, deviation in zip(samples, deviations):
+        state = states[s["device_id"]]
+        abnormal = deviation >= baseline_lib.DEVIATION_THRESHOLD
+        alert = state.push(abnormal, deviation)
+        decided.append((s, abnormal, alert, state.take_pending() if alert is not None else None))
+    return decided, MeasurementService.pending_stats(states), MeasurementService.device_statuses(samples, states, now)
+
+def _rows(decided: List[tuple], now: datetime.datetime) -> Tuple[List[dict], List[dict]]:
+    """Monta as linhas das medições decididas e as medições somadas aos agregados."""
+    rows = []
+    rollup_samples = []
+    for s, abnormal, _, _ in decided:
+        rows.append({"device_id": s["device_id"], "time_ms": s["time_ms"], "value": s["value"], "timestamp": now})
+        rollup_samples.append({"device_id": s["device_id"], "timestamp": now, "value": s["value"], "abnormal": abnormal})
+    return rows, rollup_samples
+
+def _results(decided: List[tuple], alerts: List[Optional[str]]) -> List[dict]:
+    """Monta o retorno de cada medição, com o alerta efetivamente aplicado."""
+    return [
+        {"device_id": s["device_id"], "time_ms": s["time_ms"], "value": s["value"], "alert": alert}
+        for (s, _, _, _), alert in zip(decided, alerts)
+    ]
 
 class MeasurementService:
-    def __init__(self, measurement_repo: MeasurementRepository, irregularity_repo: IrregularityRepository):
+    def __init__(
+        self,
+        measurement_repo: MeasurementRepository,
+        irregularity_repo: IrregularityRepository,
+        states: DeviceStateStore = device_states,
+        rollup_repo: Optional[RollupRepository] = None,
+        broadcaster: Optional[Broadcaster] = None,
+        status_repo: Optional[DeviceStatusRepository] = None,
+    ):
         """
         Inicializa o serviço de medições com os repositórios necessários.
 
         Args:
             measurement_repo (MeasurementRepository): Repositório de medições.
             irregularity_repo (IrregularityRepository): Repositório de irregularidades.
+            states (DeviceStateStore): Estado em memória dos dispositivos (padrão: estado compartilhado do processo).
+            rollup_repo (Optional[RollupRepository]): Repositório dos agregados por minuto/hora, atualizados
+                a cada medição, se informado.
+            broadcaster (Optional[Broadcaster]): Distribuição em tempo real das medições e alertas, se informada.
+            status_repo: Repositório da situação atual dos dispositivos (visão da frota), atualizada
+                a cada medição, se informado.
         """
         self.measurement_repo = measurement_repo
         self.irregularity_repo = irregularity_repo
+        self.states = states
+        self.rollup_repo = rollup_repo
+        self.broadcaster = broadcaster
+        self.status_repo = status_repo
 
     @staticmethod
     def compute_baseline(time_ms: int) -> float:
@@ -24,19 +92,15 @@ class MeasurementService:
         Y = -0.06366 + 0.12613 cos(pi * x/500) + 0.12258 cos(pi * x/250)
             + 0.01593 sin(pi * x/500) + 0.03147 sin(pi * x/250)
 
+        O cálculo é feito por `utils.baseline`, com a tabela pré-calculada de um período.
+
         Args:
             time_ms (int): O tempo em milissegundos para o qual se deseja calcular o baseline.
 
         Returns:
             float: O valor baseline.
         """
-        x = time_ms
-        y = (-0.06366 +
-             0.12613 * (math.cos(math.pi * x / 500)) +
-             0.12258 * (math.cos(math.pi * x / 250)) +
-             0.01593 * (math.sin(math.pi * x / 500)) +
-             0.03147 * (math.sin(math.pi * x / 250)))
-        return y
+        return baseline_lib.compute_baseline(time_ms)
 
     @staticmethod
     def is_abnormal(measured: float, baseline: float) -> bool:
@@ -50,13 +114,289 @@ class MeasurementService:
         Returns:
             bool: True se a medição desviar 20% ou mais do baseline, False caso contrário.
         """
-        if baseline == 0:
-            return abs(measured - baseline) >= 0.2
-        return abs(measured - baseline) / abs(baseline) >= 0.2
+        return baseline_lib.is_abnormal(measured, baseline)
+
+    @staticmethod
+    def deviations(samples: List[dict]) -> List[float]:
+        """
+        Calcula, de uma só vez, o desvio relativo de cada medição de um lote em relação ao baseline.
+
+        Args:
+            samples (List[dict]): As medições, cada uma com as chaves "time_ms" e "value".
+
+        Returns:
+            List[float]: Para cada medição, na mesma ordem, o desvio relativo.
+        """
+        time_ms = np.fromiter((s["time_ms"] for s in samples), dtype=np.int64, count=len(samples))
+        values = np.fromiter((s["value"] for s in samples), dtype=np.float64, count=len(samples))
+        return baseline_lib.relative_deviation_array(values, baseline_lib.compute_baseline_array(time_ms)).tolist()
+
+    @staticmethod
+    def abnormal_flags(samples: List[dict]) -> List[bool]:
+        """
+        Verifica, de uma só vez, quais medições de um lote são anormais.
+
+        Args:
+            samples (List[dict]): As medições, cada uma com as chaves "time_ms" e "value".
+
+        Returns:
+            List[bool]: Para cada medição, na mesma ordem, True se ela for anormal.
+        """
+        return [deviation >= baseline_lib.DEVIATION_THRESHOLD for deviation in MeasurementService.deviations(samples)]
+
+    @staticmethod
+    def device_statuses(samples: List[dict], states: Dict[str, DeviceState], timestamp: datetime.datetime) -> List[dict]:
+        """
+        Monta a situação atual de cada dispositivo do lote, a partir da sua última medição.
+
+        Args:
+            samples (List[dict]): As medições, em ordem, com as chaves "device_id", "time_ms" e "value".
+            states (Dict[str, DeviceState]): O estado de cada dispositivo, já atualizado com as medições.
+            timestamp (datetime.datetime): O instante de gravação das medições.
+
+        Returns:
+            List[dict]: A situação de cada dispositivo, para DeviceStatusRepository.upsert_many.
+        """
+        last = {s["device_id"]: s for s in samples}
+        return [
+            {"device_id": device_id, "last_value": s["value"], "last_time_ms": s["time_ms"],
+             "last_timestamp": timestamp, "abnormal_count": states[device_id].abnormal_count}
+            for device_id, s in last.items()
+        ]
+
+    @staticmethod
+    def pending_stats(states: Dict[str, DeviceState]) -> Dict[str, dict]:
+        """
+        Retorna (e zera) o resumo pendente das irregularidades ativas dos dispositivos.
+
+        Args:
+            states (Dict[str, DeviceState]): O estado de cada dispositivo.
+
+        Returns:
+            Dict[str, dict]: Para cada dispositivo com irregularidade ativa e medições pendentes, o resumo delas.
+        """
+        return {
+            device_id: state.take_pending()
+            for device_id, state in states.items()
+            if state.in_irregularity and state.pending_samples
+        }
+
+    def load_state(self, device_id: str) -> DeviceState:
+        """
+        Obtém o estado em memória do dispositivo, carregando-o dos repositórios no primeiro uso.
+
+        Args:
+            device_id (str): O ID do dispositivo.
+
+        Returns:
+            DeviceState: O estado do dispositivo.
+        """
+        state = self.states.get(device_id)
+        if state is None:
+            last_measurements = self.measurement_repo.get_last_n(device_id, WINDOW_SIZE)
+            state = _build_state(last_measurements, self.irregularity_repo.get_active(device_id))
+            self.states.set(device_id, state)
+        return state
+
+    def apply_alert(self, device_id: str, alert: Optional[str], stats: Optional[dict] = None, commit: bool = True) -> Optional[str]:
+        """
+        Abre ("bip") ou fecha ("bipbip") a irregularidade do dispositivo de forma atômica no banco.
+
+        Se outro processo já tiver aberto (ou fechado) a irregularidade, nada é gravado e o alerta
+        é descartado, para que cada transição seja alertada uma única vez. O estado em memória
+        continua coerente com o banco (o dispositivo segue com ou sem irregularidade aberta).
+
+        Args:
+            device_id (str): O ID do dispositivo.
+            alert (Optional[str]): O alerta decidido pela máquina de estados.
+            stats (Optional[dict]): O resumo pendente da irregularidade (DeviceState.take_pending), gravado junto.
+            commit (bool): Se False, apenas executa a alteração na transação atual, sem commit.
+
+        Returns:
+            Optional[str]: O alerta, ou None se a transição já tinha sido aplicada por outro processo.
+        """
+        if alert == "bip":
+            applied = self.irregularity_repo.open_if_absent(device_id, datetime.datetime.now(), stats, commit=commit)
+        elif alert == "bipbip":
+            applied = self.irregularity_repo.close_active(device_id, stats, commit=commit)
+        else:
+            return alert
+        return alert if applied else None
 
     def process_measurement(self, device_id: str, time_ms: int, value: float) -> dict:
         """
-        Registra a medição, verifica as últimas 60 medições e decide se envia 'bip' ou 'bipbip' (caso aplicável).
+        Registra a medição, atualiza a janela das últimas 60 medições e decide se envia 'bip' ou 'bipbip' (caso aplicável).
+
+        A decisão é tomada sobre o estado em memória do dispositivo, sem leituras no banco de dados
+        (exceto no primeiro uso do dispositivo, quando o estado é carregado).
+        
+        Args:
+            device_id (str): O ID do dispositivo.
+            time_ms (int): O intervalo em milissegundos da medição para usar no cálculo da baseline.
+            value (float): O valor da medição.
+        
+        Returns:
+            dict: Um dicionário contendo a chave "alert" com o valor "bip" ou "bipbip" (caso aplicável),
+            e a chave "abnormal_count" com o número de medições anormais nas últimas 60 mediçöes.
+        """
+        results, states = self._ingest([{"device_id": device_id, "time_ms": time_ms, "value": value}])
+        return {"alert": results[0]["alert"], "abnormal_count": states[device_id].abnormal_count}
+
+    def process_batch(self, samples: List[dict]) -> List[dict]:
+        """
+        Registra um lote de medições com um único insert em lote e um único commit,
+        executando a máquina de estados das irregularidades sobre as medições, em ordem.
+        
+        Args:
+            samples (List[dict]): As medições, cada uma com as chaves "device_id", "time_ms" e "value".
+        
+        Returns:
+            List[dict]: Para cada medição, na mesma ordem, um dicionário com o device_id, time_ms,
+            value e a chave "alert" com o valor "bip" ou "bipbip" (caso aplicável).
+        """
+        return self._ingest(samples)[0]
+
+    def _ingest(self, samples: List[dict]) -> Tuple[List[dict], Dict[str, DeviceState]]:
+        """Processa o lote com os locks dos seus dispositivos; retorna os resultados e o estado de cada dispositivo."""
+        device_ids = sorted({s["device_id"] for s in samples})
+
+        with ExitStack() as stack:
+            # Os locks são obtidos sempre na mesma ordem para evitar deadlocks entre lotes
+            for device_id in device_ids:
+                stack.enter_context(self.states.lock(device_id))
+
+            states = {device_id: self.load_state(device_id) for device_id in device_ids}
+            # O timestamp é definido pela aplicação, para que as medições sejam comparáveis aos cursores do histórico
+            now = datetime.datetime.now()
+            try:
+                decided, pending, statuses = _decide(samples, self.deviations(samples), states, now)
+                alerts = self._write(decided, pending, statuses, now)
+            except Exception:
+                # O estado pode ter divergido do banco, recarrega no próximo uso
+                for device_id in device_ids:
+                    self.states.discard(device_id)
+                raise
+
+            results = _results(decided, alerts)
+            record_ingest(results)
+            if self.broadcaster is not None:
+                self.broadcaster.publish_measurements(results, now)
+
+        return results, states
+
+    def _write(self, decided: List[tuple], pending: Dict[str, dict], statuses: List[dict], now: datetime.datetime) -> List[Optional[str]]:
+        """
+        Grava as medições decididas, as irregularidades abertas/fechadas por elas e a situação
+        dos dispositivos, com um único commit.
+        Retorna os alertas efetivamente aplicados, na ordem das medições.
+        """
+        alerts = [self.apply_alert(s["device_id"], alert, stats, commit=False) for s, _, alert, stats in decided]
+        rows, rollup_samples = _rows(decided, now)
+        # Um único update por dispositivo soma o lote ao resumo da irregularidade ativa
+        for device_id, stats in pending.items():
+            self.irregularity_repo.add_samples(device_id, stats, commit=False)
+        if self.rollup_repo is not None:
+            self.rollup_repo.accumulate(rollup_samples)
+        if self.status_repo is not None:
+            self.status_repo.upsert_many(statuses)
+        # O commit do lote inclui as irregularidades abertas/fechadas na mesma transação
+        self.measurement_repo.create_many(rows)
+        return alerts
+
+class AsyncMeasurementService:
+    """
+    Versão assíncrona do MeasurementService, para uso direto no event loop da API.
+    As regras de negócio (baseline, anormalidade e máquina de estados) são as mesmas.
+    """
+
+    def __init__(
+        self,
+        measurement_repo: AsyncMeasurementRepository,
+        irregularity_repo: AsyncIrregularityRepository,
+        states: DeviceStateStore = device_states,
+        rollup_repo: Optional[AsyncRollupRepository] = None,
+        ingest_queue: Optional[IngestQueue] = None,
+        enqueue_timeout: float = 1.0,
+        broadcaster: Optional[Broadcaster] = None,
+        status_repo: Optional[AsyncDeviceStatusRepository] = None,
+    ):
+        """
+        Inicializa o serviço de medições com os repositórios assíncronos necessários.
+
+        Args:
+            measurement_repo (AsyncMeasurementRepository): Repositório assíncrono de medições.
+            irregularity_repo (AsyncIrregularityRepository): Repositório assíncrono de irregularidades.
+            states (DeviceStateStore): Estado em memória dos dispositivos (padrão: estado compartilhado do processo).
+            rollup_repo (Optional[AsyncRollupRepository]): Repositório dos agregados por minuto/hora, atualizados
+                a cada medição, se informado.
+            ingest_queue (Optional[IngestQueue]): Fila de gravação em segundo plano. Se informada, o alerta é
+                decidido em memória e a resposta não aguarda a gravação (write-behind).
+            enqueue_timeout (float): Tempo máximo de espera por espaço na fila, em segundos.
+            broadcaster (Optional[Broadcaster]): Distribuição em tempo real das medições e alertas, se informada.
+            status_repo: Repositório da situação atual dos dispositivos (visão da frota), atualizada
+                a cada medição, se informado.
+        """
+        self.measurement_repo = measurement_repo
+        self.irregularity_repo = irregularity_repo
+        self.states = states
+        self.rollup_repo = rollup_repo
+        self.ingest_queue = ingest_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.broadcaster = broadcaster
+        self.status_repo = status_repo
+
+    compute_baseline = staticmethod(MeasurementService.compute_baseline)
+    is_abnormal = staticmethod(MeasurementService.is_abnormal)
+    abnormal_flags = staticmethod(MeasurementService.abnormal_flags)
+    deviations = staticmethod(MeasurementService.deviations)
+    pending_stats = staticmethod(MeasurementService.pending_stats)
+    device_statuses = staticmethod(MeasurementService.device_statuses)
+
+    async def load_state(self, device_id: str) -> DeviceState:
+        """
+        Obtém o estado em memória do dispositivo, carregando-o dos repositórios no primeiro uso.
+
+        Args:
+            device_id (str): O ID do dispositivo.
+
+        Returns:
+            DeviceState: O estado do dispositivo.
+        """
+        state = self.states.get(device_id)
+        if state is None:
+            if self.ingest_queue is not None:
+                # O banco só fica completo depois que os itens do dispositivo ainda na fila forem gravados
+                await self.ingest_queue.wait_settled(device_id)
+            last_measurements = await self.measurement_repo.get_last_n(device_id, WINDOW_SIZE)
+            state = _build_state(last_measurements, await self.irregularity_repo.get_active(device_id))
+            self.states.set(device_id, state)
+        return state
+
+    async def apply_alert(self, device_id: str, alert: Optional[str], stats: Optional[dict] = None, commit: bool = True) -> Optional[str]:
+        """
+        Abre ("bip") ou fecha ("bipbip") a irregularidade do dispositivo de forma atômica no banco.
+        Veja MeasurementService.apply_alert.
+
+        Args:
+            device_id (str): O ID do dispositivo.
+            alert (Optional[str]): O alerta decidido pela máquina de estados.
+            stats (Optional[dict]): O resumo pendente da irregularidade (DeviceState.take_pending), gravado junto.
+            commit (bool): Se False, apenas executa a alteração na transação atual, sem commit.
+
+        Returns:
+            Optional[str]: O alerta, ou None se a transição já tinha sido aplicada por outro processo.
+        """
+        if alert == "bip":
+            applied = await self.irregularity_repo.open_if_absent(device_id, datetime.datetime.now(), stats, commit=commit)
+        elif alert == "bipbip":
+            applied = await self.irregularity_repo.close_active(device_id, stats, commit=commit)
+        else:
+            return alert
+        return alert if applied else None
+
+    async def process_measurement(self, device_id: str, time_ms: int, value: float) -> dict:
+        """
+        Registra a medição, atualiza a janela das últimas 60 medições e decide se envia 'bip' ou 'bipbip' (caso aplicável).
         
         Args:
             device_id (str): O ID do dispositivo.
@@ -67,31 +407,132 @@ class MeasurementService:
             dict: Um dicionário contendo a chave "alert" com o valor "bip" ou "bipbip" (caso aplicável),
             e a chave "abnormal_count" com o número de medições anormais nas últimas 60 mediçöes.
         """
-        measurement = Measurement(device_id=device_id, time_ms=time_ms, value=value)
-        self.measurement_repo.create(measurement)
-
-        # Verifica as últimas 60 medições, verificando as medições anormais
-        last_measurements = self.measurement_repo.get_last_n(device_id, 60)
-        abnormal_count = 0
-        for m in last_measurements:
-            baseline = self.compute_baseline(m.time_ms)
-            if self.is_abnormal(m.value, baseline):
-                abnormal_count += 1
-
-        alert = None
-        active_irreg = self.irregularity_repo.get_active(device_id)
-
-        # Decide se envia 'bip' ou 'bipbip'
-        if abnormal_count >= 5 and active_irreg is None:
-            new_irreg = Irregularity(device_id=device_id, start_timestamp=datetime.datetime.now())
-            self.irregularity_repo.create(new_irreg)
-            alert = "bip"  # sinal de emergência
-        elif abnormal_count == 0 and active_irreg is not None:
-            measurements_since_irreg = [
-                m for m in self.measurement_repo.get_last_n(device_id, 100)
-                if m.timestamp >= active_irreg.start_timestamp
-            ]
-            if len(measurements_since_irreg) >= 60:
-                self.irregularity_repo.close_irregularity(active_irreg)
-                alert = "bipbip" # fecha emergência
-        return {"alert": alert, "abnormal_count": abnormal_count}
+        results, states = await self._ingest([{"device_id": device_id, "time_ms": time_ms, "value": value}])
+        return {"alert": results[0]["alert"], "abnormal_count": states[device_id].abnormal_count}
+
+    async def process_batch(self, samples: List[dict], deviations: Optional[List[float]] = None) -> List[dict]:
+        """
+        Registra um lote de medições com um único insert em lote e um único commit,
+        executando a máquina de estados das irregularidades sobre as medições, em ordem.
+
+        Com a fila de gravação (write-behind), as medições e as irregularidades são enfileiradas
+        e o retorno não aguarda a gravação. Se a fila recusar o lote, as medições dele são desfeitas
+        no estado em memória, que continua coerente com os itens já enfileirados.
+        
+        Args:
+            samples (List[dict]): As medições, cada uma com as chaves "device_id", "time_ms" e "value".
+            deviations (Optional[List[float]]): O desvio relativo de cada medição, se já calculado; se None,
+                é calculado a partir das medições.
+        
+        Returns:
+            List[dict]: Para cada medição, na mesma ordem, um dicionário com o device_id, time_ms,
+            value e a chave "alert" com o valor "bip" ou "bipbip" (caso aplicável).
+
+        Raises:
+            IngestQueueFull: Se a fila de gravação estiver cheia.
+        """
+        return (await self._ingest(samples, deviations))[0]
+
+    async def _ingest(
+        self, samples: List[dict], deviations: Optional[List[float]] = None,
+    ) -> Tuple[List[dict], Dict[str, DeviceState]]:
+        """Processa o lote com os locks dos seus dispositivos; retorna os resultados e o estado de cada dispositivo."""
+        device_ids = sorted({s["device_id"] for s in samples})
+
+        async with AsyncExitStack() as stack:
+            for device_id in device_ids:
+                await stack.enter_async_context(self.states.async_lock(device_id))
+
+            states = {device_id: await self.load_state(device_id) for device_id in device_ids}
+            snapshots = {device_id: state.snapshot() for device_id, state in states.items()} if self.ingest_queue is not None else None
+            now = datetime.datetime.now()
+            try:
+                if deviations is None:
+                    deviations = self.deviations(samples)
+                decided, pending, statuses = _decide(samples, deviations, states, now)
+
+                if self.ingest_queue is not None:
+                    await self._enqueue(decided, pending, statuses, now)
+                    alerts = [alert for _, _, alert, _ in decided]
+                else:
+                    alerts = await self._write(decided, pending, statuses, now)
+            except Exception:
+                if snapshots is not None:
+                    # Nada do lote foi enfileirado: o banco ainda não tem os itens já na fila, e o estado
+                    # recarregado dele estaria desatualizado; apenas desfaz as medições do lote
+                    for device_id, snapshot in snapshots.items():
+                        states[device_id].restore(snapshot)
+                else:
+                    for device_id in device_ids:
+                        self.states.discard(device_id)
+                raise
+
+            results = _results(decided, alerts)
+            record_ingest(results)
+            # Publica ainda com os locks, para que os clientes recebam os eventos de cada dispositivo em ordem
+            if self.broadcaster is not None:
+                self.broadcaster.publish_measurements(results, now)
+
+        return results, states
+
+    async def process_frame(self, device_id: str, samples: np.ndarray) -> List[dict]:
+        """
+        Registra as medições de um dispositivo recebidas no formato binário (utils.frames),
+        calculando os desvios diretamente sobre o array, sem validar medição por medição.
+
+        Args:
+            device_id (str): O ID do dispositivo.
+            samples (np.ndarray): As medições, um array com os campos "time_ms" e "value".
+
+        Returns:
+            List[dict]: Para cada medição, na mesma ordem, o mesmo retorno de process_batch.
+
+        Raises:
+            IngestQueueFull: Se a fila de gravação estiver cheia.
+        """
+        time_ms = samples["time_ms"]
+        values = samples["value"]
+        deviations = baseline_lib.relative_deviation_array(values, baseline_lib.compute_baseline_array(time_ms)).tolist()
+        batch = [
+            {"device_id": device_id, "time_ms": t, "value": v}
+            for t, v in zip(time_ms.tolist(), values.tolist())
+        ]
+        return await self.process_batch(batch, deviations)
+
+    async def _write(self, decided: List[tuple], pending: Dict[str, dict], statuses: List[dict], now: datetime.datetime) -> List[Optional[str]]:
+        """
+        Grava as medições decididas, as irregularidades abertas/fechadas por elas e a situação
+        dos dispositivos, com um único commit.
+        Retorna os alertas efetivamente aplicados, na ordem das medições.
+        """
+        alerts = [await self.apply_alert(s["device_id"], alert, stats, commit=False) for s, _, alert, stats in decided]
+        rows, rollup_samples = _rows(decided, now)
+        for device_id, stats in pending.items():
+            await self.irregularity_repo.add_samples(device_id, stats, commit=False)
+        if self.rollup_repo is not None:
+            await self.rollup_repo.accumulate(rollup_samples)
+        if self.status_repo is not None:
+            await self.status_repo.upsert_many(statuses)
+        # O commit do lote inclui as irregularidades abertas/fechadas na mesma transação
+        await self.measurement_repo.create_many(rows)
+        return alerts
+
+    async def _enqueue(self, decided: List[tuple], pending: Dict[str, dict], statuses: List[dict], now: datetime.datetime) -> None:
+        """
+        Enfileira as medições decididas, as irregularidades abertas/fechadas por elas, os resumos
+        e a situação dos dispositivos, em ordem.
+        """
+        items = []
+        for s, abnormal, alert, stats in decided:
+            device_id = s["device_id"]
+            items.append(("measurement", {
+                "device_id": device_id, "time_ms": s["time_ms"], "value": s["value"], "timestamp": now, "abnormal": abnormal,
+            }))
+            if alert == "bip":
+                items.append(("open", {"device_id": device_id, "start_timestamp": now, "stats": stats}))
+            elif alert == "bipbip":
+                items.append(("close", {"device_id": device_id, "stats": stats}))
+        items.extend(("samples", {"device_id": device_id, "stats": stats}) for device_id, stats in pending.items())
+        if self.status_repo is not None:
+            items.extend(("status", status) for status in statuses)
+        await self.ingest_queue.put(items, self.enqueue_timeout)
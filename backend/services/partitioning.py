@@ -0,0 +1,129 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from models.measurement import Measurement
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = Measurement.__tablename__
+# Partição final, que recebe as medições além da última partição diária
+MAX_PARTITION = "pmax"
+
+def partition_name(day: date) -> str:
+    """Retorna o nome da partição de um dia (ex.: p20250131)."""
+    return f"p{day:%Y%m%d}"
+
+def partition_day(name: str) -> Optional[date]:
+    """Retorna o dia de uma partição diária, ou None se o nome não for de uma partição diária."""
+    try:
+        return datetime.strptime(name, "p%Y%m%d").date()
+    except ValueError:
+        return None
+
+def partition_definition(day: date) -> str:
+    """Retorna a definição da partição de um dia: as medições com timestamp anterior ao dia seguinte."""
+    return f"PARTITION {partition_name(day)} VALUES LESS THAN (TO_DAYS('{day + timedelta(days=1):%Y-%m-%d}'))"
+
+def partition_table_ddl(days: List[date]) -> str:
+    """
+    Retorna o ALTER TABLE que particiona a tabela de medições por dia.
+
+    O MySQL exige que toda chave única contenha a coluna de particionamento, por isso a chave
+    primária passa a ser (id, timestamp).
+    """
+    partitions = [partition_definition(day) for day in days]
+    partitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    return (
+        f"ALTER TABLE {TABLE_NAME} DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp) "
+        f"PARTITION BY RANGE (TO_DAYS(timestamp)) ({', '.join(partitions)})"
+    )
+
+def add_partitions_ddl(days: List[date]) -> str:
+    """Retorna o ALTER TABLE que cria as partições dos dias informados, dividindo a partição final."""
+    partitions = [partition_definition(day) for day in days]
+    partitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    return f"ALTER TABLE {TABLE_NAME} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(partitions)})"
+
+class MeasurementPartitions:
+    """
+    Partições diárias da tabela de medições, por RANGE (TO_DAYS(timestamp)), no MySQL.
+
+    Com as partições, as consultas por período leem apenas as partições do período, e os dias
+    expirados são removidos com DROP PARTITION, sem DELETE linha a linha. Em outros bancos
+    (ex.: SQLite nos testes) a tabela não é particionada e a retenção remove os dias por intervalo.
+    """
+
+    def __init__(self, engine: Engine, days_ahead: int = 7):
+        """
+        Args:
+            engine (Engine): O engine síncrono do banco.
+            days_ahead (int): A quantidade de dias futuros com partição criada antecipadamente.
+        """
+        self.engine = engine
+        self.days_ahead = days_ahead
+
+    @property
+    def supported(self) -> bool:
+        """Se o banco suporta o particionamento (apenas MySQL)."""
+        return self.engine.dialect.name == "mysql"
+
+    def list_days(self) -> List[date]:
+        """Retorna os dias com partição, em ordem (vazio se a tabela não estiver particionada)."""
+        if not self.supported:
+            return []
+        with self.engine.connect() as conn:
+            names = conn.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+            ), {"table": TABLE_NAME}).scalars().all()
+        return sorted(day for day in map(partition_day, names) if day is not None)
+
+    def is_partitioned(self) -> bool:
+        """Se a tabela de medições já está particionada."""
+        return bool(self.list_days())
+
+    def ensure(self, today: Optional[date] = None) -> List[str]:
+        """
+        Particiona a tabela, se necessário, e cria as partições até `days_ahead` dias no futuro.
+
+        Na primeira execução, a tabela inteira é reescrita (uma partição por dia desde a medição
+        mais antiga); em tabelas grandes, deve ser executada em uma janela de manutenção.
+
+        Args:
+            today (Optional[date]): O dia atual (padrão: hoje).
+
+        Returns:
+            List[str]: Os comandos DDL executados.
+        """
+        if not self.supported:
+            return []
+        today = today or date.today()
+        last_day = today + timedelta(days=self.days_ahead)
+        existing = self.list_days()
+
+        if existing:
+            if existing[-1] >= last_day:
+                return []
+            days = _days_between(existing[-1] + timedelta(days=1), last_day)
+            statement = add_partitions_ddl(days)
+        else:
+            with self.engine.connect() as conn:
+                oldest = conn.execute(text(f"SELECT MIN(timestamp) FROM {TABLE_NAME}")).scalar()
+            first_day = min(oldest.date(), today) if oldest is not None else today
+            statement = partition_table_ddl(_days_between(first_day, last_day))
+
+        logger.info("Criando partições da tabela %s até %s", TABLE_NAME, last_day)
+        with self.engine.begin() as conn:
+            conn.execute(text(statement))
+        return [statement]
+
+    def drop(self, day: date) -> None:
+        """Remove a partição de um dia, com todas as medições dele."""
+        with self.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {TABLE_NAME} DROP PARTITION {partition_name(day)}"))
+
+def _days_between(first: date, last: date) -> List[date]:
+    """Retorna os dias de `first` a `last`, inclusive."""
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
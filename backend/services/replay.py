@@ -0,0 +1,209 @@
+"""
+Reprocessamento (replay) do histórico de medições com outros limites de detecção, para avaliar
+e ajustar os parâmetros sem reenviar as medições pela API e sem gravar nas tabelas.
+
+As medições de cada dispositivo são lidas do banco em blocos e a máquina de estados das
+irregularidades é executada de forma vetorizada (NumPy) sobre cada bloco, para todos os
+conjuntos de limites de uma só vez. Os dispositivos são processados em paralelo, em processos.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from repos.measurementRepository import MeasurementRepository
+from services.deviceState import CLOSE_SAMPLES, OPEN_THRESHOLD, WINDOW_SIZE
+from utils import baseline as baseline_lib
+
+class DetectionThresholds(NamedTuple):
+    """Parâmetros da detecção de irregularidades (por padrão, os mesmos da ingestão)."""
+
+    # Desvio relativo a partir do qual a medição é anormal
+    deviation: float = baseline_lib.DEVIATION_THRESHOLD
+    # Tamanho da janela deslizante de medições
+    window_size: int = WINDOW_SIZE
+    # Medições anormais na janela para abrir uma irregularidade
+    open_count: int = OPEN_THRESHOLD
+    # Medições desde a abertura, e janela sem anormais, para fechar a irregularidade
+    close_samples: int = CLOSE_SAMPLES
+
+class _Detector:
+    """
+    Máquina de estados das irregularidades (equivalente a DeviceState.push) para um conjunto de
+    limites, executada bloco a bloco: a contagem de anormais na janela é calculada por soma
+    acumulada, e as transições são localizadas por busca binária nas posições candidatas.
+    """
+
+    def __init__(self, thresholds: DetectionThresholds):
+        self.thresholds = thresholds
+        # Flags das últimas medições do bloco anterior, para completar a janela do bloco seguinte
+        self.tail = np.zeros(0, dtype=np.int64)
+        # Posição da abertura da irregularidade ativa, relativa ao início do bloco atual (negativa se anterior)
+        self.opened_at: Optional[int] = None
+        self.opened_timestamp = None
+        self.intervals: List[dict] = []
+        self.samples = 0
+        self.abnormal_samples = 0
+
+    def feed(self, timestamps: list, deviations: np.ndarray) -> None:
+        """
+        Processa um bloco de medições, em ordem.
+
+        Args:
+            timestamps (list): Os instantes das medições.
+            deviations (np.ndarray): O desvio relativo de cada medição em relação ao baseline.
+        """
+        t = self.thresholds
+        flags = (deviations >= t.deviation).astype(np.int64)
+        n = len(flags)
+        extended = np.concatenate((self.tail, flags))
+        sums = np.concatenate(([0], np.cumsum(extended)))
+        ends = np.arange(len(self.tail) + 1, len(extended) + 1)
+        counts = sums[ends] - sums[np.maximum(ends - t.window_size, 0)]
+
+        open_positions = np.flatnonzero(counts >= t.open_count)
+        close_positions = np.flatnonzero(counts == 0)
+        position = 0
+        while position < n:
+            if self.opened_at is None:
+                i = np.searchsorted(open_positions, position)
+                if i == len(open_positions):
+                    break
+                self.opened_at = int(open_positions[i])
+                self.opened_timestamp = timestamps[self.opened_at]
+                position = self.opened_at + 1
+            else:
+                # Fecha quando a janela não tem anormais e já se passaram close_samples medições desde a abertura
+                i = np.searchsorted(close_positions, max(position, self.opened_at + t.close_samples - 1))
+                if i == len(close_positions):
+                    break
+                closed_at = int(close_positions[i])
+                self.intervals.append({"start": self.opened_timestamp, "end": timestamps[closed_at]})
+                self.opened_at = None
+                position = closed_at + 1
+
+        if self.opened_at is not None:
+            self.opened_at -= n
+        self.tail = extended[max(0, len(extended) - (t.window_size - 1)):] if t.window_size > 1 else extended[:0]
+        self.samples += n
+        self.abnormal_samples += int(flags.sum())
+
+    def result(self) -> dict:
+        """Retorna as irregularidades detectadas (a ativa, se houver, sem fim) e a contagem de alertas."""
+        intervals = list(self.intervals)
+        if self.opened_at is not None:
+            intervals.append({"start": self.opened_timestamp, "end": None})
+        return {
+            "samples": self.samples,
+            "abnormal_samples": self.abnormal_samples,
+            "alerts": {"bip": len(intervals), "bipbip": len(self.intervals)},
+            "intervals": intervals,
+        }
+
+def replay_rows(rows: Iterable[Sequence], thresholds: Sequence[DetectionThresholds], chunk_size: int = 50000) -> List[dict]:
+    """
+    Executa a detecção sobre as medições de um dispositivo, para cada conjunto de limites.
+
+    Args:
+        rows (Iterable[Sequence]): As medições (id, device_id, time_ms, timestamp, value), em ordem.
+        thresholds (Sequence[DetectionThresholds]): Os conjuntos de limites avaliados.
+        chunk_size (int): A quantidade de medições processadas por vez.
+
+    Returns:
+        List[dict]: Para cada conjunto de limites, na mesma ordem, as irregularidades detectadas e a contagem de alertas.
+    """
+    detectors = [_Detector(t) for t in thresholds]
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _, _, time_ms, timestamps, values = zip(*chunk)
+        # O baseline e o desvio são calculados uma única vez por bloco, para todos os conjuntos de limites
+        deviations = baseline_lib.relative_deviation_array(
+            np.fromiter(values, dtype=np.float64, count=len(chunk)),
+            baseline_lib.compute_baseline_array(np.fromiter(time_ms, dtype=np.int64, count=len(chunk))),
+        )
+        for detector in detectors:
+            detector.feed(timestamps, deviations)
+    return [detector.result() for detector in detectors]
+
+# Engine de cada processo do pool, criada no primeiro dispositivo processado
+_engines: Dict[str, object] = {}
+
+def replay_device(database_url: str, device_id: str, days: int, thresholds: Sequence[DetectionThresholds], chunk_size: int) -> List[dict]:
+    """
+    Lê as medições de um dispositivo em blocos e executa a detecção para cada conjunto de limites.
+    Executada nos processos do pool, com uma engine própria por processo.
+    """
+    engine = _engines.get(database_url)
+    if engine is None:
+        engine = _engines[database_url] = create_engine(database_url)
+    with Session(engine) as db:
+        return replay_rows(MeasurementRepository(db).iter_history(device_id, days, chunk_size), thresholds, chunk_size)
+
+class ReplayEngine:
+    """
+    Reprocessa o histórico de um ou vários dispositivos com um ou vários conjuntos de limites,
+    apenas lendo o banco de dados.
+    """
+
+    def __init__(self, database_url: str, chunk_size: int = 50000, workers: Optional[int] = None):
+        """
+        Args:
+            database_url (str): A URL do banco de dados (cada processo abre as próprias conexões).
+            chunk_size (int): A quantidade de medições lidas e processadas por vez.
+            workers (Optional[int]): A quantidade de processos (padrão: um por núcleo); com 1, processa no próprio processo.
+        """
+        self.database_url = database_url
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def device_ids(self, days: int = 30) -> List[str]:
+        """Retorna os dispositivos com medições no período."""
+        engine = create_engine(self.database_url)
+        try:
+            with Session(engine) as db:
+                return MeasurementRepository(db).get_device_ids(days)
+        finally:
+            engine.dispose()
+
+    def run(self, thresholds: Sequence[DetectionThresholds], device_ids: Optional[Sequence[str]] = None, days: int = 30) -> List[dict]:
+        """
+        Executa a detecção sobre o histórico dos dispositivos, para cada conjunto de limites.
+
+        O histórico de cada dispositivo é lido uma única vez para todos os conjuntos de limites.
+
+        Args:
+            thresholds (Sequence[DetectionThresholds]): Os conjuntos de limites avaliados.
+            device_ids (Optional[Sequence[str]]): Os dispositivos; se None, todos os dispositivos com medições no período.
+            days (int): O número de dias do histórico.
+
+        Returns:
+            List[dict]: Para cada conjunto de limites, na mesma ordem, os limites, o total de alertas
+            e o resultado de cada dispositivo (irregularidades detectadas e contagem de alertas).
+        """
+        thresholds = list(thresholds)
+        if device_ids is None:
+            device_ids = self.device_ids(days)
+        args = [(self.database_url, device_id, days, thresholds, self.chunk_size) for device_id in device_ids]
+
+        if self.workers == 1 or len(args) <= 1:
+            per_device = [replay_device(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                per_device = list(pool.map(replay_device, *zip(*args)))
+
+        report = []
+        for i, t in enumerate(thresholds):
+            devices = [dict(results[i], device_id=device_id) for device_id, results in zip(device_ids, per_device)]
+            report.append({
+                "thresholds": t._asdict(),
+                "alerts": {
+                    "bip": sum(d["alerts"]["bip"] for d in devices),
+                    "bipbip": sum(d["alerts"]["bipbip"] for d in devices),
+                },
+                "devices": devices,
+            })
+        return report
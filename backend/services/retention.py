@@ -0,0 +1,188 @@
+import asyncio
+import itertools
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from core.cache import response_cache
+from core.database import database_lock
+from repos.measurementRepository import MeasurementRepository
+from services.partitioning import MeasurementPartitions
+from utils.archive import ARCHIVE_FORMATS, write_archive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = ("id", "device_id", "time_ms", "timestamp", "value")
+
+# Trava da manutenção no banco: um único processo (worker, instância ou CLI) a executa de cada vez
+MAINTENANCE_LOCK = "hbm_measurement_maintenance"
+
+class RetentionService:
+    """
+    Retenção das medições brutas: os dias mais antigos que `retention_days` são arquivados
+    (CSV com gzip ou Parquet, um arquivo por dia) e removidos de uma só vez, com DROP PARTITION
+    na tabela particionada ou com um único DELETE por dia nos demais casos.
+
+    Os agregados por minuto/hora não são afetados, e continuam disponíveis para os dias removidos.
+
+    A retenção deve ser executada por um único processo de cada vez (ver `run_maintenance_once`).
+    Um arquivo já existente nunca é substituído nem removido.
+    """
+
+    def __init__(self, session_factory: sessionmaker, retention_days: int, archive_dir: Optional[str] = None,
+                 archive_format: str = "csv", partitions: Optional[MeasurementPartitions] = None, chunk_size: int = 10000):
+        """
+        Args:
+            session_factory (sessionmaker): Fábrica de sessões síncronas.
+            retention_days (int): A quantidade de dias mantidos no banco.
+            archive_dir (Optional[str]): A pasta dos arquivos; se None, os dias são removidos sem arquivar.
+            archive_format (str): "csv" (CSV com gzip) ou "parquet".
+            partitions (Optional[MeasurementPartitions]): As partições da tabela, se particionada.
+            chunk_size (int): A quantidade de linhas lidas do banco por vez ao arquivar.
+
+        Raises:
+            ValueError: Se o formato de arquivo não for suportado ou a retenção não for positiva.
+        """
+        if retention_days < 1:
+            raise ValueError("A retenção deve ser de pelo menos 1 dia")
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Formato de arquivo não suportado: {archive_format}")
+        self.session_factory = session_factory
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.archive_format = archive_format
+        self.partitions = partitions
+        self.chunk_size = chunk_size
+
+    def cutoff(self, today: Optional[date] = None) -> date:
+        """Retorna o primeiro dia mantido no banco; os dias anteriores estão expirados."""
+        return (today or date.today()) - timedelta(days=self.retention_days)
+
+    def expired_days(self, today: Optional[date] = None) -> List[date]:
+        """
+        Retorna os dias expirados com medições (ou com partição), do mais antigo para o mais recente.
+        """
+        cutoff = self.cutoff(today)
+        if self.partitions is not None and self.partitions.is_partitioned():
+            return [day for day in self.partitions.list_days() if day < cutoff]
+
+        with self.session_factory() as db:
+            oldest, _ = MeasurementRepository(db).get_time_range()
+        if oldest is None:
+            return []
+        return [oldest.date() + timedelta(days=i) for i in range((cutoff - oldest.date()).days)]
+
+    def run(self, today: Optional[date] = None, dry_run: bool = False) -> List[dict]:
+        """
+        Arquiva e remove os dias expirados.
+
+        Um dia só é removido depois que o seu arquivo foi completamente gravado; se o arquivamento
+        falhar, a execução é interrompida e os dias seguintes permanecem no banco.
+
+        Args:
+            today (Optional[date]): O dia atual (padrão: hoje).
+            dry_run (bool): Se True, apenas lista os dias expirados, sem arquivar nem remover.
+
+        Returns:
+            List[dict]: Para cada dia expirado, o dia, o arquivo gerado e a quantidade de medições.
+        """
+        report = []
+        for day in self.expired_days(today):
+            entry = {"day": day.isoformat(), "archive": None, "rows": None}
+            if not dry_run:
+                entry.update(self._expire_day(day))
+            report.append(entry)
+        return report
+
+    def _expire_day(self, day: date) -> dict:
+        """Arquiva e remove as medições de um dia."""
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        partitioned = self.partitions is not None and self.partitions.is_partitioned()
+
+        with self.session_factory() as db:
+            repo = MeasurementRepository(db)
+            path = None
+            rows = None
+            if self.archive_dir:
+                path, rows = self._archive(repo, day, start, end)
+
+            if partitioned:
+                device_ids = repo.get_device_ids_in_range(start, end)
+                # Encerra a transação da leitura, cujo bloqueio de metadados impediria o DROP PARTITION
+                db.rollback()
+                self.partitions.drop(day)
+                # O DROP PARTITION não passa pela sessão: o cache dos dispositivos é invalidado aqui
+                response_cache.invalidate(device_ids)
+            else:
+                # O cache dos dispositivos afetados é invalidado no commit do DELETE
+                rows = repo.delete_range(start, end)
+
+        logger.info("Medições de %s removidas (linhas: %s, arquivo: %s)", day, rows, path)
+        return {"archive": path, "rows": rows}
+
+    def _archive(self, repo: MeasurementRepository, day: date, start: datetime, end: datetime) -> Tuple[Optional[str], int]:
+        """
+        Arquiva as medições de um dia e retorna o arquivo (None se o dia não tiver medições) e as linhas.
+
+        Se o arquivo do dia já existir (ex.: de uma execução interrompida antes da remoção), ele é
+        mantido, e o novo arquivo recebe um sufixo (.1, .2...). Se outro processo criar o arquivo
+        ao mesmo tempo, FileExistsError interrompe a execução, e o dia permanece no banco.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        name = f"measurements-{day:%Y-%m-%d}"
+        extension = ARCHIVE_FORMATS[self.archive_format]
+        path = next(
+            candidate
+            for candidate in (os.path.join(self.archive_dir, name + (f".{n}" if n else "") + extension) for n in itertools.count())
+            if not os.path.exists(candidate)
+        )
+        rows = write_archive(path, ARCHIVE_COLUMNS, repo.iter_range(start, end, self.chunk_size), self.archive_format, self.chunk_size, replace=False)
+        if rows == 0:
+            # Apenas o arquivo vazio criado agora é removido
+            os.remove(path)
+            return None, 0
+        return path, rows
+
+def run_maintenance_once(engine: Engine, partitions: Optional[MeasurementPartitions], retention: Optional[RetentionService]) -> Optional[List[dict]]:
+    """
+    Cria as partições futuras e executa a retenção, se nenhum outro processo estiver executando a manutenção.
+
+    Args:
+        engine (Engine): O engine do banco de dados, em que a trava da manutenção é obtida.
+        partitions (Optional[MeasurementPartitions]): As partições da tabela, se o particionamento estiver ativo.
+        retention (Optional[RetentionService]): A retenção, se ativa.
+
+    Returns:
+        Optional[List[dict]]: O relatório da retenção ([] sem retenção), ou None se outro processo tem a trava.
+    """
+    with database_lock(engine, MAINTENANCE_LOCK) as acquired:
+        if not acquired:
+            return None
+        if partitions is not None:
+            partitions.ensure()
+        return retention.run() if retention is not None else []
+
+async def run_maintenance(engine: Engine, partitions: Optional[MeasurementPartitions], retention: Optional[RetentionService], interval_seconds: float) -> None:
+    """
+    Executa periodicamente, fora do event loop, a criação das partições futuras e a retenção.
+    Com vários workers ou instâncias, apenas o processo que obtém a trava da manutenção a executa.
+
+    Args:
+        engine (Engine): O engine do banco de dados.
+        partitions (Optional[MeasurementPartitions]): As partições da tabela, se o particionamento estiver ativo.
+        retention (Optional[RetentionService]): A retenção, se ativa.
+        interval_seconds (float): O intervalo entre as execuções, em segundos.
+    """
+    while True:
+        try:
+            report = await asyncio.to_thread(run_maintenance_once, engine, partitions, retention)
+            if report is None:
+                logger.info("Manutenção das medições em execução por outro processo; ignorada")
+            elif report:
+                logger.info("Retenção: %d dias de medições arquivados e removidos", len(report))
+        except Exception:
+            logger.exception("Falha na manutenção periódica das medições")
+        await asyncio.sleep(interval_seconds)
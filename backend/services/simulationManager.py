@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from utils.simulation import generate_values
+
+logger = logging.getLogger(__name__)
+
+class SimulationJob:
+    """
+    Simulação em segundo plano de vários dispositivos, cada um em uma tarefa asyncio própria.
+    """
+
+    def __init__(self, device_ids: List[str], mode: str, count: int, interval: int, batch_size: int):
+        self.id = uuid.uuid4().hex
+        self.device_ids = device_ids
+        self.mode = mode
+        self.count = count
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.sent = 0
+        self.alerts = {"bip": 0, "bipbip": 0}
+
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """Marca a simulação como encerrada."""
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.now()
+        self._finished = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        """Retorna o estado da simulação, com o progresso e a vazão (medições por segundo)."""
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        total = self.count * len(self.device_ids)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "mode": self.mode,
+            "devices": len(self.device_ids),
+            "count": self.count,
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "sent": self.sent,
+            "total": total,
+            "progress": self.sent / total if total else 1.0,
+            "alerts": self.alerts,
+            "elapsed_seconds": elapsed,
+            "throughput": self.sent / elapsed if elapsed > 0 else 0.0,
+        }
+
+class SimulationManager:
+    """
+    Gerencia as simulações em segundo plano: início, acompanhamento e cancelamento.
+
+    As medições simuladas passam pelo caminho de ingestão em lote (process_batch) do serviço,
+    sem manter nenhuma requisição HTTP aberta.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, service_factory: Callable[[AsyncSession], object], max_jobs: int = 100):
+        """
+        Args:
+            session_factory (async_sessionmaker): Fábrica de sessões assíncronas.
+            service_factory (Callable): Monta o AsyncMeasurementService a partir de uma sessão.
+            max_jobs (int): Quantidade máxima de simulações mantidas no histórico.
+        """
+        self.session_factory = session_factory
+        self.service_factory = service_factory
+        self.max_jobs = max_jobs
+        self.jobs: Dict[str, SimulationJob] = {}
+
+    @staticmethod
+    def device_ids(devices: int, device_prefix: str = "sim") -> List[str]:
+        """Retorna os IDs dos dispositivos de uma simulação (ex.: sim-0, sim-1...)."""
+        return [f"{device_prefix}-{i}" for i in range(devices)]
+
+    def start(self, devices: int, device_prefix: str = "sim", mode: str = "normal", count: int = 100,
+              interval: int = 15, batch_size: int = 100) -> SimulationJob:
+        """
+        Inicia uma simulação com vários dispositivos simultâneos (deve ser chamado dentro do event loop).
+
+        Args:
+            devices (int): A quantidade de dispositivos simulados.
+            device_prefix (str): O prefixo dos IDs dos dispositivos (ex.: sim-0, sim-1...).
+            mode (str): O modo de simulação (normal, anormal ou misto).
+            count (int): A quantidade de medições por dispositivo.
+            interval (int): O intervalo entre as medições, em milissegundos (0 para enviar o mais rápido possível).
+            batch_size (int): A quantidade de medições enviadas por lote.
+
+        Returns:
+            SimulationJob: A simulação iniciada.
+        """
+        self._prune()
+        job = SimulationJob(self.device_ids(devices, device_prefix), mode, count, interval, batch_size)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        """Retorna a simulação, se existir."""
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[SimulationJob]:
+        """Retorna as simulações, da mais recente para a mais antiga."""
+        return sorted(self.jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    async def cancel(self, job_id: str) -> Optional[SimulationJob]:
+        """Cancela a simulação, se estiver em execução, e aguarda suas tarefas terminarem."""
+        job = self.jobs.get(job_id)
+        if job is not None and job.task is not None and not job.task.done():
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancela todas as simulações em execução."""
+        for job_id in list(self.jobs):
+            await self.cancel(job_id)
+
+    def _prune(self) -> None:
+        """Remove as simulações encerradas mais antigas além do limite do histórico."""
+        finished = [j for j in self.list() if j.status != "running"]
+        for job in finished[max(0, self.max_jobs - 1):]:
+            self.jobs.pop(job.id, None)
+
+    async def _run(self, job: SimulationJob) -> None:
+        """Executa a simulação: uma tarefa por dispositivo, até o fim, cancelamento ou erro."""
+        tasks = [asyncio.create_task(self._run_device(job, device_id, seed)) for seed, device_id in enumerate(job.device_ids)]
+        try:
+            await asyncio.gather(*tasks)
+            job.finish("completed")
+        except asyncio.CancelledError:
+            job.finish("cancelled")
+            raise
+        except Exception as e:
+            logger.exception("Falha na simulação %s", job.id)
+            job.finish("failed", str(e))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_device(self, job: SimulationJob, device_id: str, seed: int) -> None:
+        """Gera e envia as medições de um dispositivo, em lotes, respeitando o intervalo entre as medições."""
+        rng = np.random.default_rng(seed)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        for offset in range(0, job.count, job.batch_size):
+            time_ms = np.arange(offset, min(offset + job.batch_size, job.count), dtype=np.int64) * job.interval
+            values = generate_values(job.mode, time_ms, rng)
+            samples = [
+                {"device_id": device_id, "time_ms": t, "value": v}
+                for t, v in zip(time_ms.tolist(), values.tolist())
+            ]
+
+            async with self.session_factory() as db:
+                results = await self.service_factory(db).process_batch(samples)
+
+            job.sent += len(results)
+            for r in results:
+                if r["alert"] is not None:
+                    job.alerts[r["alert"]] += 1
+
+            # Aguarda até o instante da próxima medição (as medições do lote são enviadas juntas)
+            delay = started + (offset + len(samples)) * job.interval / 1000 - loop.time()
+            await asyncio.sleep(max(0.0, delay))
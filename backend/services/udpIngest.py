@@ -0,0 +1,111 @@
+"""
+Ingestão das medições por UDP, no formato binário compacto (utils.frames), para dispositivos
+em redes com pouca banda ou alta latência, sem o custo de uma conexão HTTP por envio.
+
+Cada datagrama é um quadro com as medições de um dispositivo; a resposta, enviada ao mesmo
+endereço, traz os códigos de alerta das medições. Datagramas inválidos, de dispositivos de outras
+instâncias ou recusados pela fila cheia são descartados sem resposta. Sem resposta, o dispositivo
+pode reenviar o quadro com a mesma sequência: se o original já tiver sido processado (a resposta é
+que se perdeu), o reenvio recebe a mesma resposta, sem gravar as medições novamente (ver
+services.frameReplies). Quadros com sequência 0 não são identificados, e o reenvio deles grava as
+medições outra vez.
+"""
+import asyncio
+import logging
+from typing import Callable, Optional, Set, Tuple
+from core.sharding import ShardRouter, WrongShard, shard_router
+from services.frameReplies import FrameReplies, frame_replies
+from services.ingestQueue import IngestQueueFull
+from utils.frames import Frame, decode_frame, encode_alerts
+
+logger = logging.getLogger(__name__)
+
+class UdpIngestServer(asyncio.DatagramProtocol):
+    """Recebe os quadros de medições por UDP e responde com os códigos de alerta."""
+
+    def __init__(
+        self,
+        session_factory,
+        service_factory: Callable,
+        shards: ShardRouter = shard_router,
+        replies: FrameReplies = frame_replies,
+        max_in_flight: int = 64,
+    ):
+        """
+        Args:
+            session_factory: Fábrica de sessões assíncronas (uma sessão por quadro).
+            service_factory (Callable): Recebe uma sessão e retorna o AsyncMeasurementService.
+            shards (ShardRouter): Verifica se os dispositivos pertencem a esta instância.
+            replies (FrameReplies): As respostas dos últimos quadros, para identificar os reenvios.
+            max_in_flight (int): A quantidade máxima de quadros processados ao mesmo tempo.
+        """
+        self.session_factory = session_factory
+        self.service_factory = service_factory
+        self.shards = shards
+        self.replies = replies
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self, host: str, port: int) -> Tuple[str, int]:
+        """
+        Abre o socket UDP.
+
+        Args:
+            host (str): O endereço de escuta.
+            port (int): A porta de escuta (0 escolhe uma porta livre).
+
+        Returns:
+            Tuple[str, int]: O endereço e a porta efetivamente usados.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+        return self.transport.get_extra_info("sockname")[:2]
+
+    async def stop(self) -> None:
+        """Fecha o socket e aguarda os quadros em processamento."""
+        if self.transport is not None:
+            self.transport.close()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        task = asyncio.create_task(self.handle(data, addr))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def handle(self, data: bytes, addr) -> Optional[bytes]:
+        """
+        Processa um quadro e envia os códigos de alerta ao remetente.
+
+        Args:
+            data (bytes): O quadro recebido.
+            addr: O endereço do remetente.
+
+        Returns:
+            Optional[bytes]: A resposta enviada, ou None se o quadro foi descartado.
+        """
+        try:
+            frame = decode_frame(data)
+            self.shards.ensure_local([frame.device_id])
+            reply, _ = await self.replies.reply(frame.device_id, frame.seq, lambda: self._process(frame))
+        except (ValueError, WrongShard, IngestQueueFull) as e:
+            logger.warning("Quadro UDP de %s descartado: %s", addr, e)
+            return None
+        except Exception:
+            logger.exception("Erro ao processar o quadro UDP de %s", addr)
+            return None
+
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(reply, addr)
+        return reply
+
+    async def _process(self, frame: Frame) -> bytes:
+        """Grava as medições do quadro e retorna os códigos de alerta empacotados."""
+        async with self._slots:
+            async with self.session_factory() as db:
+                results = await self.service_factory(db).process_frame(frame.device_id, frame.samples)
+        return encode_alerts(r["alert"] for r in results)
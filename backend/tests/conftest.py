@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Permite importar os módulos do backend (core, models, repos...) nos testes
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Usa um banco SQLite temporário caso nenhum banco tenha sido configurado
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+@pytest.fixture
+def db_url(tmp_path):
+    """URL de um banco SQLite novo, exclusivo do teste."""
+    return "sqlite:///" + str(tmp_path / "test.db")
+
+@pytest.fixture
+def db(db_url):
+    """
+    Fornece uma sessão de banco de dados SQLite, com as migrações aplicadas, e descarta o estado
+    em memória dos dispositivos, o cache de respostas e as respostas dos quadros binários ao final do teste.
+
+    Os engines da aplicação (SessionLocal e AsyncSessionLocal) são associados ao banco do teste.
+    """
+    from sqlalchemy.pool import NullPool
+    from core.database import SessionLocal, init_engine
+    from core.migrations import migrate
+    from services.deviceState import device_states
+    from core.cache import response_cache
+    from services.frameReplies import frame_replies
+
+    # NullPool evita reutilizar conexões assíncronas entre event loops diferentes
+    engine = init_engine(db_url, poolclass=NullPool)
+    migrate(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+        device_states.clear()
+        response_cache.backend.clear()
+        frame_replies.clear()
+
+@pytest.fixture
+def async_session_factory(db):
+    """
+    Fornece a fábrica de sessões assíncronas da aplicação, associada ao mesmo banco da fixture `db`.
+    """
+    from core.database import AsyncSessionLocal
+    return AsyncSessionLocal
+
+@pytest.fixture
+def client(db, async_session_factory):
+    """
+    Fornece um TestClient da aplicação usando o banco de dados do teste.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+    from api.deps import get_db, get_async_db, get_session_factory
+    from main import app
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,31 @@
+import math
+import numpy as np
+from utils.baseline import compute_baseline, compute_baseline_array, is_abnormal, is_abnormal_array
+
+def formula(x):
+    return (-0.06366 +
+            0.12613 * (math.cos(math.pi * x / 500)) +
+            0.12258 * (math.cos(math.pi * x / 250)) +
+            0.01593 * (math.sin(math.pi * x / 500)) +
+            0.03147 * (math.sin(math.pi * x / 250)))
+
+def test_table_matches_formula():
+    """
+    Testa que a tabela pré-calculada e a versão vetorizada reproduzem a fórmula da baseline,
+    inclusive para tempos fora do primeiro período e tempos fracionários.
+    """
+    times = list(range(-1500, 5000, 7))
+    assert np.allclose([compute_baseline(t) for t in times], [formula(t) for t in times], rtol=0, atol=1e-12)
+    assert np.allclose(compute_baseline_array(np.asarray(times)), [formula(t) for t in times], rtol=0, atol=1e-12)
+    assert compute_baseline(12.5) == formula(12.5)
+    assert np.allclose(compute_baseline_array(np.asarray([12.5])), [formula(12.5)])
+
+def test_abnormal_array_matches_scalar():
+    """
+    Testa que a verificação vetorizada de anormalidade concorda com a escalar, inclusive com baseline zero.
+    """
+    rng = np.random.default_rng(0)
+    values = rng.uniform(-0.3, 0.3, 5000)
+    baselines = np.concatenate([compute_baseline_array(np.arange(4999)), [0.0]])
+    expected = [is_abnormal(v, b) for v, b in zip(values.tolist(), baselines.tolist())]
+    assert is_abnormal_array(values, baselines).tolist() == expected
@@ -0,0 +1,119 @@
+import time
+from datetime import datetime
+from core.cache import MemoryCache, ResponseCache
+from models.irregularity import Irregularity
+from repos.irregularityRepository import IrregularityRepository
+
+def test_history_etag_and_invalidation(client):
+    """
+    Testa o cache do histórico: a mesma versão responde 304 ao If-None-Match, e uma nova
+    medição do dispositivo invalida o cache (a de outro dispositivo, não).
+    """
+    params = {"device_id": "cache-device"}
+    assert client.post("/api/measurements", params={**params, "time_ms": 0, "value": 0.1}).status_code == 200
+
+    first = client.get("/api/measurements/history", params=params)
+    assert first.status_code == 200
+    assert len(first.json()) == 1
+    etag = first.headers["etag"]
+
+    assert client.get("/api/measurements/history", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post("/api/measurements", params={"device_id": "other-device", "time_ms": 0, "value": 0.1}).status_code == 200
+    assert client.get("/api/measurements/history", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    samples = [{"device_id": "cache-device", "time_ms": 15, "value": 0.1}]
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+    second = client.get("/api/measurements/history", params=params, headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert len(second.json()) == 2
+    assert second.headers["etag"] != etag
+
+def test_irregularities_invalidated_on_create_and_close(client, db):
+    """
+    Testa que o cache das irregularidades é invalidado no commit da abertura e do fechamento,
+    e não é invalidado por uma transação desfeita.
+    """
+    params = {"device_id": "cache-irreg"}
+    assert client.get("/api/irregularities", params=params).json() == []
+
+    samples = [{"device_id": "cache-irreg", "time_ms": 0, "value": 1.0}] * 5
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+    opened = client.get("/api/irregularities", params=params).json()
+    assert len(opened) == 1 and opened[0]["end_timestamp"] is None
+
+    repo = IrregularityRepository(db)
+    repo.create(Irregularity(device_id="cache-irreg", start_timestamp=datetime.now(), end_timestamp=datetime.now()), commit=False)
+    db.rollback()
+    assert client.get("/api/irregularities", params=params).json() == opened
+
+    repo.close_irregularity(repo.get_active("cache-irreg"))
+    closed = client.get("/api/irregularities", params=params).json()
+    assert closed[0]["end_timestamp"] is not None
+
+def test_memory_cache_ttl_and_lru():
+    """Testa a validade (TTL) e o descarte do menos usado (LRU) do cache em memória."""
+    cache = MemoryCache(maxsize=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+    calls = []
+    responses = ResponseCache(MemoryCache(), ttl=60)
+    compute = lambda: calls.append(1) or b"[1,2]"
+    first = responses.get_or_compute("history", "dev", {}, "application/json", compute)
+    assert responses.get_or_compute("history", "dev", {}, "application/json", compute) is first
+    responses.invalidate(["dev"])
+    assert responses.get_or_compute("history", "dev", {}, "application/json", compute).etag == first.etag
+    assert len(calls) == 2
+
+def test_memory_cache_is_bounded_by_bytes():
+    """
+    Testa que o cache em memória descarta as entradas menos usadas acima do total de bytes,
+    e que respostas grandes demais nunca são guardadas.
+    """
+    from core.cache import CachedResponse
+
+    cache = MemoryCache(maxsize=100, max_bytes=1000)
+    for key in "abc":
+        cache.set(key, CachedResponse(b"x" * 400, "application/json"), ttl=60)
+    assert cache.get("a") is None and cache.get("b") is not None and cache.get("c") is not None
+    assert cache.total_bytes == 800
+
+    cache.set("b", CachedResponse(b"x" * 1001, "application/json"), ttl=60)
+    assert cache.get("b") is None and cache.total_bytes == 400
+
+    calls = []
+    responses = ResponseCache(MemoryCache(), ttl=60, max_entry_bytes=10)
+    large = lambda: calls.append(1) or b"[" + b"1," * 10 + b"1]"
+    small = lambda: calls.append(1) or b"[1]"
+    for _ in range(2):
+        responses.get_or_compute("history", "dev", {"days": 30}, "application/json", large)
+        responses.get_or_compute("history", "dev", {"days": 1}, "application/json", small)
+    assert len(calls) == 3
+    assert len(responses.backend) == 2  # a resposta pequena e a geração do dispositivo
+
+def test_auto_backend_is_local_only_with_a_single_process(monkeypatch):
+    """
+    Testa que o backend "auto" usa a memória com um único processo, e desativa o cache com vários
+    workers ou instâncias, em que o cache local não seria invalidado pelas gravações dos demais.
+    """
+    from core.cache import build_backend
+    from core.config import Settings
+
+    monkeypatch.setattr(Settings, "WEB_CONCURRENCY", 1)
+    monkeypatch.setattr(Settings, "SHARD_NODES", "")
+    assert isinstance(build_backend("auto", 10), MemoryCache)
+    monkeypatch.setattr(Settings, "WEB_CONCURRENCY", 4)
+    assert build_backend("auto", 10) is None
+    assert isinstance(build_backend("memory", 10), MemoryCache)
+    monkeypatch.setattr(Settings, "WEB_CONCURRENCY", 1)
+    monkeypatch.setattr(Settings, "SHARD_NODES", "http://a,http://b")
+    assert build_backend("auto", 10) is None
@@ -0,0 +1,138 @@
+from repos.measurementRepository import MeasurementRepository
+from repos.irregularityRepository import IrregularityRepository
+from services.measurementService import MeasurementService
+from services.deviceState import DeviceState, DeviceStateStore, WINDOW_SIZE
+
+def make_service(db, states=None):
+    return MeasurementService(MeasurementRepository(db), IrregularityRepository(db), states or DeviceStateStore())
+
+def test_window_keeps_abnormal_count():
+    """
+    Testa a contagem de medições anormais na janela deslizante.
+
+    Insere mais medições anormais do que o tamanho da janela e verifica que a contagem
+    nunca ultrapassa a janela e que decresce conforme as medições anormais saem dela.
+    """
+    state = DeviceState()
+    for _ in range(WINDOW_SIZE + 10):
+        state.push(True)
+    assert state.abnormal_count == WINDOW_SIZE
+    for _ in range(10):
+        state.push(False)
+    assert state.abnormal_count == WINDOW_SIZE - 10
+
+def test_state_machine_opens_and_closes_irregularity():
+    """
+    Testa a máquina de estados das irregularidades.
+
+    Verifica que a quinta medição anormal gera um 'bip', e que o 'bipbip' só é
+    enviado após uma janela inteira de medições normais.
+    """
+    state = DeviceState()
+    alerts = [state.push(True) for _ in range(5)]
+    assert alerts == [None, None, None, None, "bip"]
+
+    alerts = [state.push(False) for _ in range(WINDOW_SIZE)]
+    assert "bipbip" not in alerts[:-1]
+    assert alerts[-1] == "bipbip"
+    assert not state.in_irregularity
+
+def test_process_measurement_persists_transitions(db):
+    """
+    Testa o processamento de medições pelo serviço.
+
+    Envia medições anormais e depois normais, verificando os alertas retornados e
+    que a irregularidade é aberta e fechada no banco de dados.
+    """
+    service = make_service(db)
+    alerts = [service.process_measurement("dev", 0, 1.0)["alert"] for _ in range(5)]
+    assert alerts[-1] == "bip"
+    assert IrregularityRepository(db).get_active("dev") is not None
+
+    baseline = service.compute_baseline(0)
+    alerts = [service.process_measurement("dev", 0, baseline)["alert"] for _ in range(WINDOW_SIZE)]
+    assert alerts[-1] == "bipbip"
+    assert IrregularityRepository(db).get_active("dev") is None
+
+def test_state_is_loaded_from_repositories(db):
+    """
+    Testa o carregamento do estado a partir do banco de dados.
+
+    Processa medições com um estado, e verifica que um novo estado (como o de um
+    novo processo) é reconstruído a partir das medições e irregularidades salvas.
+    """
+    make_service(db).process_measurement("dev", 0, 1.0)
+    make_service(db).process_measurement("dev", 0, 1.0)
+
+    state = make_service(db).load_state("dev")
+    assert list(state.window) == [True, True]
+    assert state.abnormal_count == 2
+    assert not state.in_irregularity
+
+def test_async_service_matches_sync(db, async_session_factory):
+    """
+    Testa que o serviço assíncrono gera os mesmos alertas que o serviço síncrono,
+    e que ele carrega o estado salvo por outro processo.
+    """
+    import asyncio
+    from repos.measurementRepository import AsyncMeasurementRepository
+    from repos.irregularityRepository import AsyncIrregularityRepository
+    from services.measurementService import AsyncMeasurementService
+
+    values = [0.5 if i % 7 == 0 else MeasurementService.compute_baseline(i) for i in range(150)]
+    expected = [make_service(db).process_measurement("sync", i, v)["alert"] for i, v in enumerate(values)]
+    db.commit()
+
+    async def run():
+        async with async_session_factory() as session:
+            service = AsyncMeasurementService(AsyncMeasurementRepository(session), AsyncIrregularityRepository(session), DeviceStateStore())
+            alerts = [(await service.process_measurement("async", i, v))["alert"] for i, v in enumerate(values)]
+            state = await service.load_state("sync")
+            return alerts, state
+
+    alerts, state = asyncio.run(run())
+    assert alerts == expected
+    assert state.abnormal_count == sum(MeasurementService.is_abnormal(v, MeasurementService.compute_baseline(i)) for i, v in enumerate(values[-WINDOW_SIZE:], start=len(values) - WINDOW_SIZE))
+
+def test_irregularity_summary_is_persisted_and_reloaded(db):
+    """
+    Testa o resumo da irregularidade (medições, anormais e maior desvio), atualizado pela
+    medição avulsa e pelo lote, e que o estado recarregado do banco continua a contagem
+    de medições desde o início sem consultar as medições.
+    """
+    baseline = MeasurementService.compute_baseline(0)
+    states = DeviceStateStore()
+    service = make_service(db, states)
+    for _ in range(5):
+        service.process_measurement("summary", 0, 1.0)
+    service.process_batch([{"device_id": "summary", "time_ms": 0, "value": 2.0}] + [{"device_id": "summary", "time_ms": 0, "value": baseline}] * 9)
+
+    active = IrregularityRepository(db).get_active("summary")
+    db.refresh(active)
+    assert active.sample_count == 11
+    assert active.abnormal_samples == 2
+    assert active.peak_deviation == abs(2.0 - baseline) / abs(baseline)
+
+    # O estado recarregado retoma a contagem de medições desde o início da irregularidade
+    states.discard("summary")
+    assert service.load_state("summary").samples_since_irregularity == 11
+    alerts = [service.process_measurement("summary", 0, baseline)["alert"] for _ in range(WINDOW_SIZE)]
+    assert alerts.count("bipbip") == 1
+    closed = IrregularityRepository(db).get_all("summary")[0]
+    db.refresh(closed)
+    assert closed.sample_count == 11 + alerts.index("bipbip") + 1 and closed.open_key is None
+
+def test_device_is_ingested_by_one_path_per_process():
+    """
+    Testa que um dispositivo ingerido pelo caminho síncrono não é aceito pelo assíncrono (e vice-versa),
+    já que os locks dos dois caminhos não se excluem entre si.
+    """
+    import pytest
+
+    states = DeviceStateStore()
+    assert states.lock("sync") is states.lock("sync")
+    assert states.async_lock("async") is states.async_lock("async")
+    with pytest.raises(RuntimeError):
+        states.async_lock("sync")
+    with pytest.raises(RuntimeError):
+        states.lock("async")
@@ -0,0 +1,31 @@
+from repos.deviceStatusRepository import DeviceStatusRepository
+from services.measurementService import MeasurementService
+
+def test_fleet_status_is_maintained_on_ingest(client, db):
+    """
+    Testa a situação da frota: atualizada pela ingestão (avulsa e em lote), com a
+    irregularidade ativa de cada dispositivo, paginada e filtrada pela irregularidade.
+    """
+    baseline = MeasurementService.compute_baseline(0)
+    samples = [{"device_id": f"fleet-{i}", "time_ms": 0, "value": baseline} for i in range(5)]
+    samples += [{"device_id": "fleet-3", "time_ms": 0, "value": 1.0}] * 5
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+    assert client.post("/api/measurements", params={"device_id": "fleet-1", "time_ms": 7, "value": 0.5}).status_code == 200
+
+    page = client.get("/api/devices", params={"limit": 3}).json()
+    assert [d["device_id"] for d in page["items"]] == ["fleet-0", "fleet-1", "fleet-2"]
+    assert page["items"][1]["last_value"] == 0.5 and page["items"][1]["last_time_ms"] == 7
+    rest = client.get("/api/devices", params={"limit": 3, "cursor": page["next_cursor"]}).json()
+    assert [d["device_id"] for d in rest["items"]] == ["fleet-3", "fleet-4"]
+    assert rest["next_cursor"] is None
+
+    active = client.get("/api/devices", params={"in_irregularity": True}).json()["items"]
+    assert [d["device_id"] for d in active] == ["fleet-3"]
+    assert active[0]["abnormal_count"] == 5
+    irregularities = client.get("/api/irregularities", params={"device_id": "fleet-3"}).json()
+    assert active[0]["active_irregularity_id"] == irregularities[0]["id"]
+
+    # Fechada a irregularidade, o dispositivo sai do filtro
+    closing = [{"device_id": "fleet-3", "time_ms": 0, "value": baseline}] * 60
+    assert client.post("/api/measurements/batch", json=closing).json()["results"][-1]["alert"] == "bipbip"
+    assert DeviceStatusRepository(db).get_page(in_irregularity=True) == []
@@ -0,0 +1,106 @@
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+from models.measurement import Measurement
+from models.irregularity import Irregularity
+from models.measurementRollup import MeasurementMinute
+
+def _ingest(client, device_id: str, count: int = 10):
+    samples = [{"device_id": device_id, "time_ms": i * 15, "value": 1.0} for i in range(count)]
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+
+def test_export_measurements_as_parquet_and_arrow(client):
+    """
+    Testa a exportação colunar das medições de um dispositivo e da frota, em Parquet e Arrow IPC.
+    """
+    _ingest(client, "export-a")
+    _ingest(client, "export-b", 5)
+
+    response = client.get("/api/export/measurements", params={"device_id": "export-a"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 10
+    assert table.column_names == ["id", "device_id", "time_ms", "timestamp", "value"]
+    assert table.column("time_ms").to_pylist() == [i * 15 for i in range(10)]
+
+    response = client.get("/api/export/measurements", params={"format": "arrow"})
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert sorted(set(table.column("device_id").to_pylist())) == ["export-a", "export-b"]
+
+    response = client.get("/api/export/irregularities", params={"device_id": "export-a"})
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 1
+    assert table.column("end_timestamp").to_pylist() == [None]
+
+    assert client.get("/api/export/devices").status_code == 404
+    assert client.get("/api/export/measurements", params={"format": "csv"}).status_code == 422
+
+def test_import_round_trip(client, db):
+    """
+    Testa a importação de um arquivo exportado: as medições são inseridas novamente
+    (com novos IDs) e somadas aos agregados por minuto.
+    """
+    _ingest(client, "import-device")
+    exported = client.get("/api/export/measurements", params={"device_id": "import-device", "format": "arrow"}).content
+    irregularities = client.get("/api/export/irregularities", params={"device_id": "import-device"}).content
+
+    response = client.post("/api/import/measurements", content=exported, headers={"Content-Type": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200
+    assert response.json() == {"kind": "measurements", "rows": 10}
+    assert client.post("/api/import/irregularities", content=irregularities).json()["rows"] == 1
+
+    db.rollback()
+    assert db.query(Measurement).filter(Measurement.device_id == "import-device").count() == 20
+    imported = db.query(Irregularity).filter(Irregularity.device_id == "import-device").order_by(Irregularity.id).all()
+    assert len(imported) == 2
+    # O resumo da irregularidade é exportado e importado junto com ela
+    assert [(i.sample_count, i.abnormal_samples, i.peak_deviation) for i in imported[1:]] == [
+        (imported[0].sample_count, imported[0].abnormal_samples, imported[0].peak_deviation)
+    ]
+    assert imported[0].sample_count == 6
+    assert sum(r.count for r in db.query(MeasurementMinute).filter(MeasurementMinute.device_id == "import-device")) == 20
+    # A situação do dispositivo foi atualizada: as anormais da janela incluem as medições importadas
+    status = client.get("/api/devices").json()["items"][0]
+    assert status["device_id"] == "import-device" and status["abnormal_count"] == 20
+
+    response = client.post("/api/import/measurements", content=b"not a columnar file")
+    assert response.status_code == 400
+
+def test_imported_open_irregularity_is_closed_by_ingestion(client, db):
+    """
+    Testa que uma irregularidade aberta importada continua sendo a irregularidade ativa do
+    dispositivo (fechada pela ingestão com 'bipbip'), e que, havendo mais de uma aberta no arquivo,
+    apenas a mais recente fica aberta.
+    """
+    from datetime import datetime, timedelta
+    from services.measurementService import MeasurementService
+    from utils.columnar import IRREGULARITY_SCHEMA
+
+    start = datetime.now() - timedelta(hours=1)
+    rows = [
+        {"id": 1, "device_id": "imported-open", "start_timestamp": start, "end_timestamp": None},
+        {"id": 2, "device_id": "imported-open", "start_timestamp": start + timedelta(minutes=1), "end_timestamp": None},
+    ]
+    # Arquivo no formato anterior ao resumo das irregularidades (sem sample_count, abnormal_samples e peak_deviation)
+    schema = pa.schema([field for field in IRREGULARITY_SCHEMA if field.name in rows[0]])
+    sink = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), sink)
+    assert client.post("/api/import/irregularities", content=sink.getvalue()).json()["rows"] == 2
+
+    db.rollback()
+    imported = db.query(Irregularity).filter(Irregularity.device_id == "imported-open").order_by(Irregularity.start_timestamp).all()
+    assert [i.open_key for i in imported] == [None, "imported-open"]
+    assert imported[0].end_timestamp is not None and imported[1].end_timestamp is None
+    # A situação do dispositivo importado (sem medições) mostra a irregularidade aberta
+    active = client.get("/api/devices", params={"in_irregularity": True}).json()["items"]
+    assert [(d["device_id"], d["active_irregularity_id"]) for d in active] == [("imported-open", imported[1].id)]
+
+    baseline = MeasurementService.compute_baseline(0)
+    samples = [{"device_id": "imported-open", "time_ms": 0, "value": baseline}] * 60
+    alerts = [r["alert"] for r in client.post("/api/measurements/batch", json=samples).json()["results"]]
+    assert alerts[-1] == "bipbip"
+
+    db.rollback()
+    assert db.query(Irregularity).filter(Irregularity.device_id == "imported-open", Irregularity.end_timestamp.is_(None)).count() == 0
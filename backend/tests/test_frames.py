@@ -0,0 +1,138 @@
+import asyncio
+import socket
+import pytest
+from api.deps import build_async_measurement_service
+from repos.measurementRepository import MeasurementRepository
+from repos.irregularityRepository import IrregularityRepository
+from services.measurementService import MeasurementService
+from services.udpIngest import UdpIngestServer
+from utils.frames import FRAME_MEDIA_TYPE, SAMPLE_DTYPE, decode_alerts, decode_frame, encode_frame
+
+def _irregular_samples():
+    """5 medições anormais seguidas de 60 normais: 'bip' na 5ª e 'bipbip' na última."""
+    baseline = MeasurementService.compute_baseline(0)
+    return [0] * 65, [1.0] * 5 + [baseline] * 60
+
+def test_frame_roundtrip_and_validation():
+    """
+    Testa a leitura de um quadro (12 bytes por medição, sem cópia) e a recusa de quadros inválidos.
+    """
+    frame = encode_frame("dispositivo-ç", [1, -2, 2**31 - 1], [0.5, 1.25, -3.0], seq=2**32 - 1)
+    assert SAMPLE_DTYPE.itemsize == 12
+    assert len(frame) == 6 + len("dispositivo-ç".encode()) + 3 * 12
+
+    device_id, seq, samples = decode_frame(frame)
+    assert device_id == "dispositivo-ç"
+    assert seq == 2**32 - 1
+    assert samples["time_ms"].tolist() == [1, -2, 2**31 - 1]
+    assert samples["value"].tolist() == [0.5, 1.25, -3.0]
+    assert not samples.flags.owndata
+
+    header = b"\x01\x00\x00\x00\x00"
+    for invalid in (b"", b"\x02" + header[1:] + b"\x01a", header + b"\x00", frame[:-1], header + b"\x05ab", header + b"\x01\xff"):
+        with pytest.raises(ValueError):
+            decode_frame(invalid)
+
+def test_frame_endpoint(client, db):
+    """
+    Testa o endpoint binário: os alertas voltam como um byte por medição, na mesma ordem,
+    e as medições e a irregularidade são gravadas como no endpoint de lote.
+    """
+    time_ms, values = _irregular_samples()
+    response = client.post(
+        "/api/measurements/frame", content=encode_frame("frame-device", time_ms, values),
+        headers={"Content-Type": FRAME_MEDIA_TYPE},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == FRAME_MEDIA_TYPE
+    assert response.content == bytes([0] * 4 + [1] + [0] * 59 + [2])
+    alerts = decode_alerts(response.content)
+    assert alerts[4] == "bip" and alerts[-1] == "bipbip"
+
+    assert len(MeasurementRepository(db).get_last_n("frame-device", 100)) == len(values)
+    irregularities = IrregularityRepository(db).get_all("frame-device")
+    assert len(irregularities) == 1
+    assert irregularities[0].sample_count == 61
+
+    response = client.post("/api/measurements/frame", content=encode_frame("frame-device", [0], [0.1])[:-5])
+    assert response.status_code == 400
+
+def test_resent_frame_is_not_processed_again(client, db):
+    """
+    Testa que o reenvio de um quadro (mesma sequência do anterior do dispositivo) recebe a mesma
+    resposta sem gravar as medições outra vez, e que quadros com sequência 0 são sempre processados.
+    """
+    time_ms, values = _irregular_samples()
+    frame = encode_frame("resent-device", time_ms[:5], values[:5], seq=7)
+    first = client.post("/api/measurements/frame", content=frame).content
+    assert decode_alerts(first)[-1] == "bip"
+    assert client.post("/api/measurements/frame", content=frame).content == first
+    assert len(MeasurementRepository(db).get_last_n("resent-device", 100)) == 5
+
+    following = encode_frame("resent-device", time_ms[5:], values[5:], seq=8)
+    assert decode_alerts(client.post("/api/measurements/frame", content=following).content)[-1] == "bipbip"
+    assert len(IrregularityRepository(db).get_all("resent-device")) == 1
+
+    unsequenced = encode_frame("resent-device", [0], [0.1])
+    for _ in range(2):
+        client.post("/api/measurements/frame", content=unsequenced)
+    assert len(MeasurementRepository(db).get_last_n("resent-device", 100)) == len(values) + 2
+
+def test_udp_ingest(db, async_session_factory):
+    """
+    Testa a ingestão por UDP: um quadro enviado por um socket recebe os códigos de alerta
+    como resposta, e quadros inválidos são descartados sem resposta.
+    """
+    time_ms, values = _irregular_samples()
+
+    async def run():
+        server = UdpIngestServer(async_session_factory, build_async_measurement_service)
+        host, port = await server.start("127.0.0.1", 0)
+        loop = asyncio.get_running_loop()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            await loop.sock_connect(sock, (host, port))
+            await loop.sock_sendall(sock, encode_frame("udp-device", time_ms, values, seq=1))
+            reply = await asyncio.wait_for(loop.sock_recv(sock, 2048), timeout=10)
+            # Reenvio do mesmo quadro: a mesma resposta, sem gravar novamente
+            await loop.sock_sendall(sock, encode_frame("udp-device", time_ms, values, seq=1))
+            resent = await asyncio.wait_for(loop.sock_recv(sock, 2048), timeout=10)
+        discarded = await server.handle(b"invalido", ("127.0.0.1", 9))
+        await server.stop()
+        return reply, resent, discarded
+
+    reply, resent, discarded = asyncio.run(run())
+    assert decode_alerts(reply) == [None] * 4 + ["bip"] + [None] * 59 + ["bipbip"]
+    assert resent == reply
+    assert discarded is None
+    assert len(MeasurementRepository(db).get_last_n("udp-device", 100)) == len(values)
+
+def test_frame_replies_waits_for_in_flight_frame():
+    """
+    Testa que um reenvio recebido enquanto o original ainda é processado aguarda o resultado dele,
+    e que um quadro cujo processamento falhou é processado novamente no reenvio.
+    """
+    from services.frameReplies import FrameReplies
+
+    calls = []
+
+    async def process():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"\x01"
+
+    async def failing():
+        raise ConnectionError("banco indisponível")
+
+    async def run():
+        replies = FrameReplies()
+        results = await asyncio.gather(replies.reply("d", 5, process), replies.reply("d", 5, process))
+        with pytest.raises(ConnectionError):
+            await replies.reply("d", 6, failing)
+        retried = await replies.reply("d", 6, process)
+        return results, retried
+
+    results, retried = asyncio.run(run())
+    assert results == [(b"\x01", False), (b"\x01", True)]
+    assert retried == (b"\x01", False)
+    assert len(calls) == 2
@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+from repos.measurementRepository import AsyncMeasurementRepository, MeasurementRepository
+from repos.irregularityRepository import AsyncIrregularityRepository, IrregularityRepository
+from services.deviceState import DeviceStateStore, WINDOW_SIZE
+from services.ingestQueue import IngestQueue, IngestQueueFull
+from services.measurementService import AsyncMeasurementService, MeasurementService
+
+def test_write_behind_flushes_in_order(db, async_session_factory):
+    """
+    Testa o modo write-behind: os alertas são decididos sem aguardar a gravação, e a fila
+    grava as medições e a irregularidade (aberta e fechada) ao ser parada.
+    """
+    baseline = MeasurementService.compute_baseline(0)
+    samples = [{"device_id": "queued", "time_ms": 0, "value": 1.0}] * 5
+    samples += [{"device_id": "queued", "time_ms": 0, "value": baseline}] * WINDOW_SIZE
+
+    async def run():
+        queue = IngestQueue(async_session_factory, maxsize=1000, flush_interval_ms=10_000, flush_rows=1000)
+        queue.start()
+        async with async_session_factory() as session:
+            service = AsyncMeasurementService(
+                AsyncMeasurementRepository(session), AsyncIrregularityRepository(session), DeviceStateStore(), ingest_queue=queue,
+            )
+            results = await service.process_batch(samples[:30])
+            single = await service.process_measurement("queued", 0, baseline)
+            results += await service.process_batch(samples[31:])
+        depth = queue.depth
+        await queue.stop()
+        return results, single, depth, queue.metrics()
+
+    results, single, depth, metrics = asyncio.run(run())
+    alerts = [r["alert"] for r in results]
+    assert alerts[4] == "bip" and alerts[-1] == "bipbip"
+    assert single["alert"] is None
+    # Nada foi gravado antes de parar a fila (intervalo longo), e tudo foi gravado ao parar:
+    # as medições, a abertura e o fechamento, e o resumo da irregularidade ao fim do primeiro lote e da medição avulsa
+    assert depth == len(samples) + 4
+    assert metrics["flushed_total"] == len(samples) + 4 and metrics["depth"] == 0
+
+    assert len(MeasurementRepository(db).get_last_n("queued", 100)) == len(samples)
+    irregularities = IrregularityRepository(db).get_all("queued")
+    assert len(irregularities) == 1 and irregularities[0].end_timestamp is not None
+    assert irregularities[0].sample_count == len(samples) - 4
+
+def test_queue_backpressure(async_session_factory):
+    """
+    Testa que a fila recusa itens quando está cheia (ou parada), após o tempo de espera.
+    """
+    async def run():
+        queue = IngestQueue(async_session_factory, maxsize=3, flush_interval_ms=10_000, flush_rows=1000)
+        with pytest.raises(IngestQueueFull):
+            await queue.put([("close", {"device_id": "x"})])
+        queue.start()
+        await queue.put([("close", {"device_id": "x"})] * 3)
+        with pytest.raises(IngestQueueFull):
+            await queue.put([("close", {"device_id": "x"})], timeout=0.05)
+        await queue.stop()
+        return queue.metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["rejected_total"] == 1
+    assert metrics["flushed_total"] == 3
+
+def test_failed_flush_is_retried_then_dropped(db, async_session_factory):
+    """
+    Testa que um lote que falha é gravado novamente e, se todas as tentativas falharem,
+    é descartado junto com o estado em memória dos seus dispositivos.
+    """
+    from datetime import datetime
+    from services.deviceState import DeviceState
+
+    failures = {"left": 1}
+
+    def flaky_factory():
+        if failures["left"]:
+            failures["left"] -= 1
+            raise ConnectionError("banco indisponível")
+        return async_session_factory()
+
+    measurement = {"device_id": "retried", "time_ms": 0, "value": 0.1, "timestamp": datetime.now(), "abnormal": False}
+    states = DeviceStateStore()
+
+    async def run():
+        queue = IngestQueue(flaky_factory, flush_interval_ms=10_000, retry_delay_ms=1, flush_retries=2, states=states)
+        queue.start()
+        await queue.put([("measurement", measurement)])
+        await queue.stop()
+        recovered = queue.metrics()
+
+        failures["left"] = 3
+        states.set("dropped", DeviceState())
+        queue.start()
+        await queue.put([("measurement", dict(measurement, device_id="dropped"))])
+        await queue.stop()
+        return recovered, queue.metrics()
+
+    recovered, dropped = asyncio.run(run())
+    assert recovered["retry_count"] == 1 and recovered["flushed_total"] == 1 and recovered["failed_total"] == 0
+    assert len(MeasurementRepository(db).get_last_n("retried", 10)) == 1
+
+    assert dropped["retry_count"] == 3 and dropped["failed_total"] == 1
+    assert states.get("dropped") is None
+    assert MeasurementRepository(db).get_last_n("dropped", 10) == []
+
+def test_rejected_batch_is_undone_in_memory(db, async_session_factory):
+    """
+    Testa que um lote recusado pela fila cheia é desfeito no estado em memória (sem recarregá-lo do
+    banco, que ainda não tem os itens na fila): o reenvio das mesmas medições não gera um segundo 'bip'.
+    Testa também que um estado descartado só é recarregado depois que a fila grava os itens do dispositivo.
+    """
+    abnormal = [{"device_id": "rejected", "time_ms": 0, "value": 1.0}] * 5
+    states = DeviceStateStore()
+
+    async def run():
+        queue = IngestQueue(async_session_factory, flush_interval_ms=10_000, states=states)
+        queue.start()
+        async with async_session_factory() as session:
+            service = AsyncMeasurementService(
+                AsyncMeasurementRepository(session), AsyncIrregularityRepository(session), states, ingest_queue=queue,
+            )
+            first = await service.process_batch(abnormal)
+
+            async def full(items, timeout=1.0):
+                raise IngestQueueFull("A fila de gravação está cheia")
+
+            put, queue.put = queue.put, full
+            with pytest.raises(IngestQueueFull):
+                await service.process_batch(abnormal)
+            queue.put = put
+            retried = await service.process_batch(abnormal)
+
+            states.discard("rejected")
+            reloaded = await service.process_measurement("rejected", 0, 1.0)
+            depth = queue.depth
+        await queue.stop()
+        return first, retried, reloaded, depth
+
+    first, retried, reloaded, depth = asyncio.run(run())
+    assert [r["alert"] for r in first] == [None] * 4 + ["bip"]
+    assert [r["alert"] for r in retried] == [None] * 5
+    # O recarregamento aguardou a gravação dos itens do dispositivo, e vê a irregularidade aberta:
+    # na fila restam apenas a medição recarregada e o resumo dela
+    assert reloaded["alert"] is None and depth == 2
+    assert states.get("rejected").in_irregularity
+
+    irregularities = IrregularityRepository(db).get_all("rejected")
+    assert len(irregularities) == 1 and irregularities[0].sample_count == 7
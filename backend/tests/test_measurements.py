@@ -0,0 +1,254 @@
+import pytest
+import json
+from repos.measurementRepository import MeasurementRepository
+from repos.irregularityRepository import IrregularityRepository
+from services.measurementService import MeasurementService
+
+def test_batch_endpoint_json(client, db):
+    """
+    Testa o endpoint de lote de medições com um array JSON.
+
+    Envia 5 medições anormais seguidas de 60 normais e verifica que todas são
+    gravadas, e que os alertas 'bip' e 'bipbip' são retornados nas posições corretas.
+    """
+    baseline = MeasurementService.compute_baseline(0)
+    samples = [{"device_id": "batch-device", "time_ms": 0, "value": 1.0}] * 5
+    samples += [{"device_id": "batch-device", "time_ms": 0, "value": baseline}] * 60
+
+    response = client.post("/api/measurements/batch", json=samples)
+    assert response.status_code == 200
+    json_data = response.json()
+    assert json_data["received"] == len(samples)
+    alerts = [r["alert"] for r in json_data["results"]]
+    assert alerts[4] == "bip"
+    assert alerts[-1] == "bipbip"
+    assert alerts.count(None) == len(samples) - 2
+
+    assert len(MeasurementRepository(db).get_last_n("batch-device", 100)) == len(samples)
+    irregularities = IrregularityRepository(db).get_all("batch-device")
+    assert len(irregularities) == 1
+    assert irregularities[0].end_timestamp is not None
+
+def test_batch_endpoint_ndjson(client):
+    """
+    Testa o endpoint de lote de medições com um corpo NDJSON, e a validação das medições.
+    """
+    body = "\n".join(json.dumps({"device_id": "ndjson-device", "time_ms": i, "value": 0.1}) for i in range(3))
+    response = client.post("/api/measurements/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json()["received"] == 3
+
+    response = client.post("/api/measurements/batch", json=[{"device_id": "ndjson-device"}])
+    assert response.status_code == 422
+
+def test_batch_matches_single_path(db):
+    """
+    Testa que o processamento em lote gera os mesmos alertas que o processamento individual.
+    """
+    service = MeasurementService(MeasurementRepository(db), IrregularityRepository(db))
+    values = [0.5 if i % 7 == 0 else MeasurementService.compute_baseline(i) for i in range(200)]
+    single = [service.process_measurement("single", i, v)["alert"] for i, v in enumerate(values)]
+    batch = [r["alert"] for r in service.process_batch([{"device_id": "batch", "time_ms": i, "value": v} for i, v in enumerate(values)])]
+    assert single == batch
+
+def test_add_measurement(client):
+    """
+    Testa o endpoint de registro de uma medição, pelo caminho assíncrono.
+    """
+    params = {"device_id": "single-device", "time_ms": 50, "value": 0.2}
+    response = client.post("/api/measurements", params=params)
+    assert response.status_code == 200
+    json_data = response.json()
+    assert json_data["device_id"] == params["device_id"]
+    assert json_data["alert"] is None
+
+def test_history_pagination_and_stream(client, db):
+    """
+    Testa a paginação por cursor e a transmissão em NDJSON do histórico.
+
+    Registra 25 medições e percorre o histórico em páginas de 10, verificando que
+    todas as medições são retornadas uma única vez, em ordem, e que o NDJSON
+    transmitido contém as mesmas medições.
+    """
+    samples = [{"device_id": "history-device", "time_ms": i, "value": 0.1} for i in range(25)]
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+
+    ids, cursor = [], None
+    while True:
+        params = {"device_id": "history-device", "limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/measurements/history/page", params=params).json()
+        ids += [m["id"] for m in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(ids) == 25
+    assert ids == sorted(set(ids))
+
+    response = client.get("/api/measurements/history/stream", params={"device_id": "history-device"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [m["id"] for m in lines] == ids
+
+    response = client.get("/api/measurements/history/page", params={"device_id": "history-device", "cursor": "invalido"})
+    assert response.status_code == 400
+
+def test_history_aggregate_and_downsample(client, db):
+    """
+    Testa a agregação do histórico por intervalos e a redução de pontos com LTTB.
+    """
+    samples = [{"device_id": "aggregate-device", "time_ms": i, "value": i / 100} for i in range(100)]
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+
+    response = client.get("/api/measurements/history/aggregate", params={"device_id": "aggregate-device", "bucket_seconds": 86400})
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert sum(b["count"] for b in buckets) == 100
+    assert min(b["min"] for b in buckets) == 0
+    assert max(b["max"] for b in buckets) == 0.99
+
+    response = client.get("/api/measurements/history/downsample", params={"device_id": "aggregate-device", "points": 10})
+    assert response.status_code == 200
+    assert len(response.json()["points"]) == 10
+
+def test_downsample_pre_reduces_large_ranges(client, db, monkeypatch):
+    """
+    Testa que, acima do limite de medições brutas, o LTTB roda sobre o mínimo e o máximo
+    de cada intervalo calculados no banco, e não sobre as medições.
+    """
+    import api.endpoints.measurements as measurements_endpoint
+
+    samples = [{"device_id": "reduced-device", "time_ms": i, "value": (i % 7) / 10} for i in range(100)]
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+
+    def fail(*args, **kwargs):
+        raise AssertionError("as medições brutas não devem ser lidas")
+
+    monkeypatch.setattr(measurements_endpoint, "DOWNSAMPLE_MAX_RAW_POINTS", 50)
+    monkeypatch.setattr(measurements_endpoint.MeasurementRepository, "iter_history", fail)
+    response = client.get("/api/measurements/history/downsample", params={"device_id": "reduced-device", "points": 10})
+    assert response.status_code == 200
+    values = [p["value"] for p in response.json()["points"]]
+    # As medições caem em um intervalo (ou dois, na virada do minuto): restam o mínimo e o máximo de cada um
+    assert len(values) <= 4 and min(values) == 0 and max(values) == 0.6
+
+def test_lttb_keeps_extremes():
+    """
+    Testa que o LTTB mantém as extremidades e os picos da série.
+    """
+    import numpy as np
+    from utils.downsampling import lttb
+
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 10
+    selected = lttb(x, y, 20)
+    assert len(selected) == 20
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 500 in selected
+    assert np.all(np.diff(selected) > 0)
+
+def test_rollups_are_updated_on_ingest(client, db):
+    """
+    Testa que os agregados por minuto e por hora são atualizados na ingestão,
+    tanto em lote quanto individualmente, e que a agregação por hora os utiliza.
+    """
+    from models.measurementRollup import MeasurementMinute, MeasurementHour
+
+    samples = [{"device_id": "rollup-device", "time_ms": 0, "value": v} for v in (0.1, 0.5, 1.0)]
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+    assert client.post("/api/measurements", params={"device_id": "rollup-device", "time_ms": 0, "value": 2.0}).status_code == 200
+
+    for model in (MeasurementMinute, MeasurementHour):
+        rows = db.query(model).filter(model.device_id == "rollup-device").all()
+        assert sum(r.count for r in rows) == 4
+        assert sum(r.sum for r in rows) == pytest.approx(3.6)
+        assert min(r.min for r in rows) == 0.1
+        assert max(r.max for r in rows) == 2.0
+        assert sum(r.abnormal_count for r in rows) == 4
+    db.rollback()
+
+    response = client.get("/api/measurements/history/aggregate", params={"device_id": "rollup-device", "bucket_seconds": 3600})
+    buckets = response.json()["buckets"]
+    assert sum(b["count"] for b in buckets) == 4
+    assert sum(b["abnormal_count"] for b in buckets) == 4
+
+def test_rollups_accumulate_many_buckets(db):
+    """
+    Testa que medições espalhadas por muitos intervalos (ex.: importação de histórico)
+    são agregadas em vários upserts, sem exceder o limite de parâmetros do banco.
+    """
+    from datetime import datetime, timedelta
+    from models.measurementRollup import MeasurementMinute
+    from repos.rollupRepository import RollupRepository, UPSERT_CHUNK_ROWS
+
+    start = datetime(2025, 1, 1)
+    samples = [
+        {"device_id": "many-buckets", "timestamp": start + timedelta(minutes=i), "value": 1.0, "abnormal": False}
+        for i in range(UPSERT_CHUNK_ROWS * 10 + 1)
+    ]
+    RollupRepository(db).accumulate(samples)
+    db.commit()
+    assert db.query(MeasurementMinute).filter(MeasurementMinute.device_id == "many-buckets").count() == len(samples)
+
+def test_history_buckets_match_between_rollups_and_raw(db):
+    """
+    Testa que o primeiro intervalo, parcialmente dentro do período, é o mesmo nos agregados
+    e nas medições brutas: as duas consultas contam as mesmas medições.
+    """
+    from datetime import datetime, timedelta
+    from repos.rollupRepository import RollupRepository
+
+    # Uma medição logo depois do início do período (1 dia), e outra no início da mesma hora
+    start = datetime.now() - timedelta(days=1) + timedelta(seconds=5)
+    timestamps = [start.replace(minute=0, second=0, microsecond=0), start]
+    rows = [{"device_id": "partial", "time_ms": 0, "value": 0.1, "timestamp": ts} for ts in timestamps]
+    RollupRepository(db).accumulate([{**row, "abnormal": False} for row in rows])
+    MeasurementRepository(db).create_many(rows)
+
+    for bucket_seconds in (60, 3600):
+        raw = MeasurementRepository(db).get_history_buckets("partial", bucket_seconds, days=1)
+        rollup = RollupRepository(db).get_history_buckets("partial", bucket_seconds, days=1)
+        assert [(b.bucket_start, b.count) for b in rollup] == [(b.bucket_start, b.count) for b in raw]
+    assert sum(b.count for b in rollup) == 2
+
+def test_history_fast_path_formats(client):
+    """
+    Testa o histórico serializado a partir de tuplas: o JSON tem o mesmo formato do modelo
+    MeasurementResponse, e o MessagePack é escolhido pelo cabeçalho Accept.
+    """
+    import msgpack
+    from schemas.measurement import MeasurementResponse
+
+    samples = [{"device_id": "fast-device", "time_ms": i * 15, "value": 0.25} for i in range(3)]
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+
+    response = client.get("/api/measurements/history", params={"device_id": "fast-device"})
+    assert response.headers["content-type"] == "application/json"
+    history = response.json()
+    assert [MeasurementResponse(**m).time_ms for m in history] == [0, 15, 30]
+    assert set(history[0]) == {"id", "device_id", "time_ms", "timestamp", "value"}
+
+    response = client.get("/api/measurements/history", params={"device_id": "fast-device"}, headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == history
+
+def test_non_finite_values_are_rejected(client):
+    """
+    Testa que medições com valor NaN ou infinito são recusadas com 422 (400 no formato binário),
+    em vez de falhar na gravação dos agregados.
+    """
+    from utils.frames import encode_frame
+
+    for value in ("nan", "inf", "-Infinity"):
+        response = client.post("/api/measurements", params={"device_id": "nan-device", "time_ms": 0, "value": value})
+        assert response.status_code == 422
+    body = '[{"device_id": "nan-device", "time_ms": 0, "value": NaN}]'
+    response = client.post("/api/measurements/batch", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    body = '{"device_id": "nan-device", "time_ms": 0, "value": Infinity}'
+    response = client.post("/api/measurements/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 422
+    response = client.post("/api/measurements/frame", content=encode_frame("nan-device", [0, 1], [0.1, float("nan")]))
+    assert response.status_code == 400
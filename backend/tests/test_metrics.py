@@ -0,0 +1,54 @@
+from core import metrics
+from core.metrics import Histogram, Counter
+from core.database import describe_statement
+
+def test_metrics_endpoint_reports_requests_and_ingest(client):
+    """
+    Testa o endpoint /metrics: latência por rota (pelo caminho da rota, não pela URL),
+    medições ingeridas por dispositivo, alertas e commits.
+    """
+    batch_labels = {"method": "POST", "route": "/api/measurements/batch", "status": "200"}
+    batch_requests = metrics.http_request_duration.count(**batch_labels)
+    commits = metrics.db_commit_duration.count()
+
+    samples = [{"device_id": "metrics-device", "time_ms": 0, "value": 1.0}] * 5
+    assert client.post("/api/measurements/batch", json=samples).status_code == 200
+    assert client.get("/api/unknown/route").status_code == 404
+
+    assert metrics.http_request_duration.count(**batch_labels) == batch_requests + 1
+    assert metrics.db_commit_duration.count() > commits
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'route="/api/measurements/batch",status="200"' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'hbm_ingested_measurements_total{device_id="metrics-device"} 5' in body
+    assert 'hbm_ingest_alerts_total{alert="bip"}' in body
+
+def test_histogram_renders_cumulative_buckets():
+    """Testa o formato do histograma: faixas cumulativas, +Inf, soma e contagem."""
+    histogram = Histogram("latency_seconds", "Latência.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, route="/a")
+
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latência.", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+def test_counter_escapes_labels_and_statements_are_labelled():
+    """Testa o escape dos rótulos e a identificação da operação/tabela das consultas."""
+    counter = Counter("events_total", "Eventos.", ("device_id",))
+    counter.inc(2, device_id='a"b')
+    assert 'events_total{device_id="a\\"b"} 2' in counter.render()
+
+    assert describe_statement("SELECT id FROM measurements WHERE device_id = ?") == ("SELECT", "measurements")
+    assert describe_statement("INSERT INTO irregularities (device_id) VALUES (?)") == ("INSERT", "irregularities")
+    assert describe_statement("UPDATE irregularities SET end_timestamp=?") == ("UPDATE", "irregularities")
@@ -0,0 +1,143 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+from core.migrations import MIGRATIONS, migrate, wait_for_database
+
+def test_migrate_upgrades_existing_schema(db_url):
+    """
+    Testa a migração de um banco criado por uma versão anterior: as colunas novas das
+    irregularidades são adicionadas, apenas a irregularidade aberta mais recente de cada
+    dispositivo continua aberta, e uma segunda execução não aplica nada.
+    """
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE irregularities (id INTEGER PRIMARY KEY, device_id VARCHAR(50), "
+            "start_timestamp DATETIME, end_timestamp DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO irregularities (id, device_id, start_timestamp) VALUES "
+            "(1, 'old', '2024-01-01 00:00:00'), (2, 'old', '2024-01-02 00:00:00'), (3, 'other', '2024-01-01 00:00:00')"
+        ))
+
+    assert migrate(engine) == [version for version, _ in MIGRATIONS]
+    columns = {c["name"] for c in inspect(engine).get_columns("irregularities")}
+    assert {"open_key", "sample_count", "abnormal_samples", "peak_deviation"} <= columns
+    assert inspect(engine).has_table("device_status")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, open_key, end_timestamp IS NULL FROM irregularities ORDER BY id")).all()
+    assert rows == [(1, None, 0), (2, "old", 1), (3, "other", 1)]
+
+    assert migrate(engine) == []
+    engine.dispose()
+
+def test_migrate_backfills_device_status(db_url):
+    """
+    Testa que a migração preenche a situação dos dispositivos de um banco anterior à tabela device_status:
+    a última medição, as anormais da janela e a irregularidade aberta, sem alterar as linhas já existentes.
+    """
+    from core.migrations import _load_models
+    from utils.baseline import compute_baseline
+
+    # Esquema das migrações anteriores (sem registrá-las, como um banco criado com `create_all`), com dados
+    _load_models()
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        for version, step in MIGRATIONS:
+            if version != "0005_device_status_backfill":
+                step(conn)
+        conn.execute(text(
+            "INSERT INTO measurements (device_id, time_ms, timestamp, value) VALUES "
+            "('open', 0, '2024-01-01 00:00:00', 1.0), ('open', 0, '2024-01-01 00:00:01', 1.0), "
+            f"('closed', 0, '2024-01-01 00:00:00', 1.0), ('closed', 0, '2024-01-01 00:00:01', {compute_baseline(0)}), "
+            "('known', 0, '2024-01-01 00:00:00', 1.0)"
+        ))
+        conn.execute(text(
+            "INSERT INTO irregularities (id, device_id, start_timestamp, open_key) VALUES (7, 'open', '2024-01-01 00:00:00', 'open')"
+        ))
+        conn.execute(text("INSERT INTO device_status (device_id, abnormal_count, in_irregularity) VALUES ('known', 0, 0)"))
+
+    assert migrate(engine) == [version for version, _ in MIGRATIONS]
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT device_id, last_value, abnormal_count, active_irregularity_id, in_irregularity FROM device_status ORDER BY device_id"
+        )).all()
+    assert rows == [
+        ("closed", compute_baseline(0), 1, None, 0),
+        ("known", None, 0, None, 0),
+        ("open", 1.0, 2, 7, 1),
+    ]
+    engine.dispose()
+
+def test_wait_for_database_retries_with_backoff(db_url):
+    """Testa que a preparação do banco é repetida enquanto o banco recusa conexões, até o tempo máximo."""
+    engine = create_engine(db_url)
+    attempts = []
+
+    def flaky(engine):
+        attempts.append(datetime.now())
+        if len(attempts) < 3:
+            raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+        return ["ok"]
+
+    assert wait_for_database(engine, flaky, timeout=5, initial_delay=0.01) == ["ok"]
+    assert len(attempts) == 3
+
+    def down(engine):
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    with pytest.raises(OperationalError):
+        wait_for_database(engine, down, timeout=0.05, initial_delay=0.01)
+
+def test_migrate_creates_indexes_on_baseline_schema(db_url):
+    """
+    Testa a migração de um banco criado com o esquema original (apenas índices de uma coluna):
+    os índices compostos usados pelas consultas do histórico e das irregularidades são criados.
+    """
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE measurements (id INTEGER PRIMARY KEY, device_id VARCHAR(50), time_ms INTEGER, "
+            "timestamp DATETIME, value FLOAT)"
+        ))
+        conn.execute(text("CREATE INDEX ix_measurements_id ON measurements (id)"))
+        conn.execute(text("CREATE INDEX ix_measurements_device_id ON measurements (device_id)"))
+        conn.execute(text(
+            "CREATE TABLE irregularities (id INTEGER PRIMARY KEY, device_id VARCHAR(50), "
+            "start_timestamp DATETIME, end_timestamp DATETIME)"
+        ))
+        conn.execute(text("CREATE INDEX ix_irregularities_id ON irregularities (id)"))
+        conn.execute(text("CREATE INDEX ix_irregularities_device_id ON irregularities (device_id)"))
+
+    assert "0004_model_indexes" in migrate(engine)
+    measurement_indexes = {i["name"] for i in inspect(engine).get_indexes("measurements")}
+    irregularity_indexes = {i["name"] for i in inspect(engine).get_indexes("irregularities")}
+    assert "ix_measurements_device_id_timestamp" in measurement_indexes
+    assert "ix_irregularities_device_id_end_timestamp" in irregularity_indexes
+    engine.dispose()
+
+def test_concurrent_migrations_are_serialized(db_url):
+    """
+    Testa que dois processos migrando o mesmo banco novo ao mesmo tempo não falham: um aplica
+    as migrações e o outro, depois de aguardar a trava, não encontra nada pendente.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = create_engine(db_url)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(migrate, [engine, engine]))
+    assert sorted(results, key=len) == [[], [version for version, _ in MIGRATIONS]]
+    engine.dispose()
+
+def test_lifespan_keeps_injected_engine(db):
+    """Testa que a inicialização da API usa o engine já criado (ex.: o SQLite dos testes), sem substituí-lo."""
+    from fastapi.testclient import TestClient
+    from core import database
+    from main import app
+
+    engine = database.engine
+    with TestClient(app) as client:
+        assert database.engine is engine
+        assert client.get("/").status_code == 200
+    assert database.engine is engine
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime
+from services.broadcaster import Broadcaster
+
+def test_websocket_receives_measurements_and_alerts(client):
+    """
+    Testa o canal WebSocket: após a inscrição, cada medição registrada para o dispositivo
+    é enviada ao cliente, junto do evento de abertura da irregularidade.
+    """
+    with client.websocket_connect("/api/measurements/ws?device_id=ws-device") as websocket:
+        samples = [{"device_id": "ws-device", "time_ms": 0, "value": 1.0}] * 5
+        samples.append({"device_id": "other-device", "time_ms": 0, "value": 1.0})
+        assert client.post("/api/measurements/batch", json=samples).status_code == 200
+
+        events = [websocket.receive_json() for _ in range(6)]
+    assert [e["type"] for e in events] == ["measurement"] * 5 + ["irregularity"]
+    assert all(e["device_id"] == "ws-device" for e in events)
+    assert events[4]["alert"] == "bip"
+    assert events[5]["status"] == "open"
+
+def test_slow_subscriber_drops_oldest_events():
+    """
+    Testa que um cliente lento não bloqueia a publicação: os eventos mais antigos são descartados.
+    """
+    async def run():
+        broadcaster = Broadcaster(queue_size=3)
+        subscription = broadcaster.subscribe("dev")
+        measurements = [{"device_id": "dev", "time_ms": i, "value": 0.0, "alert": None} for i in range(5)]
+        broadcaster.publish_measurements(measurements, datetime.now())
+        received = [(await subscription.get())["time_ms"] for _ in range(3)]
+        broadcaster.unsubscribe(subscription)
+        return received, subscription.dropped, broadcaster.subscriber_count()
+
+    received, dropped, count = asyncio.run(run())
+    assert received == [2, 3, 4]
+    assert dropped == 2
+    assert count == 0
+
+def test_sse_subscribes_only_while_streaming():
+    """
+    Testa que o canal SSE só se inscreve quando a resposta começa a ser transmitida, e que a
+    inscrição é removida ao encerrar a transmissão (uma resposta nunca iniciada não deixa inscrição).
+    """
+    from api.endpoints.realtime import measurements_events
+    from core.sharding import ShardRouter
+    from services.broadcaster import broadcaster
+
+    async def run():
+        before = broadcaster.subscriber_count()
+        never_started = await measurements_events(device_id="sse-device", shards=ShardRouter())
+        del never_started
+        counts = [broadcaster.subscriber_count() - before]
+
+        response = await measurements_events(device_id="sse-device", shards=ShardRouter())
+        stream = response.body_iterator
+        broadcaster.publish("sse-device", [{"type": "measurement", "device_id": "sse-device"}])
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        counts.append(broadcaster.subscriber_count() - before)
+        broadcaster.publish("sse-device", [{"type": "measurement", "device_id": "sse-device"}])
+        chunk = await asyncio.wait_for(first, 5)
+        await stream.aclose()
+        counts.append(broadcaster.subscriber_count() - before)
+        return counts, chunk
+
+    counts, chunk = asyncio.run(run())
+    assert counts == [0, 1, 0]
+    assert chunk.startswith("event: measurement")
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from repos.measurementRepository import MeasurementRepository
+from repos.irregularityRepository import IrregularityRepository
+from services.measurementService import MeasurementService
+from services.deviceState import DeviceState
+from services.replay import DetectionThresholds, ReplayEngine, replay_rows
+from utils.baseline import compute_baseline
+
+def _stream(n: int, seed: int = 0) -> list:
+    """Medições sintéticas com trechos normais e anormais alternados, como linhas do histórico."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    abnormal_rate = 0.0
+    for i in range(n):
+        if i % 97 == 0:
+            abnormal_rate = rng.choice([0.0, 0.02, 0.1, 0.5])
+        time_ms = int(rng.integers(0, 1000))
+        value = compute_baseline(time_ms) * (2.0 if rng.random() < abnormal_rate else 1.0)
+        rows.append((i, "replay-device", time_ms, i, value))
+    return rows
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("chunk_size", [7, 37, 500])
+@pytest.mark.parametrize("thresholds", [DetectionThresholds(), DetectionThresholds(0.3, 20, 3, 10)])
+def test_replay_matches_state_machine(monkeypatch, thresholds, chunk_size, seed):
+    """
+    Testa que a detecção vetorizada, em blocos, produz as mesmas irregularidades que a
+    máquina de estados da ingestão (DeviceState) com os mesmos limites, com blocos menores
+    e maiores que a janela.
+    """
+    monkeypatch.setattr("services.deviceState.WINDOW_SIZE", thresholds.window_size)
+    monkeypatch.setattr("services.deviceState.OPEN_THRESHOLD", thresholds.open_count)
+    monkeypatch.setattr("services.deviceState.CLOSE_SAMPLES", thresholds.close_samples)
+
+    rows = _stream(5000, seed)
+    state = DeviceState()
+    expected = []
+    for _, _, time_ms, position, value in rows:
+        baseline = compute_baseline(time_ms)
+        alert = state.push(abs(value - baseline) / abs(baseline) >= thresholds.deviation)
+        if alert == "bip":
+            expected.append({"start": position, "end": None})
+        elif alert == "bipbip":
+            expected[-1]["end"] = position
+
+    result = replay_rows(rows, [thresholds], chunk_size=chunk_size)[0]
+    assert result["intervals"] == expected
+    assert result["alerts"]["bip"] == len(expected) > 0
+    assert result["samples"] == len(rows)
+
+def test_replay_engine_reads_without_writing(db, db_url):
+    """
+    Testa o replay de vários dispositivos em paralelo, com vários conjuntos de limites,
+    e que ele não grava nas tabelas.
+    """
+    service = MeasurementService(MeasurementRepository(db), IrregularityRepository(db))
+    baseline = compute_baseline(0)
+    for device_id in ("replay-a", "replay-b"):
+        service.process_batch(
+            [{"device_id": device_id, "time_ms": 0, "value": 1.0}] * 5
+            + [{"device_id": device_id, "time_ms": 0, "value": baseline}] * 60
+        )
+
+    strict = DetectionThresholds(open_count=6)
+    report = ReplayEngine(db_url, chunk_size=16, workers=2).run([DetectionThresholds(), strict])
+
+    assert [d["device_id"] for d in report[0]["devices"]] == ["replay-a", "replay-b"]
+    assert report[0]["alerts"] == {"bip": 2, "bipbip": 2}
+    assert report[1]["thresholds"]["open_count"] == 6
+    assert report[1]["alerts"] == {"bip": 0, "bipbip": 0}
+    assert len(IrregularityRepository(db).get_all("replay-a")) == 1
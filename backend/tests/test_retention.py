@@ -0,0 +1,117 @@
+import csv
+import gzip
+from datetime import date, datetime
+import pytest
+from sqlalchemy.orm import sessionmaker
+from models.measurement import Measurement
+from repos.measurementRepository import MeasurementRepository
+from services.partitioning import add_partitions_ddl, partition_day, partition_table_ddl
+from services.retention import RetentionService
+
+TODAY = date(2025, 3, 10)
+
+def _seed(db):
+    """Insere duas medições por dia, de 5 a 9 de março."""
+    MeasurementRepository(db).create_many([
+        {"device_id": f"dev-{hour}", "time_ms": 0, "value": 0.1, "timestamp": datetime(2025, 3, day, hour)}
+        for day in range(5, 10) for hour in (1, 23)
+    ])
+
+def _service(db, **kwargs) -> RetentionService:
+    return RetentionService(sessionmaker(bind=db.get_bind()), 3, **kwargs)
+
+def test_retention_archives_and_removes_expired_days(db, tmp_path):
+    """
+    Testa a retenção sem particionamento (SQLite): os dias anteriores ao corte são arquivados
+    em CSV com gzip, um arquivo por dia, e removidos; os demais dias permanecem.
+    """
+    _seed(db)
+    report = _service(db, archive_dir=str(tmp_path / "archive")).run(today=TODAY)
+
+    assert [entry["day"] for entry in report] == ["2025-03-05", "2025-03-06"]
+    assert all(entry["rows"] == 2 for entry in report)
+
+    with gzip.open(report[0]["archive"], "rt", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "device_id", "time_ms", "timestamp", "value"]
+    assert [row[1] for row in rows[1:]] == ["dev-1", "dev-23"]
+
+    db.rollback()
+    remaining = sorted({m.timestamp.date() for m in db.query(Measurement).all()})
+    assert remaining == [date(2025, 3, 7), date(2025, 3, 8), date(2025, 3, 9)]
+
+def test_retention_dry_run_and_parquet_archive(db, tmp_path):
+    """Testa a simulação (sem remover nada) e o arquivamento em Parquet."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    _seed(db)
+
+    service = _service(db, archive_dir=str(tmp_path), archive_format="parquet")
+    assert [entry["rows"] for entry in service.run(today=TODAY, dry_run=True)] == [None, None]
+    assert db.query(Measurement).count() == 10
+
+    report = service.run(today=TODAY)
+    table = pq.read_table(report[0]["archive"])
+    assert table.num_rows == 2
+    assert table.column_names == ["id", "device_id", "time_ms", "timestamp", "value"]
+
+def test_partition_ddl():
+    """Testa os comandos de particionamento diário do MySQL."""
+    ddl = partition_table_ddl([date(2025, 3, 9), date(2025, 3, 10)])
+    assert "DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)" in ddl
+    assert "PARTITION BY RANGE (TO_DAYS(timestamp))" in ddl
+    assert "PARTITION p20250309 VALUES LESS THAN (TO_DAYS('2025-03-10'))" in ddl
+    assert ddl.endswith("PARTITION pmax VALUES LESS THAN MAXVALUE)")
+
+    assert add_partitions_ddl([date(2025, 3, 11)]).startswith("ALTER TABLE measurements REORGANIZE PARTITION pmax INTO (")
+    assert partition_day("p20250311") == date(2025, 3, 11)
+    assert partition_day("pmax") is None
+
+def test_retention_invalidates_cached_reads(db):
+    """
+    Testa que a remoção dos dias expirados invalida o cache das leituras dos dispositivos
+    afetados, e que a simulação (dry run) não o invalida.
+    """
+    from core.cache import response_cache
+
+    def cached(device_id: str, body: bytes) -> bytes:
+        return response_cache.get_or_compute("history", device_id, {}, "application/json", lambda: body).body
+
+    _seed(db)
+    assert cached("dev-1", b"antes") == b"antes"
+    _service(db).run(today=TODAY, dry_run=True)
+    assert cached("dev-1", b"depois") == b"antes"
+    _service(db).run(today=TODAY)
+    assert cached("dev-1", b"depois") == b"depois"
+
+def test_maintenance_runs_in_one_process_and_keeps_existing_archives(db, tmp_path):
+    """
+    Testa que a manutenção é ignorada enquanto outro processo tem a trava, e que um arquivo
+    já existente de um dia nunca é substituído: o novo arquivo recebe um sufixo.
+    """
+    from core.database import database_lock
+    from services.retention import MAINTENANCE_LOCK, run_maintenance_once
+
+    _seed(db)
+    archive_dir = tmp_path / "archive"
+    archive_dir.mkdir()
+    existing = archive_dir / "measurements-2025-03-05.csv.gz"
+    existing.write_bytes(b"arquivo anterior")
+    # A manutenção usa o dia atual: a retenção é calculada para manter as medições a partir de 7 de março
+    service = RetentionService(sessionmaker(bind=db.get_bind()), (date.today() - date(2025, 3, 7)).days, archive_dir=str(archive_dir))
+    engine = db.get_bind()
+
+    with database_lock(engine, MAINTENANCE_LOCK) as acquired:
+        assert acquired
+        assert run_maintenance_once(engine, None, service) is None
+    assert db.query(Measurement).count() == 10
+
+    report = run_maintenance_once(engine, None, service)
+    assert [entry["archive"] for entry in report] == [
+        str(archive_dir / "measurements-2025-03-05.1.csv.gz"), str(archive_dir / "measurements-2025-03-06.csv.gz"),
+    ]
+    assert existing.read_bytes() == b"arquivo anterior"
+    # Uma nova execução não encontra medições nos dias removidos, e não altera os arquivos
+    assert service._expire_day(date(2025, 3, 5)) == {"archive": None, "rows": 0}
+    assert sorted(p.name for p in archive_dir.iterdir()) == [
+        "measurements-2025-03-05.1.csv.gz", "measurements-2025-03-05.csv.gz", "measurements-2025-03-06.csv.gz",
+    ]
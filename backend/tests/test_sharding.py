@@ -0,0 +1,187 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+import pytest
+from repos.irregularityRepository import IrregularityRepository, AsyncIrregularityRepository
+from core.sharding import HashRing, ShardRouter
+
+def test_open_and_close_are_atomic(db):
+    """
+    Testa que um dispositivo tem no máximo uma irregularidade aberta, mesmo que duas
+    decisões de abertura (ex.: de processos diferentes) cheguem ao banco, e que o
+    fechamento só é aplicado uma vez.
+    """
+    repo = IrregularityRepository(db)
+    assert repo.open_if_absent("atomic-device", datetime.now())
+    assert not repo.open_if_absent("atomic-device", datetime.now())
+    assert len(repo.get_all("atomic-device")) == 1
+
+    assert repo.close_active("atomic-device")
+    assert not repo.close_active("atomic-device")
+    assert repo.get_active("atomic-device") is None
+
+    # Depois de fechada, uma nova irregularidade pode ser aberta
+    assert repo.open_if_absent("atomic-device", datetime.now())
+    assert len(repo.get_all("atomic-device")) == 2
+
+def test_async_open_if_absent(db, async_session_factory):
+    """Testa a abertura atômica com sessões assíncronas concorrentes."""
+    async def open_once():
+        async with async_session_factory() as session:
+            return await AsyncIrregularityRepository(session).open_if_absent("async-atomic", datetime.now())
+
+    async def scenario():
+        return [await open_once() for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [True, False, False]
+    assert len(IrregularityRepository(db).get_all("async-atomic")) == 1
+
+def test_hash_ring_distribution_and_stability():
+    """
+    Testa que o anel distribui os dispositivos entre os nós e que incluir um nó
+    muda o dono de apenas uma parte dos dispositivos.
+    """
+    devices = [f"device-{i}" for i in range(3000)]
+    ring = HashRing(["http://a", "http://b", "http://c"])
+    owners = {d: ring.owner(d) for d in devices}
+    counts = Counter(owners.values())
+    assert set(counts) == {"http://a", "http://b", "http://c"}
+    assert min(counts.values()) > 600
+
+    grown = HashRing(["http://a", "http://b", "http://c", "http://d"])
+    moved = [d for d in devices if grown.owner(d) != owners[d]]
+    assert all(grown.owner(d) == "http://d" for d in moved)
+    assert len(moved) < len(devices) / 2
+
+def test_ingest_redirects_to_owner(client):
+    """
+    Testa que a API redireciona as medições de dispositivos de outra instância (307)
+    e recusa lotes com dispositivos de várias instâncias (421).
+    """
+    from api.deps import get_shard_router
+    from main import app
+
+    router = ShardRouter(HashRing(["http://a", "http://b"]), "http://a")
+    app.dependency_overrides[get_shard_router] = lambda: router
+    local = next(f"d{i}" for i in range(100) if router.ring.owner(f"d{i}") == "http://a")
+    remote = next(f"d{i}" for i in range(100) if router.ring.owner(f"d{i}") == "http://b")
+
+    params = {"device_id": remote, "time_ms": 0, "value": 0.1}
+    response = client.post("/api/measurements", params=params, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"].startswith("http://b/api/measurements?device_id=")
+
+    params["device_id"] = local
+    assert client.post("/api/measurements", params=params).status_code == 200
+
+    batch = [{"device_id": local, "time_ms": 0, "value": 0.1}, {"device_id": remote, "time_ms": 0, "value": 0.1}]
+    response = client.post("/api/measurements/batch", json=batch, follow_redirects=False)
+    assert response.status_code == 421
+    assert response.json()["owners"] == {"http://a": [local], "http://b": [remote]}
+
+def test_transition_applied_by_other_process_is_not_alerted(db):
+    """
+    Testa que o 'bip' não é emitido (nem uma segunda irregularidade aberta) quando outro
+    processo já abriu a irregularidade do dispositivo.
+    """
+    from repos.measurementRepository import MeasurementRepository
+    from services.measurementService import MeasurementService
+
+    service = MeasurementService(MeasurementRepository(db), IrregularityRepository(db))
+    service.process_measurement("shared-device", 0, service.compute_baseline(0))
+    IrregularityRepository(db).open_if_absent("shared-device", datetime.now())
+
+    alerts = [service.process_measurement("shared-device", 0, 1.0)["alert"] for _ in range(5)]
+    assert alerts == [None] * 5
+    assert len(IrregularityRepository(db).get_all("shared-device")) == 1
+
+def test_simulations_respect_device_ownership(client):
+    """
+    Testa que as simulações de dispositivos de outra instância são redirecionadas (307) ou,
+    com dispositivos de várias instâncias, recusadas (421), sem gerar medições localmente.
+    """
+    from api.deps import get_shard_router, get_simulation_manager
+    from services.simulationManager import SimulationManager
+    from main import app
+
+    router = ShardRouter(HashRing(["http://a", "http://b"]), "http://a")
+    app.dependency_overrides[get_shard_router] = lambda: router
+    manager = SimulationManager(None, None)
+    app.dependency_overrides[get_simulation_manager] = lambda: manager
+    remote = next(f"s{i}" for i in range(100) if router.ring.owner(f"s{i}") == "http://b")
+
+    response = client.post("/api/simulate", params={"device_id": remote, "count": 1, "interval": 0}, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"].startswith("http://b/api/simulate?")
+
+    response = client.post("/api/simulations", params={"devices": 50, "device_prefix": "shard-sim"}, follow_redirects=False)
+    assert response.status_code == 421
+    assert set(response.json()["owners"]) == {"http://a", "http://b"}
+    assert manager.list() == []
+
+def test_realtime_channels_respect_device_ownership(client):
+    """
+    Testa que o SSE de um dispositivo de outra instância é redirecionado ao dono (307), e que
+    o WebSocket é fechado com o código 4307 e a URL do dono.
+    """
+    from starlette.websockets import WebSocketDisconnect
+    from api.deps import get_shard_router
+    from api.endpoints.realtime import WS_WRONG_SHARD
+    from main import app
+
+    router = ShardRouter(HashRing(["http://a", "http://b"]), "http://a")
+    app.dependency_overrides[get_shard_router] = lambda: router
+    remote = next(f"r{i}" for i in range(100) if router.ring.owner(f"r{i}") == "http://b")
+
+    response = client.get("/api/measurements/events", params={"device_id": remote}, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == f"http://b/api/measurements/events?device_id={remote}"
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/api/measurements/ws?device_id={remote}") as websocket:
+            websocket.receive_json()
+    assert closed.value.code == WS_WRONG_SHARD and closed.value.reason == "http://b"
+
+def test_single_worker_per_instance(monkeypatch):
+    """Testa que a API recusa iniciar com vários workers, cujo estado em memória seria dividido entre eles."""
+    from fastapi.testclient import TestClient
+    from core.config import Settings
+    from main import app
+
+    monkeypatch.setattr(Settings, "WEB_CONCURRENCY", 4)
+    with pytest.raises(RuntimeError, match="WEB_CONCURRENCY=4"):
+        with TestClient(app):
+            pass
+
+def test_import_respects_device_ownership(client):
+    """
+    Testa que a importação de um arquivo com dispositivos de outra instância é redirecionada ao
+    dono (307), e que, com dispositivos de várias instâncias, é recusada (421) sem gravar nada.
+    """
+    import io
+    import pyarrow as pa
+    from api.deps import get_shard_router
+    from main import app
+    from utils.columnar import MEASUREMENT_SCHEMA
+
+    router = ShardRouter(HashRing(["http://a", "http://b"]), "http://a")
+    app.dependency_overrides[get_shard_router] = lambda: router
+    local = next(f"i{i}" for i in range(100) if router.ring.owner(f"i{i}") == "http://a")
+    remote = next(f"i{i}" for i in range(100) if router.ring.owner(f"i{i}") == "http://b")
+
+    def arrow_file(device_ids):
+        rows = [{"id": 1, "device_id": d, "time_ms": 0, "timestamp": datetime.now(), "value": 0.1} for d in device_ids]
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, MEASUREMENT_SCHEMA) as writer:
+            writer.write_table(pa.Table.from_pylist(rows, schema=MEASUREMENT_SCHEMA))
+        return sink.getvalue()
+
+    response = client.post("/api/import/measurements", content=arrow_file([remote]), follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "http://b/api/import/measurements"
+
+    response = client.post("/api/import/measurements", content=arrow_file([local, remote]), follow_redirects=False)
+    assert response.status_code == 421
+    assert client.get("/api/measurements/history", params={"device_id": local}).json() == []
+
+    assert client.post("/api/import/measurements", content=arrow_file([local])).json()["rows"] == 1
@@ -0,0 +1,48 @@
+import asyncio
+from repos.measurementRepository import MeasurementRepository
+from repos.irregularityRepository import AsyncIrregularityRepository
+from repos.measurementRepository import AsyncMeasurementRepository
+from services.deviceState import DeviceStateStore
+from services.measurementService import AsyncMeasurementService
+from services.simulationManager import SimulationManager
+
+def make_manager(async_session_factory):
+    states = DeviceStateStore()
+    return SimulationManager(
+        async_session_factory,
+        lambda db: AsyncMeasurementService(AsyncMeasurementRepository(db), AsyncIrregularityRepository(db), states),
+    )
+
+def test_simulation_job_runs_devices_concurrently(db, async_session_factory):
+    """
+    Testa uma simulação em segundo plano com vários dispositivos no modo anormal:
+    todas as medições são gravadas e cada dispositivo gera um 'bip'.
+    """
+    async def run():
+        manager = make_manager(async_session_factory)
+        job = manager.start(devices=3, device_prefix="job", mode="anormal", count=50, interval=0, batch_size=20)
+        await job.task
+        return job.to_dict()
+
+    job = asyncio.run(run())
+    assert job["status"] == "completed"
+    assert job["sent"] == job["total"] == 150
+    assert job["alerts"]["bip"] == 3
+    assert job["throughput"] > 0
+    for i in range(3):
+        assert len(MeasurementRepository(db).get_last_n(f"job-{i}", 100)) == 50
+
+def test_simulation_job_can_be_cancelled(async_session_factory):
+    """
+    Testa o cancelamento de uma simulação em execução.
+    """
+    async def run():
+        manager = make_manager(async_session_factory)
+        job = manager.start(devices=2, count=1000, interval=100, batch_size=1)
+        await asyncio.sleep(0.3)
+        await manager.cancel(job.id)
+        return job.to_dict()
+
+    job = asyncio.run(run())
+    assert job["status"] == "cancelled"
+    assert 0 < job["sent"] < job["total"]
@@ -0,0 +1,91 @@
+"""
+Gravação de linhas em arquivos compactados (CSV com gzip ou Parquet), em blocos,
+sem carregar todas as linhas em memória.
+"""
+import csv
+import gzip
+import os
+import uuid
+from itertools import islice
+from typing import Iterable, Sequence
+
+ARCHIVE_FORMATS = {"csv": ".csv.gz", "parquet": ".parquet"}
+
+def write_archive(path: str, columns: Sequence[str], rows: Iterable[Sequence], archive_format: str = "csv",
+                  chunk_size: int = 10000, replace: bool = True) -> int:
+    """
+    Grava as linhas em um arquivo. O arquivo só aparece no caminho final depois de completamente gravado,
+    e é gravado antes em um arquivo temporário de nome único (gravações simultâneas não se misturam).
+
+    Args:
+        path (str): O caminho do arquivo.
+        columns (Sequence[str]): Os nomes das colunas.
+        rows (Iterable[Sequence]): As linhas, com os valores na ordem das colunas.
+        archive_format (str): "csv" (CSV com gzip) ou "parquet" (requer pyarrow).
+        chunk_size (int): A quantidade de linhas gravadas por vez (tamanho dos row groups no Parquet).
+        replace (bool): Se False, um arquivo já existente no caminho nunca é substituído.
+
+    Returns:
+        int: A quantidade de linhas gravadas.
+
+    Raises:
+        ValueError: Se o formato não for suportado.
+        RuntimeError: Se o formato for "parquet" e o pyarrow não estiver instalado.
+        FileExistsError: Se `replace` for False e o arquivo já existir.
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Formato de arquivo não suportado: {archive_format}")
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if archive_format == "csv":
+            count = _write_csv(tmp_path, columns, rows)
+        else:
+            count = _write_parquet(tmp_path, columns, rows, chunk_size)
+        if replace:
+            os.replace(tmp_path, path)
+        else:
+            # O link é criado de forma atômica, e falha se o caminho já existir
+            os.link(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+def _write_csv(path: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    count = 0
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def _write_parquet(path: str, columns: Sequence[str], rows: Iterable[Sequence], chunk_size: int) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("O formato parquet requer o pacote pyarrow")
+
+    count = 0
+    writer = None
+    rows = iter(rows)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            table = pa.Table.from_pydict({name: list(values) for name, values in zip(columns, zip(*chunk))})
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table)
+            count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Sem linhas, grava apenas o esquema
+        pq.write_table(pa.table({name: [] for name in columns}), path)
+    return count
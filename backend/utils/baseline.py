@@ -0,0 +1,119 @@
+import math
+import numpy as np
+
+# A baseline é periódica em time_ms, com período de 1000 ms
+PERIOD_MS = 1000
+
+# Desvio relativo a partir do qual a medição é considerada anormal
+DEVIATION_THRESHOLD = 0.2
+
+def _formula(x):
+    """Fórmula da baseline, aceita escalares ou arrays NumPy."""
+    return (-0.06366 +
+            0.12613 * np.cos(np.pi * x / 500) +
+            0.12258 * np.cos(np.pi * x / 250) +
+            0.01593 * np.sin(np.pi * x / 500) +
+            0.03147 * np.sin(np.pi * x / 250))
+
+# Tabela com o valor da baseline para cada milissegundo de um período
+BASELINE_TABLE = _formula(np.arange(PERIOD_MS, dtype=np.float64))
+BASELINE_TABLE.setflags(write=False)
+_BASELINE_LIST = BASELINE_TABLE.tolist()
+
+def compute_baseline(time_ms: int) -> float:
+    """
+    Calcula o valor baseline com a fórmula:
+    Y = -0.06366 + 0.12613 cos(pi * x/500) + 0.12258 cos(pi * x/250)
+        + 0.01593 sin(pi * x/500) + 0.03147 sin(pi * x/250)
+
+    Para tempos inteiros, o valor é lido da tabela pré-calculada de um período.
+
+    Args:
+        time_ms (int): O tempo em milissegundos para o qual se deseja calcular o baseline.
+
+    Returns:
+        float: O valor baseline.
+    """
+    if isinstance(time_ms, int):
+        return _BASELINE_LIST[time_ms % PERIOD_MS]
+    x = time_ms
+    return (-0.06366 +
+            0.12613 * (math.cos(math.pi * x / 500)) +
+            0.12258 * (math.cos(math.pi * x / 250)) +
+            0.01593 * (math.sin(math.pi * x / 500)) +
+            0.03147 * (math.sin(math.pi * x / 250)))
+
+def compute_baseline_array(time_ms: np.ndarray) -> np.ndarray:
+    """
+    Calcula o valor baseline para um array de tempos de uma só vez.
+
+    Args:
+        time_ms (np.ndarray): Os tempos em milissegundos.
+
+    Returns:
+        np.ndarray: Os valores baseline, um para cada tempo.
+    """
+    time_ms = np.asarray(time_ms)
+    if np.issubdtype(time_ms.dtype, np.integer):
+        return BASELINE_TABLE[time_ms % PERIOD_MS]
+    return _formula(time_ms.astype(np.float64))
+
+def is_abnormal(measured: float, baseline: float, threshold: float = DEVIATION_THRESHOLD) -> bool:
+    """
+    Verifica se a medição desvia 20% (ou o limite informado) ou mais do baseline.
+
+    Args:
+        measured (float): A medição a ser verificada.
+        baseline (float): O baseline.
+        threshold (float): O desvio relativo mínimo para a medição ser anormal.
+
+    Returns:
+        bool: True se a medição desviar o limite ou mais do baseline, False caso contrário.
+    """
+    return relative_deviation(measured, baseline) >= threshold
+
+def relative_deviation(measured: float, baseline: float) -> float:
+    """
+    Calcula o desvio relativo da medição em relação ao baseline (absoluto, para baseline zero).
+
+    Args:
+        measured (float): A medição.
+        baseline (float): O baseline.
+
+    Returns:
+        float: O desvio relativo, comparável ao limite de `is_abnormal`.
+    """
+    if baseline == 0:
+        return abs(measured - baseline)
+    return abs(measured - baseline) / abs(baseline)
+
+def is_abnormal_array(measured: np.ndarray, baseline: np.ndarray, threshold: float = DEVIATION_THRESHOLD) -> np.ndarray:
+    """
+    Versão vetorizada de `is_abnormal`, para lotes de medições.
+
+    Args:
+        measured (np.ndarray): As medições.
+        baseline (np.ndarray): Os baselines de cada medição.
+        threshold (float): O desvio relativo mínimo para a medição ser anormal.
+
+    Returns:
+        np.ndarray: Array booleano, True para as medições anormais.
+    """
+    return relative_deviation_array(measured, baseline) >= threshold
+
+def relative_deviation_array(measured: np.ndarray, baseline: np.ndarray) -> np.ndarray:
+    """
+    Calcula o desvio relativo de cada medição em relação ao seu baseline (absoluto, para baseline zero).
+
+    Args:
+        measured (np.ndarray): As medições.
+        baseline (np.ndarray): Os baselines de cada medição.
+
+    Returns:
+        np.ndarray: Os desvios relativos, comparáveis ao limite de `is_abnormal`.
+    """
+    measured = np.asarray(measured, dtype=np.float64)
+    baseline = np.asarray(baseline, dtype=np.float64)
+    scale = np.abs(baseline)
+    # Para baseline zero, o desvio é absoluto (como em is_abnormal)
+    return np.abs(measured - baseline) / np.where(scale == 0, 1.0, scale)
@@ -0,0 +1,147 @@
+"""
+Codificação colunar (Arrow IPC e Parquet) de linhas do banco, em blocos, para exportação
+e importação do histórico sem passar por JSON linha a linha.
+"""
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Formatos suportados e os respectivos media types
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+FILE_EXTENSIONS = {"arrow": ".arrows", "parquet": ".parquet"}
+
+MEASUREMENT_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("device_id", pa.string()),
+    ("time_ms", pa.int32()),
+    ("timestamp", pa.timestamp("us")),
+    ("value", pa.float64()),
+])
+
+IRREGULARITY_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("device_id", pa.string()),
+    ("start_timestamp", pa.timestamp("us")),
+    ("end_timestamp", pa.timestamp("us")),
+    ("sample_count", pa.int32()),
+    ("abnormal_samples", pa.int32()),
+    ("peak_deviation", pa.float64()),
+])
+
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_FILE_MAGIC = b"ARROW1"
+
+def to_batches(rows: Iterable[Sequence], schema: pa.Schema, chunk_size: int = 10000) -> Iterator[pa.RecordBatch]:
+    """
+    Agrupa as linhas em RecordBatches de até `chunk_size` linhas.
+
+    Args:
+        rows (Iterable[Sequence]): As linhas, com os valores na ordem das colunas do esquema.
+        schema (pa.Schema): O esquema das linhas.
+        chunk_size (int): A quantidade máxima de linhas por bloco.
+
+    Yields:
+        pa.RecordBatch: Os blocos de linhas.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        columns = zip(*chunk)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema,
+        )
+
+class _ChunkSink:
+    """Destino de escrita em memória que entrega os bytes escritos desde a última leitura."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def encode(batches: Iterable[pa.RecordBatch], schema: pa.Schema, file_format: str = "parquet") -> Iterator[bytes]:
+    """
+    Codifica os blocos em Arrow IPC (stream) ou Parquet, entregando os bytes a cada bloco,
+    para que a resposta seja transmitida sem montar o arquivo inteiro em memória.
+
+    Args:
+        batches (Iterable[pa.RecordBatch]): Os blocos de linhas.
+        schema (pa.Schema): O esquema dos blocos.
+        file_format (str): "arrow" ou "parquet".
+
+    Yields:
+        bytes: Os trechos do arquivo, em ordem.
+
+    Raises:
+        ValueError: Se o formato não for suportado.
+    """
+    if file_format not in MEDIA_TYPES:
+        raise ValueError(f"Formato não suportado: {file_format}")
+
+    sink = _ChunkSink()
+    if file_format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    for batch in batches:
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+def decode(source: BinaryIO, chunk_size: int = 10000, columns: Optional[List[str]] = None) -> Iterator[pa.RecordBatch]:
+    """
+    Lê os blocos de um arquivo Arrow IPC (stream ou arquivo) ou Parquet, identificando o formato pelo conteúdo.
+
+    Args:
+        source (BinaryIO): O arquivo, posicionado no início e com suporte a seek.
+        chunk_size (int): A quantidade máxima de linhas por bloco lido do Parquet.
+        columns (Optional[List[str]]): Se informadas, lê apenas essas colunas (no Parquet, sem ler as demais do disco).
+
+    Yields:
+        pa.RecordBatch: Os blocos de linhas.
+
+    Raises:
+        pa.ArrowInvalid: Se o conteúdo não for um arquivo Arrow ou Parquet válido.
+    """
+    magic = source.read(len(_ARROW_FILE_MAGIC))
+    source.seek(0)
+    if magic.startswith(_PARQUET_MAGIC):
+        yield from pq.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=columns)
+        return
+    if magic == _ARROW_FILE_MAGIC:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = pa.ipc.open_stream(source)
+    for batch in batches:
+        yield batch if columns is None else batch.select(columns)
@@ -0,0 +1,43 @@
+import numpy as np
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Reduz uma série ao número de pontos desejado com o algoritmo
+    Largest-Triangle-Three-Buckets (LTTB), preservando a forma visual do gráfico.
+
+    Args:
+        x (np.ndarray): Os valores do eixo X (crescentes), ex.: segundos desde a época.
+        y (np.ndarray): Os valores do eixo Y.
+        threshold (int): A quantidade de pontos desejada.
+
+    Returns:
+        np.ndarray: Os índices dos pontos escolhidos, em ordem crescente.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # O primeiro e o último ponto são sempre mantidos; os demais são divididos em threshold - 2 intervalos
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Média do próximo intervalo (ou o último ponto, no último intervalo)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Escolhe o ponto do intervalo que forma o maior triângulo com o ponto anterior e a média seguinte
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
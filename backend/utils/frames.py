@@ -0,0 +1,107 @@
+"""
+Formato binário compacto das medições, para dispositivos com pouca banda (ex.: redes celulares).
+
+Um quadro (frame) traz as medições de um único dispositivo, em little-endian:
+
+    versão (uint8) | sequência (uint32) | tamanho do device_id (uint8) | device_id (UTF-8) | medições
+
+com cada medição em 12 bytes: time_ms (int32) seguido de value (float64). A quantidade de
+medições é dada pelo tamanho do quadro. A resposta traz um código de alerta (uint8) por
+medição, na mesma ordem: 0 (nenhum), 1 ("bip") ou 2 ("bipbip").
+
+A sequência, incrementada pelo dispositivo a cada quadro novo (de 1 a 2^32-1, voltando a 1),
+identifica os reenvios: um quadro com a mesma sequência do anterior do dispositivo não é
+processado novamente (ver services.frameReplies). Com sequência 0, os quadros não são identificados.
+"""
+import struct
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+import numpy as np
+
+FRAME_VERSION = 1
+FRAME_MEDIA_TYPE = "application/octet-stream"
+
+# Tamanho máximo do device_id, o mesmo da coluna no banco
+MAX_DEVICE_ID_BYTES = 50
+
+_HEADER = struct.Struct("<BIB")
+
+# Medição empacotada: 12 bytes, sem alinhamento
+SAMPLE_DTYPE = np.dtype([("time_ms", "<i4"), ("value", "<f8")])
+
+ALERT_CODES = {None: 0, "bip": 1, "bipbip": 2}
+_ALERTS = {code: alert for alert, code in ALERT_CODES.items()}
+
+class Frame(NamedTuple):
+    """Quadro de medições lido por decode_frame."""
+
+    device_id: str
+    # Sequência do quadro no dispositivo (0: sem identificação de reenvios)
+    seq: int
+    # Medições, um array com os campos "time_ms" e "value"
+    samples: np.ndarray
+
+def decode_frame(data: bytes) -> Frame:
+    """
+    Lê um quadro de medições, sem copiar as medições (o array aponta para o próprio buffer).
+
+    Args:
+        data (bytes): O quadro recebido.
+
+    Returns:
+        Frame: O ID do dispositivo, a sequência do quadro e as medições.
+
+    Raises:
+        ValueError: Se o quadro for inválido (versão desconhecida, device_id vazio ou inválido,
+            tamanho incompatível com as medições ou valores NaN/infinitos).
+    """
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        raise ValueError("Quadro menor que o cabeçalho")
+    version, seq, id_size = _HEADER.unpack_from(view)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Versão do quadro não suportada: {version}")
+    if not 0 < id_size <= MAX_DEVICE_ID_BYTES:
+        raise ValueError(f"Tamanho do device_id inválido: {id_size}")
+    offset = _HEADER.size + id_size
+    if len(view) < offset or (len(view) - offset) % SAMPLE_DTYPE.itemsize:
+        raise ValueError(f"O tamanho das medições não é múltiplo de {SAMPLE_DTYPE.itemsize} bytes")
+    try:
+        device_id = str(view[_HEADER.size:offset], "utf-8")
+    except UnicodeDecodeError:
+        raise ValueError("device_id não está em UTF-8")
+    samples = np.frombuffer(view, dtype=SAMPLE_DTYPE, offset=offset)
+    if not np.isfinite(samples["value"]).all():
+        raise ValueError("O quadro contém valores não finitos (NaN ou infinito)")
+    return Frame(device_id, seq, samples)
+
+def encode_frame(device_id: str, time_ms: Sequence[int], values: Sequence[float], seq: int = 0) -> bytes:
+    """
+    Monta um quadro com as medições de um dispositivo (usado pelos clientes, testes e benchmarks).
+
+    Args:
+        device_id (str): O ID do dispositivo.
+        time_ms (Sequence[int]): O tempo de cada medição, em milissegundos (int32).
+        values (Sequence[float]): O valor de cada medição.
+        seq (int): A sequência do quadro no dispositivo (0: sem identificação de reenvios).
+
+    Returns:
+        bytes: O quadro.
+
+    Raises:
+        ValueError: Se o device_id for vazio ou maior que MAX_DEVICE_ID_BYTES.
+    """
+    encoded_id = device_id.encode("utf-8")
+    if not 0 < len(encoded_id) <= MAX_DEVICE_ID_BYTES:
+        raise ValueError(f"Tamanho do device_id inválido: {len(encoded_id)}")
+    samples = np.empty(len(values), dtype=SAMPLE_DTYPE)
+    samples["time_ms"] = time_ms
+    samples["value"] = values
+    return _HEADER.pack(FRAME_VERSION, seq, len(encoded_id)) + encoded_id + samples.tobytes()
+
+def encode_alerts(alerts: Iterable[Optional[str]]) -> bytes:
+    """Empacota os alertas das medições, um byte por medição."""
+    return bytes(ALERT_CODES[alert] for alert in alerts)
+
+def decode_alerts(data: bytes) -> List[Optional[str]]:
+    """Lê os alertas empacotados por encode_alerts."""
+    return [_ALERTS[code] for code in data]
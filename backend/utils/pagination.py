@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+def encode_cursor(timestamp: datetime, id: int) -> str:
+    """Gera o cursor opaco que aponta para a posição (timestamp, id) de uma listagem."""
+    raw = f"{timestamp.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Lê um cursor gerado por `encode_cursor`.
+
+    Raises:
+        ValueError: Se o cursor for inválido.
+    """
+    try:
+        timestamp, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(id)
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
@@ -0,0 +1,62 @@
+"""
+Serialização rápida das respostas: linhas do banco (tuplas de colunas) codificadas diretamente
+em JSON (orjson) ou MessagePack, sem validar cada linha por um modelo Pydantic.
+"""
+from datetime import datetime
+from typing import Any, Iterable, Optional, Sequence
+import msgpack
+import orjson
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Escolhe o formato da resposta pelo cabeçalho Accept: MessagePack se o cliente o aceitar, senão JSON.
+
+    Args:
+        accept (Optional[str]): O cabeçalho Accept da requisição.
+
+    Returns:
+        str: O media type escolhido.
+    """
+    for item in (accept or "").split(","):
+        media_type, _, params = item.strip().partition(";")
+        if media_type.strip().lower() in MSGPACK_MEDIA_TYPES and "q=0" not in params.replace(" ", "").split(";"):
+            return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+def dumps(content: Any, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """
+    Serializa o conteúdo no formato escolhido. Datas são escritas em ISO 8601, como no JSON do FastAPI.
+
+    Args:
+        content (Any): O conteúdo (dicionários, listas e valores simples).
+        media_type (str): JSON_MEDIA_TYPE ou MSGPACK_MEDIA_TYPE.
+
+    Returns:
+        bytes: O conteúdo serializado.
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(content, default=_msgpack_default)
+    return orjson.dumps(content)
+
+def encode_rows(columns: Sequence[str], rows: Iterable[Sequence], media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """
+    Serializa linhas (tuplas de colunas) como uma lista de objetos, no formato escolhido.
+
+    Args:
+        columns (Sequence[str]): Os nomes das colunas.
+        rows (Iterable[Sequence]): As linhas, com os valores na ordem das colunas.
+        media_type (str): JSON_MEDIA_TYPE ou MSGPACK_MEDIA_TYPE.
+
+    Returns:
+        bytes: As linhas serializadas.
+    """
+    return dumps([dict(zip(columns, row)) for row in rows], media_type)
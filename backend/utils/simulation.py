@@ -1,9 +1,30 @@
-import math
+import numpy as np
+from utils.baseline import compute_baseline, compute_baseline_array
+
+# Modos de simulação e desvio aplicado às medições anormais
+SIMULATION_MODES = ("normal", "anormal", "misto")
+ABNORMAL_FACTOR = 1.3
+MIXED_ABNORMAL_PROBABILITY = 0.2
 
 def generate_baseline(time_ms: int) -> float:
     """Gera a medição baseline conforme a fórmula."""
-    return (-0.06366 +
-            0.12613 * (math.cos(math.pi * time_ms / 500)) +
-            0.12258 * (math.cos(math.pi * time_ms / 250)) +
-            0.01593 * (math.sin(math.pi * time_ms / 500)) +
-            0.03147 * (math.sin(math.pi * time_ms / 250)))
+    return compute_baseline(time_ms)
+
+def generate_values(mode: str, time_ms: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Gera, de uma só vez, as medições simuladas para os tempos informados.
+
+    Args:
+        mode (str): O modo de simulação: normal (baseline), anormal (desvio de 30%) ou misto (desvio de 30% em ~20% das medições).
+        time_ms (np.ndarray): Os tempos em milissegundos das medições.
+        rng (np.random.Generator): O gerador de números aleatórios (usado no modo misto).
+
+    Returns:
+        np.ndarray: As medições simuladas.
+    """
+    values = compute_baseline_array(time_ms)
+    if mode == "anormal":
+        return values * ABNORMAL_FACTOR
+    if mode == "misto":
+        return np.where(rng.random(len(values)) < MIXED_ABNORMAL_PROBABILITY, values * ABNORMAL_FACTOR, values)
+    return values
@@ -0,0 +1,60 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, cast, func, literal, type_coerce
+
+def epoch_seconds(column, dialect_name: str):
+    """
+    Expressão SQL que converte uma coluna DateTime em segundos desde a época (epoch),
+    conforme o banco de dados utilizado.
+
+    Args:
+        column: A coluna (ou expressão) DateTime.
+        dialect_name (str): O nome do dialeto do banco (ex.: "mysql", "sqlite").
+
+    Returns:
+        A expressão SQL com os segundos desde a época.
+    """
+    if dialect_name == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    if dialect_name == "mysql":
+        return func.unix_timestamp(column)
+    return cast(func.extract("epoch", column), Integer)
+
+def from_epoch_seconds(expr, dialect_name: str):
+    """
+    Expressão SQL inversa de `epoch_seconds`: converte segundos desde a época em DateTime.
+
+    Args:
+        expr: A expressão com os segundos desde a época.
+        dialect_name (str): O nome do dialeto do banco (ex.: "mysql", "sqlite").
+
+    Returns:
+        A expressão SQL DateTime.
+    """
+    if dialect_name == "sqlite":
+        return type_coerce(func.datetime(expr, "unixepoch"), DateTime)
+    if dialect_name == "mysql":
+        return func.from_unixtime(expr)
+    return func.to_timestamp(expr)
+
+def time_bucket(column, bucket_seconds: int, dialect_name: str):
+    """
+    Expressão SQL com o início (em segundos desde a época) do intervalo de `bucket_seconds`
+    ao qual pertence a coluna DateTime.
+    """
+    return (epoch_seconds(column, dialect_name) // bucket_seconds) * bucket_seconds
+
+def bucket_floor(value: datetime, bucket_seconds: int, dialect_name: str):
+    """
+    Expressão SQL com o início do intervalo de `bucket_seconds` ao qual pertence o instante informado,
+    calculado no banco com a mesma conversão de `time_bucket`, para que o primeiro intervalo de uma
+    consulta fique completo (e igual, seja ele lido das medições brutas ou dos agregados).
+
+    Args:
+        value (datetime): O instante.
+        bucket_seconds (int): O tamanho do intervalo, em segundos.
+        dialect_name (str): O nome do dialeto do banco (ex.: "mysql", "sqlite").
+
+    Returns:
+        A expressão SQL DateTime.
+    """
+    return from_epoch_seconds(time_bucket(literal(value, DateTime), bucket_seconds, dialect_name), dialect_name)